@@ -0,0 +1,224 @@
+"""
+================================================================================
+File: generate_synthetic_data.py
+Purpose: Generates deterministic synthetic CSV files that match the schema and
+         formatting of the Kaggle "Ecommerce Behavior Data from Multi-category
+         Store" exports (and therefore bronze.ecommerce_behavior). Used to
+         benchmark the pipeline without the real dataset.
+Functions:
+    - build_catalog()          : Builds the product / brand / category catalog.
+    - generate_month()         : Yields time-ordered event DataFrames for a month.
+    - write_synthetic_files()  : Writes one CSV per month to the output folder.
+Notes:
+    - The same seed and arguments always produce byte-identical files.
+    - Timestamps use the source format 'YYYY-MM-DD HH:MM:SS UTC'.
+    - Session lengths, brand/category cardinalities and null rates are modelled
+      on the November 2019 export.
+Usage:
+    python -m benchmarks.generate_synthetic_data --rows 1000000 --months 2019-11 2019-12
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import argparse
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# =================================================
+# Configuration (defaults modelled on the real export)
+# =================================================
+CSV_COLUMNS = [
+    "event_time", "event_type", "product_id", "category_id", "category_code",
+    "brand", "price", "user_id", "user_session",
+]
+
+EVENT_TYPES = ["view", "cart", "purchase"]
+EVENT_TYPE_WEIGHTS = [0.94, 0.04, 0.02]
+
+TOP_LEVEL_CATEGORIES = [
+    "electronics", "appliances", "computers", "apparel", "furniture", "auto",
+    "construction", "kids", "accessories", "sport", "medicine", "country_yard",
+    "stationery",
+]
+
+MEAN_SESSION_LENGTH = 4.5          # events per session (geometric)
+MEAN_SECONDS_BETWEEN_EVENTS = 75   # exponential gap inside a session
+SESSIONS_PER_USER = 2.5            # average sessions per user in a month
+
+NULL_RATES = {
+    "category_code": 0.32,         # share of categories without a code
+    "brand": 0.14,                 # share of products without a brand
+    "user_session": 0.00001,       # share of events without a session id
+}
+
+
+# =================================================
+# Catalog
+# =================================================
+def build_catalog(rng, n_products: int, n_brands: int, n_categories: int):
+    """
+    Builds the product catalog. Every product has a fixed category_id,
+    category_code, brand and base price, so repeated events for the same
+    product stay consistent (as in the source data).
+    """
+    # Category ids are 19-digit numbers in the source; codes look like 'a.b' or 'a.b.c'
+    category_ids = np.sort(
+        rng.choice(22_000_000, size=n_categories, replace=False).astype(np.int64) * 7_919_000_011
+        + 2_053_013_552_000_000_000
+    )
+    codes = []
+    for i in range(n_categories):
+        top = TOP_LEVEL_CATEGORIES[i % len(TOP_LEVEL_CATEGORIES)]
+        depth = 2 + (i % 3 == 0)
+        parts = [top] + [f"sub{(i * 7 + d) % 97}" for d in range(depth - 1)]
+        codes.append(".".join(parts))
+    codes = np.array(codes, dtype=object)
+    codes[rng.random(n_categories) < NULL_RATES["category_code"]] = None
+
+    brands = np.array([f"brand{i:04d}" for i in range(n_brands)], dtype=object)
+
+    # Zipf-like popularity for brands and categories
+    brand_weights = 1.0 / np.arange(1, n_brands + 1) ** 1.1
+    brand_idx = rng.choice(n_brands, size=n_products, p=brand_weights / brand_weights.sum())
+    product_brand = brands[brand_idx]
+    product_brand[rng.random(n_products) < NULL_RATES["brand"]] = None
+
+    category_weights = 1.0 / np.arange(1, n_categories + 1) ** 0.9
+    category_idx = rng.choice(n_categories, size=n_products, p=category_weights / category_weights.sum())
+
+    catalog = pd.DataFrame({
+        "product_id": np.sort(rng.choice(99_000_000, size=n_products, replace=False) + 1_000_000),
+        "category_id": category_ids[category_idx],
+        "category_code": codes[category_idx],
+        "brand": product_brand,
+        "price": np.round(rng.lognormal(mean=4.5, sigma=1.2, size=n_products).clip(0.77, 2574.07), 2),
+    })
+    popularity = 1.0 / np.arange(1, n_products + 1) ** 1.05
+    catalog["weight"] = rng.permutation(popularity / popularity.sum())
+    return catalog
+
+
+# =================================================
+# Events
+# =================================================
+def generate_month(rng, catalog: pd.DataFrame, month: str, n_rows: int, n_users: int,
+                   block_days: int = 1):
+    """
+    Yields DataFrames of events for one month, in event_time order, one block
+    of `block_days` days at a time so memory stays bounded at any scale.
+    """
+    start = pd.Timestamp(f"{month}-01")
+    end = start + pd.offsets.MonthBegin(1)
+    n_days = (end - start).days
+    rows_per_day = np.full(n_days, n_rows // n_days)
+    rows_per_day[: n_rows % n_days] += 1
+
+    product_ids = catalog["product_id"].to_numpy()
+    product_weights = catalog["weight"].to_numpy()
+    user_ids = np.sort(rng.choice(589_700_000, size=n_users, replace=False) + 10_300_000)
+
+    for day_start in range(0, n_days, block_days):
+        block_rows = int(rows_per_day[day_start: day_start + block_days].sum())
+        if block_rows == 0:
+            continue
+
+        # Session lengths: geometric, so most sessions are short with a long tail
+        lengths = rng.geometric(1.0 / MEAN_SESSION_LENGTH, size=2 * block_rows // int(MEAN_SESSION_LENGTH) + 64)
+        total = np.cumsum(lengths)
+        if total[-1] < block_rows:
+            lengths = np.append(lengths, block_rows - total[-1])
+            total = np.cumsum(lengths)
+        n_sessions = int(np.searchsorted(total, block_rows)) + 1
+        lengths = lengths[:n_sessions]
+        lengths[-1] -= total[n_sessions - 1] - block_rows
+
+        block_seconds = 86_400 * min(block_days, n_days - day_start)
+        session_start = rng.integers(0, block_seconds, size=n_sessions)
+        session_user = user_ids[rng.integers(0, n_users, size=n_sessions)]
+        session_ids = np.array(
+            [str(uuid.UUID(bytes=rng.bytes(16), version=4)) for _ in range(n_sessions)], dtype=object
+        )
+        session_ids[rng.random(n_sessions) < NULL_RATES["user_session"]] = None
+
+        session_of_event = np.repeat(np.arange(n_sessions), lengths)
+        position = np.arange(block_rows) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        gaps = rng.exponential(MEAN_SECONDS_BETWEEN_EVENTS, size=block_rows).astype(np.int64)
+        gaps[position == 0] = 0
+        offsets = session_start[session_of_event] + np.cumsum(gaps) - np.repeat(
+            np.cumsum(gaps)[np.cumsum(lengths) - lengths], lengths
+        )
+        event_time = start + pd.Timedelta(days=day_start) + pd.to_timedelta(offsets, unit="s")
+
+        product_idx = rng.choice(product_ids.size, size=block_rows, p=product_weights)
+        products = catalog.iloc[product_idx]
+
+        events = pd.DataFrame({
+            "event_time": event_time,
+            "event_type": rng.choice(EVENT_TYPES, size=block_rows, p=EVENT_TYPE_WEIGHTS),
+            "product_id": products["product_id"].to_numpy(),
+            "category_id": products["category_id"].to_numpy(),
+            "category_code": products["category_code"].to_numpy(),
+            "brand": products["brand"].to_numpy(),
+            "price": products["price"].to_numpy(),
+            "user_id": session_user[session_of_event],
+            "user_session": session_ids[session_of_event],
+        })
+        # Sessions that run past the end of the month are cut off, like the source export
+        events = events[events["event_time"] < end].sort_values("event_time", kind="stable")
+        events["event_time"] = events["event_time"].dt.strftime("%Y-%m-%d %H:%M:%S") + " UTC"
+        yield events[CSV_COLUMNS]
+
+
+def write_synthetic_files(out_dir: str, months, rows_per_month: int, seed: int = 42,
+                          n_products: int = None, n_brands: int = 3_000,
+                          n_categories: int = 600, n_users: int = None):
+    """
+    Writes one CSV per month (named like the Kaggle exports, e.g. 2019-Nov.csv)
+    and returns the list of written paths.
+    """
+    rng = np.random.default_rng(seed)
+    n_products = n_products or max(1_000, rows_per_month // 60)
+    n_users = n_users or max(100, int(rows_per_month / MEAN_SESSION_LENGTH / SESSIONS_PER_USER))
+    catalog = build_catalog(rng, n_products, n_brands, n_categories)
+
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    written = []
+    for month in months:
+        file_path = out_path / f"{pd.Timestamp(f'{month}-01'):%Y-%b}.csv"
+        header = True
+        rows_written = 0
+        with open(file_path, "w", newline="") as fh:
+            for block in generate_month(rng, catalog, month, rows_per_month, n_users):
+                block.to_csv(fh, header=header, index=False)
+                header = False
+                rows_written += len(block)
+        written.append(str(file_path))
+        print(f"✅ Wrote {rows_written:,} rows to {file_path}")
+    return written
+
+
+# =================================================
+# Main Execution
+# =================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic e-commerce behavior CSVs.")
+    parser.add_argument("--out-dir", default="benchmark_data/csv_files")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per monthly file.")
+    parser.add_argument("--months", nargs="+", default=["2019-11"], help="Months as YYYY-MM.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--products", type=int, default=None)
+    parser.add_argument("--brands", type=int, default=3_000)
+    parser.add_argument("--categories", type=int, default=600)
+    parser.add_argument("--users", type=int, default=None)
+    args = parser.parse_args()
+
+    write_synthetic_files(
+        args.out_dir, args.months, args.rows, seed=args.seed, n_products=args.products,
+        n_brands=args.brands, n_categories=args.categories, n_users=args.users,
+    )
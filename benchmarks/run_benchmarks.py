@@ -0,0 +1,296 @@
+"""
+================================================================================
+File: run_benchmarks.py
+Purpose: End-to-end benchmark harness for the medallion pipeline. Runs every
+         stage of `medallion_pipeline_flow` (etl_pipeline.py) against the local
+         SQLite stand-in database using synthetic CSVs, and records wall time,
+         rows/sec and peak memory per stage. Results can be saved as a baseline
+         and later runs compared against it to catch regressions.
+Functions:
+    - run_pipeline_benchmark() : Runs all stages once on a fresh stand-in DB.
+    - summarize()              : Takes the median of repeated runs per stage.
+    - compare_to_baseline()    : Flags stages slower / heavier than the baseline.
+Notes:
+    - Task bodies are called through Prefect's `.fn` so no Prefect server or
+      flow run is required.
+    - Peak memory is the highest peak RSS pipeline_telemetry sampled while the
+      stage's tasks ran, including the Bronze worker processes of a sharded
+      load. Sampling runs alongside the timed pass, so nothing traces the
+      allocations being timed.
+    - MAX_ROWS_PER_FILE is lifted for the run so every generated row is loaded.
+    - DB time and round-trips come from pipeline_telemetry's engine hooks.
+Usage:
+    python -m benchmarks.run_benchmarks --rows 200000 --months 2019-11 --save-baseline
+    python -m benchmarks.run_benchmarks --rows 200000 --months 2019-11 --baseline benchmark_data/baseline.json
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import argparse
+import functools
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import text
+
+import etl_pipeline
+import pipeline_telemetry
+from benchmarks.generate_synthetic_data import write_synthetic_files
+from benchmarks.standin_db import create_standin_engine
+from gold import parquet_export
+
+# =================================================
+# Stage Definitions (same order as medallion_pipeline_flow)
+# =================================================
+# (stage name, tasks to run, table whose rows the stage processes, is_load)
+STAGES = [
+    ("bronze_load", [etl_pipeline.load_csvs_to_bronze], "bronze.ecommerce_behavior", True),
+    ("bronze_dq", [etl_pipeline.dq_invalid_ids, etl_pipeline.dq_nulls_and_distincts,
+                   etl_pipeline.dq_duplicate_products], "bronze.ecommerce_behavior", False),
+    ("silver_load", [etl_pipeline.load_silver], "silver.ecommerce_behavior", True),
+    ("silver_dq", [etl_pipeline.dq_nulls_and_distincts_silver, etl_pipeline.dq_unknown_values_silver,
+                   etl_pipeline.dq_duplicate_products_silver], "silver.ecommerce_behavior", False),
+    ("silver_dq_sampled", [etl_pipeline.dq_rates_sampled_silver], "silver.ecommerce_behavior", False),
+    ("gold_dim_products_load", [etl_pipeline.load_gold_dim_products], "gold.dim_products", True),
+    ("gold_dim_lookups_load", [etl_pipeline.load_gold_dim_lookups], "gold.dim_session", True),
+    ("gold_dim_calendar_load", [etl_pipeline.load_gold_dim_calendar], "gold.dim_date", True),
+    ("gold_fact_load", [etl_pipeline.load_gold_fact], "gold.fact_ecommerce", True),
+    ("gold_rollups_refresh", [etl_pipeline.refresh_gold_daily_rollups], "gold.agg_daily_product_event", True),
+    ("gold_sessions_load", [etl_pipeline.load_gold_fact_sessions], "gold.fact_sessions", True),
+    ("gold_user_features_refresh", [etl_pipeline.refresh_gold_user_features], "gold.user_features", True),
+    ("columnstore_segments", [etl_pipeline.report_columnstore_segments], "gold.fact_ecommerce", False),
+    ("gold_dq", [etl_pipeline.check_event_key_duplicates, etl_pipeline.check_fact_nulls_unknowns,
+                 etl_pipeline.check_referential_integrity, etl_pipeline.check_brand_category_consistency,
+                 etl_pipeline.check_daily_rollups],
+     "gold.fact_ecommerce", False),
+    ("gold_dq_sampled", [etl_pipeline.check_fact_rates_sampled], "gold.fact_ecommerce", False),
+]
+if parquet_export.pa is not None:   # optional dependency
+    STAGES.append(("gold_parquet_export", [etl_pipeline.export_gold_parquet], "gold.fact_ecommerce", False))
+
+# Simulated rowgroup size for the segment overlap report (benchmark data has far fewer rows
+# than one real 1,048,576-row rowgroup)
+STANDIN_ROWGROUP_ROWS = 2_000
+
+DEFAULT_TOLERANCE = 0.20   # 20% slower / heavier than baseline counts as a regression
+
+# Differences below these absolute amounts are treated as noise
+MIN_WALL_DELTA_S = 0.05
+MIN_MEM_DELTA_MB = 1.0
+
+
+# =================================================
+# Benchmark Execution
+# =================================================
+def _count_rows(engine, table: str) -> int:
+    with engine.begin() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def run_pipeline_benchmark(source_pattern: str, work_dir: str, quiet: bool = True,
+                           silver_engine: str = "sql", bronze_workers: int = 0):
+    """
+    Runs every stage once against a fresh stand-in database and returns a dict
+    of per-stage measurements. With `bronze_workers` the Bronze load runs
+    sharded on that many worker processes.
+    """
+    task_kwargs = {
+        "load_csvs_to_bronze": {"file_pattern": source_pattern},
+        "load_bronze_sharded": {"file_pattern": source_pattern, "workers": bronze_workers,
+                                "engine_factory": functools.partial(create_standin_engine, work_dir)},
+        "load_silver": {"transform_engine": silver_engine},
+        "report_columnstore_segments": {"rowgroup_rows": STANDIN_ROWGROUP_ROWS},
+    }
+    stages = STAGES
+    if bronze_workers:
+        stages = [(name, [etl_pipeline.load_bronze_sharded] if name == "bronze_load" else tasks, table, is_load)
+                  for name, tasks, table, is_load in STAGES]
+    engine = pipeline_telemetry.instrument_engine(create_standin_engine(work_dir))
+    original_engine = etl_pipeline.engine
+    original_max_rows = etl_pipeline.MAX_ROWS_PER_FILE
+    original_bitmap_path = etl_pipeline.PRODUCT_BITMAP_PATH
+    original_dedup_dir = etl_pipeline.DUPLICATE_FILTER["directory"]
+    original_tuning_log = etl_pipeline.ADAPTIVE_BATCHING["log_path"]
+    original_dq_cache = etl_pipeline.DQ_CACHE["enabled"]
+    original_export_dir = etl_pipeline.GOLD_PARQUET_EXPORT["output_dir"]
+    etl_pipeline.engine = engine
+    etl_pipeline.MAX_ROWS_PER_FILE = None   # --rows decides the volume, not the dev cap
+    etl_pipeline.PRODUCT_BITMAP_PATH = str(Path(work_dir) / "dim_products_bitmap.npz")
+    etl_pipeline.DUPLICATE_FILTER["directory"] = str(Path(work_dir) / "dedup")
+    etl_pipeline.ADAPTIVE_BATCHING["log_path"] = str(Path(work_dir) / "batch_tuning.jsonl")
+    etl_pipeline.GOLD_PARQUET_EXPORT["output_dir"] = str(Path(work_dir) / "exports")
+    # DQ stages are measured doing the work, not replaying cached results
+    etl_pipeline.DQ_CACHE["enabled"] = False
+    results = {}
+    try:
+        for stage_name, tasks, table, is_load in stages:
+            rows_before = _count_rows(engine, table)
+            pipeline_telemetry.RUN_METRICS.clear()
+            output = io.StringIO()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+                for stage_task in tasks:
+                    stage_task.fn(**task_kwargs.get(stage_task.fn.__name__, {}))
+            wall_s = time.perf_counter() - start
+            # Every task records its own peak RSS; sharded loads add one entry per worker shard
+            peak_bytes = max((m.peak_rss_bytes for m in pipeline_telemetry.RUN_METRICS
+                              if m.peak_rss_bytes is not None), default=0)
+
+            rows_after = _count_rows(engine, table)
+            # Loads are measured on rows written, DQ stages on rows scanned
+            rows = rows_after - rows_before if is_load else rows_after
+            results[stage_name] = {
+                "wall_s": round(wall_s, 4),
+                "rows": rows,
+                "rows_per_s": round(rows / wall_s, 1) if wall_s > 0 else None,
+                "peak_mem_mb": round(peak_bytes / 1024 ** 2, 2),
+                "db_time_s": round(sum(m.db_time_s for m in pipeline_telemetry.RUN_METRICS), 4),
+                "db_round_trips": sum(m.db_round_trips for m in pipeline_telemetry.RUN_METRICS),
+            }
+            # Share of segments a range filter reads, per table column (columnstore_segments stage)
+            segment_metrics = {key: value for stage in pipeline_telemetry.RUN_METRICS
+                               for key, value in stage.extra.items() if key.startswith("segment_scan_fraction_")}
+            results[stage_name].update(segment_metrics)
+            print(f"  {stage_name:<28} {wall_s:>9.3f}s {rows:>12,} rows "
+                  f"{results[stage_name]['rows_per_s'] or 0:>14,.0f} rows/s "
+                  f"{results[stage_name]['peak_mem_mb']:>9.1f} MB")
+            for key, value in segment_metrics.items():
+                print(f"    {key.replace('segment_scan_fraction_', ''):<40} {value:>7.1%} of segments scanned")
+    finally:
+        pipeline_telemetry.RUN_METRICS.clear()
+        etl_pipeline.engine = original_engine
+        etl_pipeline.MAX_ROWS_PER_FILE = original_max_rows
+        etl_pipeline.PRODUCT_BITMAP_PATH = original_bitmap_path
+        etl_pipeline.DUPLICATE_FILTER["directory"] = original_dedup_dir
+        etl_pipeline.ADAPTIVE_BATCHING["log_path"] = original_tuning_log
+        etl_pipeline.DQ_CACHE["enabled"] = original_dq_cache
+        etl_pipeline.GOLD_PARQUET_EXPORT["output_dir"] = original_export_dir
+        engine.dispose()
+    return results
+
+
+def summarize(runs):
+    """Combines repeated runs into one result per stage (median of each metric)."""
+    summary = {}
+    for stage_name in runs[0]:
+        summary[stage_name] = {
+            metric: statistics.median(run[stage_name][metric] for run in runs)
+            for metric in runs[0][stage_name]
+            if all(run[stage_name].get(metric) is not None for run in runs)
+        }
+    return summary
+
+
+# =================================================
+# Baseline Comparison
+# =================================================
+def compare_to_baseline(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """
+    Compares stage results with a stored baseline. Returns a list of
+    regression messages (empty when everything is within tolerance).
+    """
+    regressions = []
+    print("\n--- Comparison against baseline ---")
+    for stage_name, metrics in current.items():
+        base = baseline.get(stage_name)
+        if base is None:
+            print(f"    {stage_name}: no baseline (new stage)")
+            continue
+        wall_ratio = metrics["wall_s"] / base["wall_s"] if base["wall_s"] else 1.0
+        mem_ratio = metrics["peak_mem_mb"] / base["peak_mem_mb"] if base["peak_mem_mb"] else 1.0
+        flag = "✅"
+        if wall_ratio > 1 + tolerance and metrics["wall_s"] - base["wall_s"] > MIN_WALL_DELTA_S:
+            regressions.append(f"{stage_name}: wall time {wall_ratio:.2f}x baseline")
+            flag = "❌"
+        if mem_ratio > 1 + tolerance and metrics["peak_mem_mb"] - base["peak_mem_mb"] > MIN_MEM_DELTA_MB:
+            regressions.append(f"{stage_name}: peak memory {mem_ratio:.2f}x baseline")
+            flag = "❌"
+        print(f"{flag} {stage_name:<28} wall {wall_ratio:>5.2f}x   memory {mem_ratio:>5.2f}x")
+    return regressions
+
+
+# =================================================
+# Main Execution
+# =================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the medallion pipeline on synthetic data.")
+    parser.add_argument("--data-dir", default="benchmark_data/csv_files",
+                        help="Folder for the synthetic CSVs (generated if empty).")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows per monthly file.")
+    parser.add_argument("--months", nargs="+", default=["2019-11"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage (median is reported).")
+    parser.add_argument("--output", default="benchmark_data/results.json")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write results as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--silver-engine", choices=["sql", "python"], default="sql",
+                        help="Bronze -> Silver transform engine to benchmark.")
+    parser.add_argument("--bronze-workers", type=int, default=0,
+                        help="Run the Bronze load sharded on this many worker processes (0 = in-process).")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output.")
+    args = parser.parse_args(argv)
+
+    data_dir = Path(args.data_dir)
+    if not list(data_dir.glob("*.csv")):
+        write_synthetic_files(str(data_dir), args.months, args.rows, seed=args.seed)
+    source_pattern = str(data_dir / "*.csv")
+
+    runs = []
+    for i in range(args.repeat):
+        print(f"\n⚡ Benchmark run {i + 1}/{args.repeat}")
+        with tempfile.TemporaryDirectory() as work_dir:
+            runs.append(run_pipeline_benchmark(source_pattern, work_dir, quiet=not args.verbose,
+                                               silver_engine=args.silver_engine,
+                                               bronze_workers=args.bronze_workers))
+    summary = summarize(runs)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "rows_per_file": args.rows,
+            "months": args.months,
+            "seed": args.seed,
+            "silver_engine": args.silver_engine,
+            "bronze_workers": args.bronze_workers,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": summary,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(result, indent=2))
+    print(f"\n✅ Results written to {output_path}")
+    if args.save_baseline:
+        baseline_path = output_path.with_name("baseline.json")
+        baseline_path.write_text(json.dumps(result, indent=2))
+        print(f"✅ Baseline written to {baseline_path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["stages"]
+        regressions = compare_to_baseline(summary, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Performance regressions detected:")
+            for message in regressions:
+                print(f"    {message}")
+            return 1
+        print("\n✅ No performance regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
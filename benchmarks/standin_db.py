@@ -0,0 +1,516 @@
+"""
+================================================================================
+File: standin_db.py
+Purpose: Provides a local SQLite stand-in for the SQL Server 'ecommerce_behavior'
+         database so the pipeline tasks can be benchmarked without a server.
+         The bronze, silver and gold schemas are attached as separate SQLite
+         files, the tables mirror the DDL scripts, and 'EXEC <procedure>'
+         calls are translated to equivalent SQLite statements.
+Functions:
+    - create_standin_engine() : Creates an engine with the schemas attached and
+                                the tables and procedure translations in place.
+Notes:
+    - The stand-in is for relative timings and regression tracking only; the
+      absolute numbers are not comparable with SQL Server.
+    - Keep STANDIN_DDL / STANDIN_PROCEDURES in sync with the .sql scripts.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import re
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, text
+
+# =================================================
+# Table DDL (mirrors bronze/silver/gold ddl_*.sql)
+# =================================================
+SCHEMAS = ["bronze", "silver", "gold"]
+
+STANDIN_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS bronze.ecommerce_behavior (
+        event_time      DATETIME      NOT NULL,
+        event_type      VARCHAR(10)   NULL,
+        product_id      BIGINT        NULL,
+        category_id     BIGINT        NULL,
+        category_code   VARCHAR(100)  NULL,
+        brand           VARCHAR(50)   NULL,
+        price           DECIMAL(10,2) NULL,
+        user_id         BIGINT        NULL,
+        user_session    VARCHAR(36)   NULL,
+        loaded_at       DATETIME      NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bronze.ecommerce_behavior_rejects (
+        source_file     NVARCHAR(260)   NOT NULL,
+        source_row      BIGINT          NOT NULL,
+        reason_codes    VARCHAR(400)    NOT NULL,
+        event_time      NVARCHAR(4000)  NULL,
+        event_type      NVARCHAR(4000)  NULL,
+        product_id      NVARCHAR(4000)  NULL,
+        category_id     NVARCHAR(4000)  NULL,
+        category_code   NVARCHAR(4000)  NULL,
+        brand           NVARCHAR(4000)  NULL,
+        price           NVARCHAR(4000)  NULL,
+        user_id         NVARCHAR(4000)  NULL,
+        user_session    NVARCHAR(4000)  NULL,
+        rejected_at     DATETIME        NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS silver.ecommerce_behavior (
+        event_date       DATE        NOT NULL,
+        event_time_only  TIME(0)     NOT NULL,
+        event_type       VARCHAR(50) NULL,
+        product_id       BIGINT      NULL,
+        category_id      BIGINT      NULL,
+        category         VARCHAR(50) NULL,
+        subcategory      VARCHAR(50) NULL,
+        brand            VARCHAR(50) NULL,
+        price            DECIMAL(10,2) NULL,
+        user_id          BIGINT      NULL,
+        user_session     VARCHAR(36) NULL,
+        loaded_at        DATETIME    NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.dim_products (
+        product_id   BIGINT      NOT NULL,
+        category_id  BIGINT      NULL,
+        brand        VARCHAR(50) NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.dim_brand (
+        brand_key   INTEGER PRIMARY KEY AUTOINCREMENT,
+        brand       VARCHAR(50) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.dim_category (
+        category_key INTEGER PRIMARY KEY AUTOINCREMENT,
+        category     VARCHAR(50) NOT NULL,
+        subcategory  VARCHAR(50) NOT NULL,
+        UNIQUE (category, subcategory)
+    )
+    """,
+    # session_uid holds the 32 hex digits here (SQL Server stores them as BINARY(16))
+    """
+    CREATE TABLE IF NOT EXISTS gold.dim_session (
+        session_key  INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_uid  CHAR(32) NOT NULL UNIQUE
+    )
+    """,
+    "INSERT OR IGNORE INTO gold.dim_session (session_key, session_uid) VALUES (0, '00000000000000000000000000000000')",
+    """
+    CREATE TABLE IF NOT EXISTS gold.dim_date (
+        date_key      INT          NOT NULL PRIMARY KEY,
+        full_date     DATE         NOT NULL UNIQUE,
+        year          SMALLINT     NOT NULL,
+        quarter       TINYINT      NOT NULL,
+        month         TINYINT      NOT NULL,
+        month_name    VARCHAR(10)  NOT NULL,
+        day_of_month  TINYINT      NOT NULL,
+        day_of_year   SMALLINT     NOT NULL,
+        day_of_week   TINYINT      NOT NULL,
+        day_name      VARCHAR(10)  NOT NULL,
+        iso_year      SMALLINT     NOT NULL,
+        iso_week      TINYINT      NOT NULL,
+        is_weekend    BIT          NOT NULL,
+        is_holiday    BIT          NOT NULL,
+        holiday_name  VARCHAR(50)  NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.dim_time (
+        time_key   INT          NOT NULL PRIMARY KEY,
+        full_time  TIME(0)      NOT NULL,
+        hour       TINYINT      NOT NULL,
+        minute     TINYINT      NOT NULL,
+        second     TINYINT      NOT NULL,
+        day_part   VARCHAR(10)  NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.fact_ecommerce (
+        event_key       BIGINT      NOT NULL PRIMARY KEY,
+        event_date      DATE        NOT NULL,
+        event_time_only TIME(0)     NOT NULL,
+        date_key        INT         NOT NULL,
+        time_key        INT         NOT NULL,
+        event_type      VARCHAR(10) NULL,
+        product_id      BIGINT      NULL,
+        category_key    INT         NULL,
+        brand_key       INT         NULL,
+        price           DECIMAL(10,2) NULL,
+        user_id         BIGINT      NULL,
+        session_key     INT         NULL
+    )
+    """,
+    # gold.seq_event_key is emulated by a one-row table
+    "CREATE TABLE IF NOT EXISTS gold.seq_event_key (next_value BIGINT NOT NULL)",
+    "INSERT INTO gold.seq_event_key (next_value) SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM gold.seq_event_key)",
+    """
+    CREATE TABLE IF NOT EXISTS gold.fact_load_batches (
+        batch_id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_event_key  BIGINT   NOT NULL,
+        last_event_key   BIGINT   NOT NULL,
+        row_count        BIGINT   NOT NULL,
+        source_loaded_through DATETIME NULL,
+        loaded_at        DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.batch_consumers (
+        consumer      VARCHAR(50) NOT NULL,
+        batch_id      INT         NOT NULL,
+        processed_at  DATETIME    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (consumer, batch_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.agg_daily_product_event (
+        event_date   DATE          NOT NULL,
+        product_id   BIGINT        NOT NULL,
+        event_type   VARCHAR(10)   NOT NULL,
+        event_count  BIGINT        NOT NULL,
+        revenue      DECIMAL(18,2) NOT NULL,
+        PRIMARY KEY (event_date, product_id, event_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.agg_daily_category_funnel (
+        event_date      DATE          NOT NULL,
+        category_key    INT           NOT NULL,
+        view_count      BIGINT        NOT NULL,
+        cart_count      BIGINT        NOT NULL,
+        purchase_count  BIGINT        NOT NULL,
+        revenue         DECIMAL(18,2) NOT NULL,
+        PRIMARY KEY (event_date, category_key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.fact_sessions (
+        session_key     INT           NOT NULL PRIMARY KEY,
+        user_id         BIGINT        NULL,
+        session_start   DATETIME      NOT NULL,
+        session_end     DATETIME      NOT NULL,
+        duration_s      INT           NOT NULL,
+        event_count     INT           NOT NULL,
+        view_count      INT           NOT NULL,
+        cart_count      INT           NOT NULL,
+        purchase_count  INT           NOT NULL,
+        converted       BIT           NOT NULL,
+        basket_value    DECIMAL(18,2) NOT NULL,
+        updated_at      DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.fact_sessions_stage (
+        session_key     INT           NOT NULL,
+        user_id         BIGINT        NULL,
+        session_start   DATETIME      NOT NULL,
+        session_end     DATETIME      NOT NULL,
+        duration_s      INT           NOT NULL,
+        event_count     INT           NOT NULL,
+        view_count      INT           NOT NULL,
+        cart_count      INT           NOT NULL,
+        purchase_count  INT           NOT NULL,
+        converted       BIT           NOT NULL,
+        basket_value    DECIMAL(18,2) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS gold.user_features (
+        user_id           BIGINT        NOT NULL PRIMARY KEY,
+        first_event_at    DATETIME      NOT NULL,
+        last_event_at     DATETIME      NOT NULL,
+        last_purchase_at  DATETIME      NULL,
+        event_count       BIGINT        NOT NULL,
+        view_count        BIGINT        NOT NULL,
+        cart_count        BIGINT        NOT NULL,
+        purchase_count    BIGINT        NOT NULL,
+        purchase_value    DECIMAL(18,2) NOT NULL,
+        updated_at        DATETIME      NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+# SQLite equivalent of TRY_CONVERT(BINARY(16), REPLACE(user_session, '-', ''), 2)
+_SESSION_UID_SQL = "CASE WHEN length({col}) = 36 THEN upper(replace({col}, '-', '')) END"
+
+# =================================================
+# Stored procedure translations (mirror *.sql procedures)
+# =================================================
+# Each procedure maps to a list of statements; all but the last are run on the
+# same cursor before the last one replaces the original 'EXEC' statement.
+STANDIN_PROCEDURES = {
+    "silver.LoadEcommerceBehavior": [
+        "DELETE FROM silver.ecommerce_behavior",
+        """
+        INSERT INTO silver.ecommerce_behavior (
+            event_date, event_time_only, event_type, product_id, category_id,
+            category, subcategory, brand, price, user_id, user_session, loaded_at
+        )
+        SELECT
+            date(event_time),
+            time(event_time, '+0.5 seconds'),   -- CAST(... AS TIME(0)) rounds to the second
+            event_type,
+            product_id,
+            category_id,
+            CASE WHEN instr(category_code, '.') > 0
+                THEN substr(category_code, 1, instr(category_code, '.') - 1)
+                ELSE 'UNKNOWN' END,
+            CASE WHEN instr(category_code, '.') > 0
+                THEN substr(category_code, instr(category_code, '.') + 1)
+                ELSE 'UNKNOWN' END,
+            IFNULL(brand, 'UNKNOWN'),
+            price,
+            user_id,
+            IFNULL(user_session, 'UNKNOWN'),
+            strftime('%Y-%m-%d %H:%M:%f', loaded_at)
+        FROM bronze.ecommerce_behavior
+        ORDER BY event_time
+        """,
+    ],
+    "gold.LoadDimProducts": [
+        "DELETE FROM gold.dim_products WHERE product_id IN (SELECT product_id FROM silver.ecommerce_behavior)",
+        """
+        INSERT INTO gold.dim_products (product_id, category_id, brand)
+        SELECT product_id, MAX(category_id), MAX(brand)
+        FROM silver.ecommerce_behavior
+        GROUP BY product_id
+        """,
+    ],
+    "gold.LoadDimLookups": [
+        """
+        INSERT INTO gold.dim_brand (brand)
+        SELECT DISTINCT brand FROM silver.ecommerce_behavior s
+        WHERE brand IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM gold.dim_brand b WHERE b.brand = s.brand)
+        """,
+        """
+        INSERT INTO gold.dim_category (category, subcategory)
+        SELECT DISTINCT category, subcategory FROM silver.ecommerce_behavior s
+        WHERE category IS NOT NULL AND subcategory IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM gold.dim_category c
+              WHERE c.category = s.category AND c.subcategory = s.subcategory
+          )
+        """,
+        f"""
+        INSERT INTO gold.dim_session (session_uid)
+        SELECT DISTINCT uid FROM (
+            SELECT {_SESSION_UID_SQL.format(col="user_session")} AS uid FROM silver.ecommerce_behavior
+        ) u
+        WHERE uid IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM gold.dim_session d WHERE d.session_uid = u.uid)
+        """,
+    ],
+    "gold.LoadFactEcommerce": [
+        # Silver rows loaded into Bronze after the previous batch's watermark
+        "DROP TABLE IF EXISTS temp.fact_delta",
+        """
+        CREATE TEMP TABLE fact_delta AS
+        SELECT * FROM silver.ecommerce_behavior
+        WHERE strftime('%Y-%m-%d %H:%M:%f', loaded_at)
+            > IFNULL((SELECT MAX(source_loaded_through) FROM gold.fact_load_batches), '')
+        """,
+        """
+        INSERT INTO gold.fact_load_batches (first_event_key, last_event_key, row_count, source_loaded_through)
+        SELECT q.next_value, q.next_value + n.row_count - 1, n.row_count, n.loaded_through
+        FROM gold.seq_event_key q,
+             (SELECT COUNT(*) AS row_count, MAX(strftime('%Y-%m-%d %H:%M:%f', loaded_at)) AS loaded_through
+              FROM temp.fact_delta) n
+        WHERE n.row_count > 0
+        """,
+        "UPDATE gold.seq_event_key SET next_value = next_value + (SELECT COUNT(*) FROM temp.fact_delta)",
+        f"""
+        INSERT INTO gold.fact_ecommerce (
+            event_key, event_date, event_time_only, date_key, time_key, event_type, product_id,
+            category_key, brand_key, price, user_id, session_key
+        )
+        SELECT
+            (SELECT MAX(first_event_key) FROM gold.fact_load_batches) - 1 + ROW_NUMBER() OVER (
+                ORDER BY s.event_date, s.event_time_only, s.user_id, s.product_id, s.event_type,
+                         s.user_session, s.price
+            ),
+            s.event_date, s.event_time_only,
+            CAST(strftime('%Y%m%d', s.event_date) AS INTEGER),
+            CAST(strftime('%s', '1970-01-01 ' || s.event_time_only) AS INTEGER),
+            s.event_type, s.product_id,
+            c.category_key, b.brand_key, s.price, s.user_id, IFNULL(ds.session_key, 0)
+        FROM temp.fact_delta s
+        LEFT JOIN gold.dim_category c ON c.category = s.category AND c.subcategory = s.subcategory
+        LEFT JOIN gold.dim_brand b ON b.brand = s.brand
+        LEFT JOIN gold.dim_session ds ON ds.session_uid = {_SESSION_UID_SQL.format(col="s.user_session")}
+        ORDER BY 1
+        """,
+    ],
+    # MERGE is written as INSERT ... ON CONFLICT DO UPDATE ('WHERE true' avoids
+    # SQLite's parsing ambiguity between a join's ON and the upsert clause)
+    "gold.RefreshDailyRollups": [
+        "DROP TABLE IF EXISTS temp.rollup_batches",
+        """
+        CREATE TEMP TABLE rollup_batches AS
+        SELECT b.batch_id, b.first_event_key, b.last_event_key
+        FROM gold.fact_load_batches b
+        WHERE NOT EXISTS (
+            SELECT 1 FROM gold.batch_consumers c
+            WHERE c.consumer = 'daily_rollups' AND c.batch_id = b.batch_id
+        )
+        """,
+        """
+        INSERT INTO gold.agg_daily_product_event (event_date, product_id, event_type, event_count, revenue)
+        SELECT f.event_date, IFNULL(f.product_id, -1), IFNULL(f.event_type, 'UNKNOWN'), COUNT(*),
+               IFNULL(SUM(CASE WHEN f.event_type = 'purchase' THEN f.price END), 0)
+        FROM gold.fact_ecommerce f
+        JOIN temp.rollup_batches b ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+        WHERE true
+        GROUP BY f.event_date, IFNULL(f.product_id, -1), IFNULL(f.event_type, 'UNKNOWN')
+        ON CONFLICT (event_date, product_id, event_type) DO UPDATE SET
+            event_count = event_count + excluded.event_count,
+            revenue = revenue + excluded.revenue
+        """,
+        """
+        INSERT INTO gold.agg_daily_category_funnel (
+            event_date, category_key, view_count, cart_count, purchase_count, revenue
+        )
+        SELECT f.event_date, IFNULL(f.category_key, 0),
+               SUM(CASE WHEN f.event_type = 'view' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN f.event_type = 'cart' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN f.event_type = 'purchase' THEN 1 ELSE 0 END),
+               IFNULL(SUM(CASE WHEN f.event_type = 'purchase' THEN f.price END), 0)
+        FROM gold.fact_ecommerce f
+        JOIN temp.rollup_batches b ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+        WHERE true
+        GROUP BY f.event_date, IFNULL(f.category_key, 0)
+        ON CONFLICT (event_date, category_key) DO UPDATE SET
+            view_count = view_count + excluded.view_count,
+            cart_count = cart_count + excluded.cart_count,
+            purchase_count = purchase_count + excluded.purchase_count,
+            revenue = revenue + excluded.revenue
+        """,
+        """
+        INSERT INTO gold.batch_consumers (consumer, batch_id)
+        SELECT 'daily_rollups', batch_id FROM temp.rollup_batches
+        """,
+    ],
+    "gold.MergeFactSessions": [
+        """
+        INSERT INTO gold.fact_sessions (
+            session_key, user_id, session_start, session_end, duration_s, event_count,
+            view_count, cart_count, purchase_count, converted, basket_value
+        )
+        SELECT session_key, user_id, session_start, session_end, duration_s, event_count,
+               view_count, cart_count, purchase_count, converted, basket_value
+        FROM gold.fact_sessions_stage
+        WHERE true
+        ON CONFLICT (session_key) DO UPDATE SET
+            session_start  = min(session_start, excluded.session_start),
+            session_end    = max(session_end, excluded.session_end),
+            duration_s     = CAST(round((julianday(max(session_end, excluded.session_end))
+                                        - julianday(min(session_start, excluded.session_start))) * 86400) AS INT),
+            event_count    = event_count + excluded.event_count,
+            view_count     = view_count + excluded.view_count,
+            cart_count     = cart_count + excluded.cart_count,
+            purchase_count = purchase_count + excluded.purchase_count,
+            converted      = CASE WHEN purchase_count + excluded.purchase_count > 0 THEN 1 ELSE 0 END,
+            basket_value   = basket_value + excluded.basket_value,
+            updated_at     = CURRENT_TIMESTAMP
+        """,
+    ],    "gold.RefreshUserFeatures": [
+        "DROP TABLE IF EXISTS temp.feature_batches",
+        """
+        CREATE TEMP TABLE feature_batches AS
+        SELECT b.batch_id, b.first_event_key, b.last_event_key
+        FROM gold.fact_load_batches b
+        WHERE NOT EXISTS (
+            SELECT 1 FROM gold.batch_consumers c
+            WHERE c.consumer = 'user_features' AND c.batch_id = b.batch_id
+        )
+        """,
+        """
+        INSERT INTO gold.user_features (
+            user_id, first_event_at, last_event_at, last_purchase_at, event_count,
+            view_count, cart_count, purchase_count, purchase_value
+        )
+        SELECT e.user_id, MIN(e.event_at), MAX(e.event_at),
+               MAX(CASE WHEN e.event_type = 'purchase' THEN e.event_at END),
+               COUNT(*),
+               SUM(CASE WHEN e.event_type = 'view' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN e.event_type = 'cart' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN e.event_type = 'purchase' THEN 1 ELSE 0 END),
+               IFNULL(SUM(CASE WHEN e.event_type = 'purchase' THEN e.price END), 0)
+        FROM (
+            SELECT f.user_id, f.event_type, f.price,
+                   datetime(f.event_date || ' ' || f.event_time_only) AS event_at
+            FROM gold.fact_ecommerce f
+            JOIN temp.feature_batches b ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+            WHERE f.user_id IS NOT NULL
+        ) e
+        GROUP BY e.user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            first_event_at   = min(first_event_at, excluded.first_event_at),
+            last_event_at    = max(last_event_at, excluded.last_event_at),
+            last_purchase_at = CASE WHEN last_purchase_at IS NULL OR excluded.last_purchase_at > last_purchase_at
+                                    THEN IFNULL(excluded.last_purchase_at, last_purchase_at)
+                                    ELSE last_purchase_at END,
+            event_count      = event_count + excluded.event_count,
+            view_count       = view_count + excluded.view_count,
+            cart_count       = cart_count + excluded.cart_count,
+            purchase_count   = purchase_count + excluded.purchase_count,
+            purchase_value   = purchase_value + excluded.purchase_value,
+            updated_at       = CURRENT_TIMESTAMP
+        """,
+        """
+        INSERT INTO gold.batch_consumers (consumer, batch_id)
+        SELECT 'user_features', batch_id FROM temp.feature_batches
+        """,
+    ],
+}
+
+_EXEC_PATTERN = re.compile(r"^\s*EXEC(?:UTE)?\s+([\w\.\[\]]+)\s*;?\s*$", re.IGNORECASE)
+
+
+# =================================================
+# Engine Setup
+# =================================================
+def _translate_exec(conn, cursor, statement, parameters, context, executemany):
+    """Rewrites 'EXEC schema.Procedure' into the SQLite translation."""
+    match = _EXEC_PATTERN.match(statement)
+    if not match:
+        return statement, parameters
+    name = match.group(1).replace("[", "").replace("]", "")
+    if name not in STANDIN_PROCEDURES:
+        raise NotImplementedError(f"No stand-in translation for procedure {name}")
+    *setup, final = STANDIN_PROCEDURES[name]
+    for sql in setup:
+        cursor.execute(sql)
+    return final, ()
+
+
+def create_standin_engine(work_dir: str):
+    """
+    Creates a SQLite engine in `work_dir` with the bronze/silver/gold schemas
+    attached, the pipeline tables created and EXEC translation enabled.
+    """
+    work_path = Path(work_dir)
+    work_path.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(f"sqlite:///{work_path / 'ecommerce_behavior.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _attach_schemas(dbapi_conn, connection_record):
+        for schema in SCHEMAS:
+            dbapi_conn.execute(f"ATTACH DATABASE '{work_path / (schema + '.db')}' AS {schema}")
+
+    event.listen(engine, "before_cursor_execute", _translate_exec, retval=True)
+
+    with engine.begin() as conn:
+        for ddl in STANDIN_DDL:
+            conn.execute(text(ddl))
+    return engine
@@ -0,0 +1,213 @@
+"""
+================================================================================
+File: batch_controller.py
+Purpose: Adaptive chunk size for the Bronze ingest. Instead of a fixed
+         chunksize, the controller measures every chunk (parse time, write
+         latency, process RSS) and grows or shrinks the number of rows read
+         per chunk within configured bounds:
+           - hill climbing on throughput: keep moving the size in the same
+             direction while rows/sec improves, reverse when it drops, hold
+             when the change is within the noise tolerance; a controller
+             starting at one of its bounds probes away from that bound
+           - memory budget: shrink when RSS exceeds the budget, and never grow
+             past the size the remaining headroom allows for all chunks in
+             flight (queued + being parsed/written)
+         Every adjustment is printed and appended to a JSON lines log together
+         with the measurements that caused it.
+Functions:
+    - BatchAdjustment        : One logged change of the chunk size.
+    - AdaptiveBatchController: Chooses the next chunk size from observations.
+Notes:
+    - Throughput of one chunk is rows / max(parse time, write time): parsing
+      and writing overlap, so the slower side sets the pace.
+    - Only chunks read at the current size are used for throughput (chunks
+      still queued from the previous size and short last chunks of a file
+      are skipped); the memory check applies to every chunk.
+    - The memory budget needs the current RSS (psutil, or /proc on Linux). A
+      peak such as ru_maxrss never goes down and would keep shrinking the
+      chunks, so without a current source the budget is disabled with a
+      warning and only throughput drives the size.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import json
+import statistics
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pipeline_telemetry import current_rss
+
+
+# =================================================
+# Adjustment Log
+# =================================================
+@dataclass
+class BatchAdjustment:
+    chunk: int                  # chunks observed when the decision was made
+    old_size: int
+    new_size: int
+    reason: str
+    rows_per_s: float = None    # median throughput at old_size
+    rss_bytes: int = None
+    bytes_per_row: float = None
+
+
+# =================================================
+# Controller
+# =================================================
+class AdaptiveBatchController:
+    """
+    Usage:
+        controller = AdaptiveBatchController(100_000, 10_000, 1_000_000, memory_budget_bytes=2 * 1024 ** 3)
+        df = reader.get_chunk(controller.size)
+        ...
+        controller.observe(len(df), parse_s, write_s, df.memory_usage(deep=True).sum())
+    """
+
+    def __init__(self, initial_size: int, min_size: int, max_size: int, memory_budget_bytes: int = None,
+                 in_flight_chunks: int = 1, growth: float = 1.5, samples_per_step: int = 2,
+                 tolerance: float = 0.05, log_path=None, rss_fn=current_rss):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = self._clamp(initial_size)
+        self.initial_size = self.size
+        self.memory_budget_bytes = memory_budget_bytes
+        self.in_flight_chunks = max(1, in_flight_chunks)
+        self.growth = growth
+        self.samples_per_step = max(1, samples_per_step)
+        self.tolerance = tolerance
+        self.log_path = Path(log_path) if log_path else None
+        self.rss_fn = rss_fn
+        self.memory_budget_disabled = False
+        if memory_budget_bytes is not None and (rss_fn is None or rss_fn() is None):
+            print("⚠️ Adaptive chunk size: the current RSS cannot be read (install psutil); "
+                  "the memory budget is disabled.")
+            self.memory_budget_bytes = None
+            self.memory_budget_disabled = True
+
+        self.adjustments = []
+        self.best_rows_per_s = None
+        self._chunks_observed = 0
+        self._samples = []
+        self._previous_rows_per_s = None
+        self._direction = 1
+        self._bytes_per_row = None
+        self._lock = threading.Lock()
+
+    def _clamp(self, size) -> int:
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    # --- observations ---
+    def observe(self, rows: int, parse_s: float, write_s: float, chunk_bytes: int = None):
+        """Records one written chunk and adjusts the size if the measurements call for it."""
+        with self._lock:
+            self._chunks_observed += 1
+            if rows and chunk_bytes:
+                per_row = chunk_bytes / rows
+                self._bytes_per_row = per_row if self._bytes_per_row is None else 0.8 * self._bytes_per_row + 0.2 * per_row
+
+            rss = self.rss_fn() if self.rss_fn else None
+            if self._over_budget(rss):
+                self._direction = -1
+                self._samples = []
+                self._previous_rows_per_s = None
+                self._adjust(self.size / self.growth, "RSS over memory budget", None, rss)
+                return
+
+            if rows != self.size:
+                return
+            self._samples.append(rows / max(parse_s, write_s, 1e-9))
+            if len(self._samples) < self.samples_per_step:
+                return
+            rows_per_s = statistics.median(self._samples)
+            self._samples = []
+            if self.best_rows_per_s is None or rows_per_s > self.best_rows_per_s:
+                self.best_rows_per_s = rows_per_s
+            self._step(rows_per_s, rss)
+
+    def _over_budget(self, rss) -> bool:
+        return self.memory_budget_bytes is not None and rss is not None and rss > self.memory_budget_bytes
+
+    def _step(self, rows_per_s: float, rss):
+        previous = self._previous_rows_per_s
+        self._previous_rows_per_s = rows_per_s
+        if previous is None:
+            reason = "probing"
+        else:
+            change = rows_per_s / previous - 1
+            if abs(change) <= self.tolerance:
+                return   # within noise: stay at this size
+            if change < 0:
+                self._direction = -self._direction
+                reason = f"throughput {change:+.0%}, reversing"
+            else:
+                reason = f"throughput {change:+.0%}"
+
+        target = self.size * self.growth if self._direction > 0 else self.size / self.growth
+        if previous is None and self._clamp(target) == self.size:
+            # Starting at a bound (e.g. max_size = a per-file row cap): probe the other way
+            self._direction = -self._direction
+            target = self.size * self.growth if self._direction > 0 else self.size / self.growth
+            reason += " (at size bound)"
+        if target > self.size:
+            headroom_size = self._headroom_size(rss)
+            if headroom_size is not None and target > headroom_size:
+                target = headroom_size
+                reason += ", capped by memory budget"
+        self._adjust(target, reason, rows_per_s, rss)
+
+    def _headroom_size(self, rss):
+        """Largest chunk size whose in-flight chunks still fit in the memory budget."""
+        if self.memory_budget_bytes is None or rss is None or not self._bytes_per_row:
+            return None
+        extra_rows = (self.memory_budget_bytes - rss) / (self._bytes_per_row * self.in_flight_chunks)
+        return max(self.size, self.size + extra_rows)
+
+    # --- logging ---
+    def _adjust(self, target, reason: str, rows_per_s, rss):
+        new_size = self._clamp(target)
+        if new_size == self.size:
+            return
+        adjustment = BatchAdjustment(
+            chunk=self._chunks_observed,
+            old_size=self.size,
+            new_size=new_size,
+            reason=reason,
+            rows_per_s=round(rows_per_s, 1) if rows_per_s is not None else None,
+            rss_bytes=rss,
+            bytes_per_row=round(self._bytes_per_row, 1) if self._bytes_per_row else None,
+        )
+        self.size = new_size
+        self.adjustments.append(adjustment)
+
+        throughput = f", {rows_per_s:,.0f} rows/s" if rows_per_s is not None else ""
+        memory = f", RSS {rss / 1024 ** 2:,.0f} MB" if rss is not None else ""
+        print(f"  ↕ Chunk size {adjustment.old_size:,} -> {new_size:,} rows ({reason}{throughput}{memory})")
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps({"logged_at": datetime.now(timezone.utc).isoformat(), **asdict(adjustment)}) + "\n")
+
+    def as_metrics(self) -> dict:
+        return {
+            "batch_initial_size": self.initial_size,
+            "batch_final_size": self.size,
+            "batch_adjustments": len(self.adjustments),
+            "batch_best_rows_per_s": round(self.best_rows_per_s, 1) if self.best_rows_per_s else None,
+        }
+
+    def report(self):
+        print("\n--- Adaptive Chunk Size ---")
+        print(f"    Initial / final size: {self.initial_size:,} / {self.size:,} rows "
+              f"(bounds {self.min_size:,} - {self.max_size:,})")
+        best = f"{self.best_rows_per_s:,.0f} rows/s" if self.best_rows_per_s else "n/a"
+        print(f"    Adjustments: {len(self.adjustments)}, best measured throughput: {best}")
+        if self.memory_budget_bytes is not None:
+            print(f"    Memory budget: {self.memory_budget_bytes / 1024 ** 2:,.0f} MB")
+        elif self.memory_budget_disabled:
+            print("    Memory budget: disabled (no current RSS source)")
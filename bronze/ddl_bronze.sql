@@ -14,7 +14,9 @@ Columns:
     - price          : Product price
     - user_id        : Unique user identifier
     - user_session   : Session identifier
-    - loaded_at      : Timestamp when the record was loaded into this table
+    - loaded_at      : Timestamp (UTC) when the record was loaded into this
+                       table; carried into Silver, it is the watermark that
+                       lets gold.LoadFactEcommerce load only new rows
 ================================================================================
 */
 
@@ -38,7 +40,7 @@ CREATE TABLE bronze.ecommerce_behavior (
     price           DECIMAL(10,2) NULL,
     user_id         BIGINT        NULL,
     user_session    VARCHAR(36)   NULL,
-    loaded_at       DATETIME      NOT NULL DEFAULT GETDATE()
+    loaded_at       DATETIME      NOT NULL DEFAULT GETUTCDATE()
 );
 GO
 
@@ -49,3 +51,43 @@ CREATE CLUSTERED COLUMNSTORE INDEX CCI_ecommerce_behavior
 ON bronze.ecommerce_behavior;
 GO
 
+
+-- ==============================================
+-- Staging table for duplicate verification
+-- ==============================================
+-- The Bloom filter suspects of an ingest chunk (bronze/duplicate_filter.py) are
+-- staged in the session's own temp table #dedup_candidates, created on first use,
+-- so concurrent writers and shards never share (or TRUNCATE) one staging table.
+-- The shared table of earlier versions is no longer used.
+IF OBJECT_ID('bronze.dedup_candidates', 'U') IS NOT NULL
+    DROP TABLE bronze.dedup_candidates;
+GO
+
+
+-- ==============================================
+-- Reject quarantine
+-- ==============================================
+-- Source rows that violate the constraints of bronze.ecommerce_behavior
+-- (bronze/row_validation.py). Values are kept as the text that was read, with
+-- the file, the 1-based data row in the file and the reason code(s), so one
+-- bad record costs one row instead of the whole file.
+IF OBJECT_ID('bronze.ecommerce_behavior_rejects', 'U') IS NOT NULL
+    DROP TABLE bronze.ecommerce_behavior_rejects;
+GO
+
+CREATE TABLE bronze.ecommerce_behavior_rejects (
+    source_file     NVARCHAR(260)   NOT NULL,
+    source_row      BIGINT          NOT NULL,
+    reason_codes    VARCHAR(400)    NOT NULL,   -- ';'-separated, e.g. 'INVALID_EVENT_TIME;BRAND_TOO_LONG'
+    event_time      NVARCHAR(4000)  NULL,
+    event_type      NVARCHAR(4000)  NULL,
+    product_id      NVARCHAR(4000)  NULL,
+    category_id     NVARCHAR(4000)  NULL,
+    category_code   NVARCHAR(4000)  NULL,
+    brand           NVARCHAR(4000)  NULL,
+    price           NVARCHAR(4000)  NULL,
+    user_id         NVARCHAR(4000)  NULL,
+    user_session    NVARCHAR(4000)  NULL,
+    rejected_at     DATETIME        NOT NULL DEFAULT GETDATE()
+);
+GO
@@ -0,0 +1,67 @@
+/*
+===============================================================================
+Script: ddl_bronze_partitioning.sql
+Purpose: Optional monthly partitioning of bronze.ecommerce_behavior, so the
+         retention stage (bronze/retention.py) removes an archived month by
+         partition switch-out (a metadata operation) instead of DELETEs.
+         - Partition function/scheme on event_time, one partition per month
+         - Clustered columnstore index rebuilt on the partition scheme
+         - bronze.ecommerce_behavior_switch: empty switch-out target with the
+           same columns and index
+Notes:
+    - RANGE RIGHT with a boundary on the first day of every month: partition
+      n holds [boundary n-1, boundary n). Add the boundary of a new month
+      before loading it (SPLIT of an empty partition is metadata-only):
+          ALTER PARTITION SCHEME ps_bronze_event_month NEXT USED [PRIMARY];
+          ALTER PARTITION FUNCTION pf_bronze_event_month() SPLIT RANGE ('2020-06-01');
+    - Without this script the retention stage falls back to batched DELETEs.
+================================================================================
+*/
+
+-- ==============================================
+-- Partition function and scheme (one partition per event month)
+-- ==============================================
+CREATE PARTITION FUNCTION pf_bronze_event_month (DATETIME)
+AS RANGE RIGHT FOR VALUES (
+    '2019-10-01', '2019-11-01', '2019-12-01', '2020-01-01',
+    '2020-02-01', '2020-03-01', '2020-04-01', '2020-05-01'
+);
+GO
+
+CREATE PARTITION SCHEME ps_bronze_event_month
+AS PARTITION pf_bronze_event_month ALL TO ([PRIMARY]);
+GO
+
+-- ==============================================
+-- Move the columnstore onto the partition scheme
+-- ==============================================
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_ecommerce_behavior
+ON bronze.ecommerce_behavior
+WITH (DROP_EXISTING = ON)
+ON ps_bronze_event_month (event_time);
+GO
+
+-- ==============================================
+-- Switch-out target (same columns, index and filegroup; always empty)
+-- ==============================================
+IF OBJECT_ID('bronze.ecommerce_behavior_switch', 'U') IS NOT NULL
+    DROP TABLE bronze.ecommerce_behavior_switch;
+GO
+
+CREATE TABLE bronze.ecommerce_behavior_switch (
+    event_time      DATETIME      NOT NULL,
+    event_type      VARCHAR(10)   NULL,
+    product_id      BIGINT        NULL,
+    category_id     BIGINT        NULL,
+    category_code   VARCHAR(100)  NULL,
+    brand           VARCHAR(50)   NULL,
+    price           DECIMAL(10,2) NULL,
+    user_id         BIGINT        NULL,
+    user_session    VARCHAR(36)   NULL,
+    loaded_at       DATETIME      NOT NULL DEFAULT GETUTCDATE()
+) ON [PRIMARY];
+GO
+
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_ecommerce_behavior_switch
+ON bronze.ecommerce_behavior_switch;
+GO
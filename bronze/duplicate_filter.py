@@ -0,0 +1,458 @@
+"""
+================================================================================
+File: duplicate_filter.py
+Purpose: Probabilistic duplicate-event detection for the Bronze ingest. The
+         source has no event id, so every row gets a 64-bit fingerprint over
+         (event_time, event_type, product_id, user_id, user_session) that is
+         checked against a persisted, scalable Bloom filter:
+           - "not in the filter"  -> certainly new, loaded without further checks
+           - "maybe in the filter" -> suspect, verified exactly against Bronze
+                                      through a join with a staging table
+                                      private to the session
+         Only suspects ever touch Bronze, so there is no GROUP BY over the table.
+Functions:
+    - row_fingerprints()       : 64-bit fingerprint per row.
+    - BloomFilter              : Fixed-size Bloom filter on numpy bit arrays.
+    - ScalableBloomFilter      : Chain of Bloom filters that grows with the data
+                                 while keeping the overall false-positive bound.
+    - DuplicateFilterStore     : One scalable filter per event month, saved as
+                                 .npz files; only months being loaded are in memory.
+    - drop_duplicate_events()  : Removes in-file and confirmed Bronze duplicates
+                                 from a chunk before it is appended.
+    - merge_shard_filters()    : Adds the fingerprints recorded by shard-private
+                                 stores to the shared store; returns the event
+                                 times of fingerprints loaded by several shards.
+    - clear_shard_filters()    : Removes the shard-private stores once merged.
+    - remove_cross_shard_duplicates(): Exact check of those events in Bronze;
+                                 deletes all but one copy of each.
+Notes:
+    - Fingerprints are added to the filter only after their rows are written,
+      so the filter never claims rows that are not in Bronze.
+    - Suspects are staged in a temp table of the writer's own connection
+      (#dedup_candidates on SQL Server, a TEMP table on SQLite), so shards and
+      writers running in parallel do not serialize on a shared table.
+    - If the filter files are lost, duplicates of earlier loads are no longer
+      detected until the filters are rebuilt; false positives only cost an
+      extra (exact) lookup.
+    - Sharded loads give every shard a private store: it starts from the
+      shared filters (read-only, `seed_directory`), saves to its own
+      directory and records the fingerprints (and event times) it adds. Shards
+      cannot see each other's rows, so the coordinator merges the recorded
+      fingerprints once all shards are done and verifies the ones loaded by
+      more than one shard exactly against Bronze.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import math
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import DateTime, bindparam, text
+
+# =================================================
+# Configuration
+# =================================================
+FINGERPRINT_COLUMNS = ["event_time", "event_type", "product_id", "user_id", "user_session"]
+
+GROWTH_FACTOR = 2       # each new filter in the chain holds 2x the previous one
+TIGHTENING_RATIO = 0.5  # ... with half its false-positive rate
+
+# Session-local staging table per dialect: created on first use, emptied before every check
+STAGING_TABLES = {
+    "mssql": "#dedup_candidates",
+    "default": "temp.dedup_candidates",
+}
+
+STAGING_COLUMNS = """(
+    row_no          INT          NOT NULL,
+    event_time      DATETIME     NOT NULL,
+    event_type      VARCHAR(10)  NULL,
+    product_id      BIGINT       NULL,
+    user_id         BIGINT       NULL,
+    user_session    VARCHAR(36)  NULL
+)"""
+
+CREATE_STAGING_SQL = {
+    "mssql": f"IF OBJECT_ID('tempdb..#dedup_candidates') IS NULL CREATE TABLE #dedup_candidates {STAGING_COLUMNS};",
+    "default": f"CREATE TEMP TABLE IF NOT EXISTS dedup_candidates {STAGING_COLUMNS};",
+}
+
+CLEAR_STAGING_SQL = {
+    "mssql": "TRUNCATE TABLE #dedup_candidates;",
+    "default": "DELETE FROM temp.dedup_candidates;",
+}
+
+STAGE_SUSPECT_SQL = """
+INSERT INTO {table} (row_no, event_time, event_type, product_id, user_id, user_session)
+VALUES (:row_no, :event_time, :event_type, :product_id, :user_id, :user_session);
+"""
+
+# Keeps the first loaded copy of every event among the Bronze rows at the staged event times
+REMOVE_DUPLICATE_COPIES_SQL = {
+    "mssql": """
+WITH copies AS (
+    SELECT ROW_NUMBER() OVER (
+        PARTITION BY b.event_time, b.event_type, b.product_id, b.user_id, b.user_session
+        ORDER BY b.loaded_at) AS copy_no
+    FROM bronze.ecommerce_behavior b
+    WHERE b.event_time IN (SELECT event_time FROM #dedup_candidates)
+)
+DELETE FROM copies WHERE copy_no > 1;
+""",
+    "default": """
+DELETE FROM bronze.ecommerce_behavior
+WHERE rowid IN (
+    SELECT copy_rowid FROM (
+        SELECT b.rowid AS copy_rowid, ROW_NUMBER() OVER (
+            PARTITION BY b.event_time, b.event_type, b.product_id, b.user_id, b.user_session
+            ORDER BY b.loaded_at, b.rowid) AS copy_no
+        FROM bronze.ecommerce_behavior b
+        WHERE b.event_time IN (SELECT event_time FROM temp.dedup_candidates)
+    ) WHERE copy_no > 1
+);
+""",
+}
+
+VERIFY_SUSPECTS_QUERY = """
+SELECT DISTINCT c.row_no
+FROM {table} c
+JOIN bronze.ecommerce_behavior b
+    ON  b.event_time = c.event_time
+    AND (b.event_type = c.event_type OR (b.event_type IS NULL AND c.event_type IS NULL))
+    AND (b.product_id = c.product_id OR (b.product_id IS NULL AND c.product_id IS NULL))
+    AND (b.user_id = c.user_id OR (b.user_id IS NULL AND c.user_id IS NULL))
+    AND (b.user_session = c.user_session OR (b.user_session IS NULL AND c.user_session IS NULL));
+"""
+
+
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """64-bit fingerprint of each row over FINGERPRINT_COLUMNS (NaN-safe, categorical-safe)."""
+    return pd.util.hash_pandas_object(df[FINGERPRINT_COLUMNS], index=False).to_numpy(dtype=np.uint64)
+
+
+def month_keys(event_time: pd.Series) -> np.ndarray:
+    """Event month of each row as YYYYMM."""
+    return (event_time.dt.year * 100 + event_time.dt.month).to_numpy()
+
+
+# =================================================
+# Bloom Filters
+# =================================================
+class BloomFilter:
+    """Bloom filter sized for `capacity` items at `error_rate`, using double hashing."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: np.ndarray = None, count: int = 0):
+        self.capacity = int(capacity)
+        self.error_rate = float(error_rate)
+        self.num_bits = max(64, int(math.ceil(-self.capacity * math.log(self.error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = int(count)
+
+    def _positions(self, fingerprints: np.ndarray):
+        # Kirsch-Mitzenmacher: position_i = h1 + i * h2 (mod m), one probe at a time
+        h1 = fingerprints & np.uint64(0xFFFFFFFF)
+        h2 = (fingerprints >> np.uint64(32)) | np.uint64(1)
+        m = np.uint64(self.num_bits)
+        for i in range(self.num_hashes):
+            yield (h1 + np.uint64(i) * h2) % m
+
+    def contains(self, fingerprints: np.ndarray) -> np.ndarray:
+        result = np.ones(len(fingerprints), dtype=bool)
+        for pos in self._positions(fingerprints):
+            result &= ((self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1).astype(bool)
+        return result
+
+    def add(self, fingerprints: np.ndarray):
+        for pos in self._positions(fingerprints):
+            np.bitwise_or.at(self.bits, pos >> np.uint64(3), (1 << (pos & np.uint64(7))).astype(np.uint8))
+        self.count += len(fingerprints)
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def estimated_error_rate(self) -> float:
+        """False-positive rate at the current fill level."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class ScalableBloomFilter:
+    """
+    Chain of Bloom filters (Almeida et al.). When the last filter is full a
+    new one with GROWTH_FACTOR x the capacity and TIGHTENING_RATIO x the error
+    rate is added, so the overall false-positive rate stays below `error_rate`
+    however many items are inserted.
+    """
+
+    def __init__(self, error_rate: float = 0.001, initial_capacity: int = 1_000_000, filters=None):
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.filters = filters or []
+
+    def contains(self, fingerprints: np.ndarray) -> np.ndarray:
+        result = np.zeros(len(fingerprints), dtype=bool)
+        for bloom in self.filters:
+            unresolved = ~result
+            if not unresolved.any():
+                break
+            result[unresolved] = bloom.contains(fingerprints[unresolved])
+        return result
+
+    def _new_filter(self) -> BloomFilter:
+        n = len(self.filters)
+        return BloomFilter(
+            capacity=self.initial_capacity * GROWTH_FACTOR ** n,
+            # sum over the chain of p0 * r^i stays below error_rate
+            error_rate=self.error_rate * (1 - TIGHTENING_RATIO) * TIGHTENING_RATIO ** n,
+        )
+
+    def add(self, fingerprints: np.ndarray):
+        fingerprints = np.unique(fingerprints)
+        while len(fingerprints):
+            if not self.filters or self.filters[-1].is_full:
+                self.filters.append(self._new_filter())
+            bloom = self.filters[-1]
+            room = bloom.capacity - bloom.count
+            bloom.add(fingerprints[:room])
+            fingerprints = fingerprints[room:]
+
+    @property
+    def count(self) -> int:
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.bits.nbytes for bloom in self.filters)
+
+    def estimated_error_rate(self) -> float:
+        return 1 - math.prod(1 - bloom.estimated_error_rate() for bloom in self.filters)
+
+    # --- persistence ---
+    def save(self, path):
+        """Saves the chain to a compressed .npz file (written atomically)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "config": np.array([self.error_rate, self.initial_capacity], dtype=np.float64),
+            "capacities": np.array([b.capacity for b in self.filters], dtype=np.int64),
+            "error_rates": np.array([b.error_rate for b in self.filters], dtype=np.float64),
+            "counts": np.array([b.count for b in self.filters], dtype=np.int64),
+        }
+        for i, bloom in enumerate(self.filters):
+            arrays[f"bits_{i}"] = bloom.bits
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(fh, **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path) -> "ScalableBloomFilter":
+        with np.load(path) as data:
+            error_rate, initial_capacity = data["config"]
+            filters = [
+                BloomFilter(capacity, rate, bits=data[f"bits_{i}"], count=count)
+                for i, (capacity, rate, count) in enumerate(zip(data["capacities"], data["error_rates"], data["counts"]))
+            ]
+        return cls(float(error_rate), int(initial_capacity), filters)
+
+
+# =================================================
+# Per-Month Filter Store
+# =================================================
+class DuplicateFilterStore:
+    """
+    One ScalableBloomFilter per event month, stored as
+    `<directory>/bloom_<YYYY-MM>.npz` and loaded on first use. With a
+    `seed_directory` (shard-private store) a month not yet saved in
+    `directory` starts from the filter in `seed_directory`, and every added
+    fingerprint is also recorded in `<directory>/added_<YYYY-MM>_<n>.npz`
+    (a new file per save).
+    """
+
+    def __init__(self, directory: str, error_rate: float = 0.001, initial_capacity: int = 1_000_000,
+                 seed_directory: str = None):
+        self.directory = Path(directory)
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.seed_directory = Path(seed_directory) if seed_directory else None
+        self.filters = {}
+        self.added = {}     # month -> [(fingerprints, event times)] added in this run (seeded stores only)
+
+    @staticmethod
+    def _month_name(month: int) -> str:
+        return f"{month // 100}-{month % 100:02d}"
+
+    def _path(self, month: int, directory: Path = None) -> Path:
+        return (directory or self.directory) / f"bloom_{self._month_name(month)}.npz"
+
+    def _added_path(self, month: int) -> Path:
+        saved = len(list(self.directory.glob(f"added_{self._month_name(month)}_*.npz")))
+        return self.directory / f"added_{self._month_name(month)}_{saved}.npz"
+
+    def _filter(self, month: int) -> ScalableBloomFilter:
+        if month not in self.filters:
+            path = self._path(month)
+            if not path.exists() and self.seed_directory is not None:
+                path = self._path(month, self.seed_directory)
+            if path.exists():
+                self.filters[month] = ScalableBloomFilter.load(path)
+            else:
+                self.filters[month] = ScalableBloomFilter(self.error_rate, self.initial_capacity)
+        return self.filters[month]
+
+    def might_contain(self, months: np.ndarray, fingerprints: np.ndarray) -> np.ndarray:
+        result = np.zeros(len(fingerprints), dtype=bool)
+        for month in np.unique(months):
+            mask = months == month
+            result[mask] = self._filter(int(month)).contains(fingerprints[mask])
+        return result
+
+    def add(self, months: np.ndarray, fingerprints: np.ndarray, event_times: np.ndarray = None):
+        for month in np.unique(months):
+            mask = months == month
+            self._filter(int(month)).add(fingerprints[mask])
+            if self.seed_directory is not None:
+                self.added.setdefault(int(month), []).append((fingerprints[mask], event_times[mask]))
+
+    def save(self):
+        for month, bloom in self.filters.items():
+            bloom.save(self._path(month))
+        for month, batches in self.added.items():
+            np.savez_compressed(
+                self._added_path(month),
+                fingerprints=np.concatenate([fingerprints for fingerprints, _ in batches]),
+                event_times=np.concatenate([times for _, times in batches]).astype("datetime64[ns]"),
+            )
+        self.added = {}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for bloom in self.filters.values())
+
+    def report(self):
+        """Prints fill level, memory and estimated false-positive rate per month."""
+        print("\n--- Duplicate Filter (per event month) ---")
+        for month, bloom in sorted(self.filters.items()):
+            print(f"    {month // 100}-{month % 100:02d}: {bloom.count:>12,} fingerprints  "
+                  f"{bloom.nbytes / 1024 ** 2:>8.2f} MB  {len(bloom.filters)} filter(s)  "
+                  f"est. FP rate {bloom.estimated_error_rate():.2e} (target {bloom.error_rate:.0e})")
+        print(f"    Total filter memory: {self.nbytes / 1024 ** 2:.2f} MB")
+
+
+# =================================================
+# Shard Merge
+# =================================================
+def merge_shard_filters(store: DuplicateFilterStore, shards_directory) -> np.ndarray:
+    """
+    Adds the fingerprints recorded under `shards_directory` (one subfolder per
+    shard, any number of attempt folders below it) to `store`. Returns the
+    distinct event times of the fingerprints recorded by more than one shard
+    (cross-shard suspects). Save `store` and clear the folder afterwards.
+    """
+    shards_directory = Path(shards_directory)
+    by_month = {}   # month -> [(fingerprints, event times, shard number)]
+    shard_dirs = sorted(p for p in shards_directory.iterdir() if p.is_dir()) if shards_directory.exists() else []
+    for shard_no, shard_dir in enumerate(shard_dirs):
+        for added_path in sorted(shard_dir.glob("*/added_*.npz")):
+            year, month = added_path.stem.split("_")[1].split("-")
+            with np.load(added_path) as data:
+                by_month.setdefault(int(year) * 100 + int(month), []).append(
+                    (data["fingerprints"], data["event_times"], shard_no))
+
+    suspect_times = []
+    for month, batches in by_month.items():
+        fingerprints = np.concatenate([f for f, _, _ in batches])
+        event_times = np.concatenate([t for _, t, _ in batches])
+        shard_nos = np.concatenate([np.full(len(f), n) for f, _, n in batches])
+        store.add(np.full(len(fingerprints), month), fingerprints)
+        # A fingerprint recorded by two shards may be one event loaded twice
+        pairs = np.unique(np.stack([fingerprints.view(np.int64), shard_nos]), axis=1)
+        shared, counts = np.unique(pairs[0], return_counts=True)
+        suspect = np.isin(fingerprints.view(np.int64), shared[counts > 1])
+        suspect_times.append(event_times[suspect])
+    return np.unique(np.concatenate(suspect_times)) if suspect_times else np.zeros(0, dtype="datetime64[ns]")
+
+
+def clear_shard_filters(shards_directory):
+    shutil.rmtree(shards_directory, ignore_errors=True)
+
+
+def remove_cross_shard_duplicates(conn, event_times: np.ndarray) -> int:
+    """
+    Exact check of cross-shard suspects: deletes every copy but the first
+    loaded one of each event in Bronze at `event_times`. Returns rows deleted.
+    """
+    if len(event_times) == 0:
+        return 0
+    staged = pd.DataFrame({"row_no": np.arange(len(event_times)), "event_time": pd.to_datetime(event_times)})
+    for column in FINGERPRINT_COLUMNS[1:]:
+        staged[column] = None
+    _stage_suspects(conn, staged)
+    return conn.execute(text(_dialect_sql(REMOVE_DUPLICATE_COPIES_SQL, conn))).rowcount
+
+
+# =================================================
+# Ingest Integration
+# =================================================
+def _dialect_sql(statements: dict, conn) -> str:
+    return statements.get(conn.dialect.name, statements["default"])
+
+
+def _stage_suspects(conn, staged: pd.DataFrame):
+    """Empties the session's staging table (creating it on first use) and inserts `staged`."""
+    conn.execute(text(_dialect_sql(CREATE_STAGING_SQL, conn)))
+    conn.execute(text(_dialect_sql(CLEAR_STAGING_SQL, conn)))
+    records = staged.astype(object).where(staged.notna(), None).to_dict("records")
+    # Typed like Bronze's event_time, so the join compares equal values on every dialect
+    insert = text(STAGE_SUSPECT_SQL.format(table=_dialect_sql(STAGING_TABLES, conn))).bindparams(
+        bindparam("event_time", type_=DateTime()))
+    conn.execute(insert, records)
+
+
+def verify_suspects(conn, suspects: pd.DataFrame) -> np.ndarray:
+    """
+    Exact check of suspected duplicates: stages them and joins them to Bronze
+    on the fingerprint columns. Returns a boolean array (True = already in Bronze).
+    """
+    if suspects.empty:
+        return np.zeros(0, dtype=bool)
+    staged = suspects[FINGERPRINT_COLUMNS].copy()
+    staged.insert(0, "row_no", np.arange(len(staged)))
+    _stage_suspects(conn, staged)
+    query = VERIFY_SUSPECTS_QUERY.format(table=_dialect_sql(STAGING_TABLES, conn))
+    found = [row.row_no for row in conn.execute(text(query))]
+    confirmed = np.zeros(len(staged), dtype=bool)
+    confirmed[found] = True
+    return confirmed
+
+
+def drop_duplicate_events(conn, df: pd.DataFrame, store: DuplicateFilterStore, recheck: bool = False):
+    """
+    Removes rows of `df` that repeat earlier rows of the same chunk or rows
+    already in Bronze. Returns (new rows, their months, their fingerprints,
+    stats); add the months/fingerprints to `store` once the rows are written.
+    With `recheck` every row is verified against Bronze, for re-runs of a load
+    that may have committed rows the saved filter does not know.
+    """
+    fingerprints = row_fingerprints(df)
+    months = month_keys(df["event_time"])
+    in_chunk = df.duplicated(subset=FINGERPRINT_COLUMNS).to_numpy()
+
+    suspect = (store.might_contain(months, fingerprints) | recheck) & ~in_chunk
+    confirmed = np.zeros(len(df), dtype=bool)
+    confirmed[suspect] = verify_suspects(conn, df[suspect])
+
+    keep = ~(in_chunk | confirmed)
+    stats = {
+        "suspects": int(suspect.sum()),
+        "confirmed": int(confirmed.sum()),
+        "false_positives": int(suspect.sum() - confirmed.sum()),
+        "in_chunk": int(in_chunk.sum()),
+    }
+    return df[keep], months[keep], fingerprints[keep], stats
@@ -0,0 +1,175 @@
+"""
+================================================================================
+File: ingest_pipeline.py
+Purpose: Asyncio producer/consumer pipeline for the Bronze ingest, so parsing
+         the next chunk overlaps with writing the previous one:
+           - the producer parses chunks on a parser thread (executor) and puts
+             them on a bounded queue; a full queue blocks it (backpressure)
+           - one or more writer coroutines take chunks off the queue and write
+             them on a writer thread pool
+         Queue depth and the time each side spends stalled are measured, so the
+         overlap (and which side is the bottleneck) is visible.
+Functions:
+    - IngestStats            : Counters collected while the pipeline runs.
+    - run_ingest_pipeline()  : Runs the pipeline over a list of files; an
+                               optional observer gets each chunk's parse and
+                               write time (used for adaptive chunk sizing).
+Notes:
+    - Work submitted to the executors runs in a copy of the caller's context
+      (contextvars.copy_context), so per-stage telemetry keeps attributing
+      rows and database time to the calling task.
+    - Errors are recorded per file (parsing) or per chunk (writing) in
+      IngestStats.failures; the pipeline continues with the next file /
+      chunk, so one run reports every failure, and the caller fails the load
+      once the run is done (a chunk that failed to write is not in Bronze).
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# =================================================
+# Pipeline Statistics
+# =================================================
+@dataclass
+class IngestStats:
+    chunks_parsed: int = 0
+    chunks_written: int = 0
+    parse_s: float = 0.0            # time spent parsing (parser thread)
+    write_s: float = 0.0            # time spent writing (writer threads, summed)
+    producer_stall_s: float = 0.0   # producer blocked on a full queue -> writers are the bottleneck
+    writer_stall_s: float = 0.0     # writers waiting on an empty queue -> parsing is the bottleneck
+    max_queue_depth: int = 0
+    queue_depth_total: int = 0
+    queue_depth_samples: int = 0
+    failures: list = field(default_factory=list)   # "<file>: <error>" per failed file / chunk
+
+    def sample_depth(self, depth: int):
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.queue_depth_total += depth
+        self.queue_depth_samples += 1
+
+    @property
+    def mean_queue_depth(self) -> float:
+        return self.queue_depth_total / self.queue_depth_samples if self.queue_depth_samples else 0.0
+
+    def as_metrics(self) -> dict:
+        return {
+            "ingest_chunks": self.chunks_written,
+            "ingest_parse_s": round(self.parse_s, 4),
+            "ingest_write_s": round(self.write_s, 4),
+            "ingest_producer_stall_s": round(self.producer_stall_s, 4),
+            "ingest_writer_stall_s": round(self.writer_stall_s, 4),
+            "ingest_max_queue_depth": self.max_queue_depth,
+            "ingest_mean_queue_depth": round(self.mean_queue_depth, 2),
+            "ingest_failures": len(self.failures),
+        }
+
+    def report(self):
+        print("\n--- Ingest Pipeline ---")
+        print(f"    Chunks parsed / written: {self.chunks_parsed} / {self.chunks_written}")
+        print(f"    Parse time: {self.parse_s:.2f}s, write time: {self.write_s:.2f}s")
+        print(f"    Producer stalled (queue full): {self.producer_stall_s:.2f}s, "
+              f"writers stalled (queue empty): {self.writer_stall_s:.2f}s")
+        print(f"    Queue depth: max {self.max_queue_depth}, mean {self.mean_queue_depth:.2f}")
+        if self.failures:
+            print(f"    Failures: {len(self.failures)}")
+            for failure in self.failures:
+                print(f"      - {failure}")
+
+
+# =================================================
+# Producer / Consumers
+# =================================================
+def _in_executor(loop, executor, fn, *args):
+    # A fresh context copy per call: one Context cannot be entered by two threads at once
+    context = contextvars.copy_context()
+    return loop.run_in_executor(executor, functools.partial(context.run, fn, *args))
+
+
+async def _producer(loop, executor, file_paths, read_chunks, queue, stats, n_writers):
+    for file_path in file_paths:
+        chunks = None
+        try:
+            chunks = await _in_executor(loop, executor, read_chunks, file_path)
+            while True:
+                start = time.perf_counter()
+                chunk = await _in_executor(loop, executor, next, chunks, None)
+                parse_s = time.perf_counter() - start
+                stats.parse_s += parse_s
+                if chunk is None:
+                    break
+                stats.chunks_parsed += 1
+
+                start = time.perf_counter()
+                await queue.put((file_path, chunk, parse_s))
+                stats.producer_stall_s += time.perf_counter() - start
+                stats.sample_depth(queue.qsize())
+        except Exception as e:
+            print(f"❌ ERROR processing {Path(file_path).name}: {e}. Continuing with the next file.")
+            stats.failures.append(f"{Path(file_path).name}: {e}")
+        finally:
+            if chunks is not None and hasattr(chunks, "close"):
+                await _in_executor(loop, executor, chunks.close)
+    for _ in range(n_writers):
+        await queue.put(None)
+
+
+async def _writer(loop, executor, write_chunk, observe_chunk, queue, stats):
+    while True:
+        start = time.perf_counter()
+        item = await queue.get()
+        stats.writer_stall_s += time.perf_counter() - start
+        stats.sample_depth(queue.qsize())
+        if item is None:
+            return
+        file_path, chunk, parse_s = item
+        start = time.perf_counter()
+        try:
+            await _in_executor(loop, executor, write_chunk, file_path, chunk)
+            stats.chunks_written += 1
+        except Exception as e:
+            print(f"❌ ERROR writing a chunk of {Path(file_path).name}: {e}. Continuing with the next chunk.")
+            stats.failures.append(f"{Path(file_path).name} (chunk not written): {e}")
+            continue
+        finally:
+            write_s = time.perf_counter() - start
+            stats.write_s += write_s
+        if observe_chunk is not None:
+            observe_chunk(chunk, parse_s, write_s)
+
+
+async def _run(file_paths, read_chunks, write_chunk, observe_chunk, queue_size, writers):
+    loop = asyncio.get_running_loop()
+    stats = IngestStats()
+    queue = asyncio.Queue(maxsize=queue_size)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-parse") as parse_executor, \
+            ThreadPoolExecutor(max_workers=writers, thread_name_prefix="ingest-write") as write_executor:
+        await asyncio.gather(
+            _producer(loop, parse_executor, file_paths, read_chunks, queue, stats, writers),
+            *(_writer(loop, write_executor, write_chunk, observe_chunk, queue, stats) for _ in range(writers)),
+        )
+    return stats
+
+
+def run_ingest_pipeline(file_paths, read_chunks, write_chunk, queue_size: int = 4, writers: int = 1,
+                        observe_chunk=None) -> IngestStats:
+    """
+    Parses and writes `file_paths` concurrently.
+      - read_chunks(file_path) -> iterator of parsed chunks (runs on the parser thread)
+      - write_chunk(file_path, chunk) writes one chunk (runs on a writer thread)
+      - observe_chunk(chunk, parse_s, write_s), optional, is called after each
+        successful write with that chunk's parse and write time
+    At most `queue_size` parsed chunks wait in memory. Returns the IngestStats;
+    files and chunks that failed are listed in its `failures`.
+    """
+    return asyncio.run(_run(file_paths, read_chunks, write_chunk, observe_chunk, queue_size, max(1, writers)))
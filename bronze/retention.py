@@ -0,0 +1,355 @@
+"""
+================================================================================
+File: retention.py
+Purpose: Retention for bronze.ecommerce_behavior. Event months that Silver and
+         Gold have consumed are archived to compressed Parquet files on local
+         disk and removed from the live table, so the full Silver reload
+         (silver.LoadEcommerceBehavior) only re-scans the recent months:
+           - archive: rows of one month -> <archive_dir>/event_month=YYYY-MM/part-0.parquet
+           - removal: partition switch-out when the month is a partition of
+             its own (ddl_bronze_partitioning.sql), otherwise batched DELETEs
+           - restore: archived months are inserted back for reprocessing
+Functions:
+    - bronze_month_counts()      : Bronze rows per event month.
+    - consumed_months()          : Months fully present in Silver and loaded into the Gold fact.
+    - archive_month()            : Archives one month and removes it from Bronze.
+    - restore_month()            : Inserts an archived month back into Bronze.
+    - load_manifest()            : Archived / restored months and their files.
+Notes:
+    - A month counts as consumed when Silver holds as many rows of it as
+      Bronze (Silver is a 1:1 reload of Bronze) and none of its Bronze rows
+      is newer than the fact load watermark (the latest
+      gold.fact_load_batches.source_loaded_through); months with rows still
+      in flight are never archived.
+    - Restored rows keep their original loaded_at, which is behind the fact
+      watermark: they re-enter Silver, but are not loaded into the fact again.
+    - The file is written and its row count checked before anything is
+      removed; rows loaded into an archived month while it is being archived
+      (loaded_at after the archived rows) stay in Bronze.
+    - The duplicate filter still knows archived events, but its exact check
+      reads Bronze: restore a month before loading its source files again.
+    - Needs the optional 'pyarrow' package.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import json
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # archiving unavailable
+    pa = None
+
+# =================================================
+# Configuration
+# =================================================
+BRONZE_TABLE = "bronze.ecommerce_behavior"
+SWITCH_TABLE = "bronze.ecommerce_behavior_switch"
+MANIFEST_NAME = "_manifest.json"
+
+BRONZE_COLUMNS = [
+    "event_time", "event_type", "product_id", "category_id", "category_code",
+    "brand", "price", "user_id", "user_session", "loaded_at",
+]
+
+# Rows per event month (YEAR/MONTH of the month column), per dialect
+MONTH_COUNT_QUERIES = {
+    "mssql": "SELECT YEAR({column}) AS y, MONTH({column}) AS m, COUNT_BIG(*) AS row_count "
+             "FROM {table} GROUP BY YEAR({column}), MONTH({column});",
+    "default": "SELECT CAST(strftime('%Y', {column}) AS INTEGER) AS y, CAST(strftime('%m', {column}) AS INTEGER) AS m, "
+               "COUNT(*) AS row_count FROM {table} GROUP BY 1, 2;",
+}
+
+# Latest Bronze load of the month vs. the Gold fact load watermark
+MONTH_LOADED_THROUGH_QUERY = f"SELECT MAX(loaded_at) FROM {BRONZE_TABLE} WHERE event_time >= :start AND event_time < :end;"
+FACT_WATERMARK_QUERY = "SELECT MAX(source_loaded_through) FROM gold.fact_load_batches;"
+
+MONTH_ROWS_QUERY = f"""
+SELECT {", ".join(BRONZE_COLUMNS)}
+FROM {BRONZE_TABLE}
+WHERE event_time >= :start AND event_time < :end
+ORDER BY event_time;
+"""
+
+MONTH_REMAINING_QUERY = f"SELECT COUNT(*) FROM {BRONZE_TABLE} WHERE event_time >= :start AND event_time < :end;"
+
+DELETE_BATCH_QUERIES = {
+    "mssql": f"""
+    DELETE TOP (:batch_rows) FROM {BRONZE_TABLE}
+    WHERE event_time >= :start AND event_time < :end AND loaded_at <= :archived_through;
+    """,
+    "default": f"""
+    DELETE FROM {BRONZE_TABLE} WHERE rowid IN (
+        SELECT rowid FROM {BRONZE_TABLE}
+        WHERE event_time >= :start AND event_time < :end AND loaded_at <= :archived_through
+        LIMIT :batch_rows
+    );
+    """,
+}
+
+# Partitions of Bronze with their partition function, if Bronze is partitioned (SQL Server)
+PARTITION_QUERY = """
+SELECT pf.name AS function_name, p.partition_number, p.rows
+FROM sys.indexes i
+JOIN sys.partition_schemes ps ON ps.data_space_id = i.data_space_id
+JOIN sys.partition_functions pf ON pf.function_id = ps.function_id
+JOIN sys.partitions p ON p.object_id = i.object_id AND p.index_id = i.index_id
+WHERE i.object_id = OBJECT_ID(:table_name) AND i.index_id IN (0, 1);
+"""
+
+
+def _schema():
+    return pa.schema([
+        ("event_time", pa.timestamp("ms")),
+        ("event_type", pa.string()),
+        ("product_id", pa.int64()),
+        ("category_id", pa.int64()),
+        ("category_code", pa.string()),
+        ("brand", pa.string()),
+        ("price", pa.decimal128(10, 2)),
+        ("user_id", pa.int64()),
+        ("user_session", pa.string()),
+        ("loaded_at", pa.timestamp("ms")),
+    ])
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Bronze archiving requires the 'pyarrow' package (pip install pyarrow).")
+
+
+# =================================================
+# Months
+# =================================================
+def month_bounds(month: str):
+    """'YYYY-MM' -> (first day, first day of the next month)."""
+    start = date.fromisoformat(f"{month}-01")
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def _datetime_bounds(month: str):
+    start, end = month_bounds(month)
+    return datetime(start.year, start.month, 1), datetime(end.year, end.month, 1)
+
+
+def _month_counts(conn, table: str, column: str) -> dict:
+    query = MONTH_COUNT_QUERIES.get(conn.dialect.name, MONTH_COUNT_QUERIES["default"])
+    rows = conn.execute(text(query.format(table=table, column=column)))
+    return {f"{row.y:04d}-{row.m:02d}": row.row_count for row in rows if row.y is not None}
+
+
+def bronze_month_counts(conn) -> dict:
+    """Bronze rows per event month ('YYYY-MM' -> rows), in month order."""
+    return dict(sorted(_month_counts(conn, BRONZE_TABLE, "event_time").items()))
+
+
+def _as_datetime(value):
+    # SQLite returns DATETIME columns as text
+    return value if value is None or isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def consumed_months(conn, months) -> list:
+    """
+    The months (of `months`, 'YYYY-MM' -> Bronze rows) whose Bronze rows are
+    all in Silver and were all loaded before the Gold fact load watermark.
+    """
+    watermark = _as_datetime(conn.execute(text(FACT_WATERMARK_QUERY)).scalar())
+    if watermark is None:
+        return []
+    silver_counts = _month_counts(conn, "silver.ecommerce_behavior", "event_date")
+    consumed = []
+    for month, bronze_rows in months.items():
+        if silver_counts.get(month, 0) < bronze_rows:
+            continue
+        start, end = _datetime_bounds(month)
+        loaded_through = _as_datetime(
+            conn.execute(text(MONTH_LOADED_THROUGH_QUERY), {"start": start, "end": end}).scalar())
+        if loaded_through is not None and loaded_through <= watermark:
+            consumed.append(month)
+    return consumed
+
+
+# =================================================
+# Manifest
+# =================================================
+def load_manifest(archive_dir) -> dict:
+    path = Path(archive_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _update_manifest(archive_dir, month: str, **entry):
+    archive_dir = Path(archive_dir)
+    manifest = load_manifest(archive_dir)
+    manifest.setdefault(month, {}).update(entry, updated_at=datetime.now(timezone.utc).isoformat())
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(dict(sorted(manifest.items())), fh, indent=2, default=str)
+    tmp_path.replace(path)
+
+
+def _archive_path(archive_dir, month: str) -> Path:
+    return Path(archive_dir) / f"event_month={month}" / "part-0.parquet"
+
+
+# =================================================
+# Archive
+# =================================================
+def _column_array(values, arrow_type):
+    """Arrow array of `values` as `arrow_type` (drivers return timestamps as text, decimals as float)."""
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array(values)
+        if pa.types.is_string(array.type) and pa.types.is_timestamp(arrow_type):
+            return pa.array([datetime.fromisoformat(value) if value is not None else None for value in values],
+                            type=arrow_type)
+        return array.cast(arrow_type)
+
+
+def _write_month(conn, month: str, path: Path, chunksize: int, compression: str):
+    """Streams the month's Bronze rows into `path`. Returns (rows, latest loaded_at)."""
+    schema = _schema()
+    start, end = _datetime_bounds(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows_written, archived_through = 0, None
+    result = conn.execution_options(stream_results=True, yield_per=chunksize).execute(
+        text(MONTH_ROWS_QUERY), {"start": start, "end": end}
+    )
+    with pq.ParquetWriter(tmp_path, schema, compression=compression, write_statistics=True) as writer:
+        for rows in result.partitions(chunksize):
+            columns = list(zip(*rows))
+            batch = pa.RecordBatch.from_arrays(
+                [_column_array(list(values), field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+            writer.write_batch(batch)
+            rows_written += batch.num_rows
+            latest = max(value for value in columns[-1] if value is not None)
+            archived_through = latest if archived_through is None else max(archived_through, latest)
+    tmp_path.replace(path)
+    if isinstance(archived_through, datetime):
+        # Text the DATETIME column converts back exactly (it is also kept in the manifest)
+        archived_through = archived_through.isoformat(sep=" ", timespec="milliseconds")
+    return rows_written, archived_through
+
+
+def _month_partition(conn, month: str, month_rows: int):
+    """Number of the Bronze partition that holds exactly this month, or None."""
+    if conn.dialect.name != "mssql":
+        return None
+    partitions = conn.execute(text(PARTITION_QUERY), {"table_name": BRONZE_TABLE}).fetchall()
+    if not partitions:
+        return None
+    function_name = partitions[0].function_name
+    start, end = _datetime_bounds(month)
+    first, last = conn.execute(
+        text(f"SELECT $PARTITION.{function_name}(:start), $PARTITION.{function_name}(DATEADD(ms, -3, :end))"),
+        {"start": start, "end": end},
+    ).fetchone()
+    rows = {p.partition_number: p.rows for p in partitions}
+    # One partition for the whole month and nothing else in it
+    if first != last or rows.get(first) != month_rows:
+        return None
+    return first
+
+
+def _remove_month(engine, month: str, rows_archived: int, archived_through, delete_batch_rows: int) -> str:
+    """Removes the archived rows from Bronze. Returns the method used."""
+    start, end = _datetime_bounds(month)
+    with engine.begin() as conn:
+        partition = _month_partition(conn, month, rows_archived)
+        if partition is not None:
+            # Metadata-only: the partition moves to the empty switch table, which is then truncated
+            conn.execute(text(f"ALTER TABLE {BRONZE_TABLE} SWITCH PARTITION {int(partition)} TO {SWITCH_TABLE};"))
+            conn.execute(text(f"TRUNCATE TABLE {SWITCH_TABLE};"))
+            return f"partition switch (partition {partition})"
+
+    # Small batches keep each transaction (and its log) short on a live table
+    dialect = engine.dialect.name
+    query = text(DELETE_BATCH_QUERIES.get(dialect, DELETE_BATCH_QUERIES["default"]))
+    params = {"start": start, "end": end, "archived_through": archived_through, "batch_rows": delete_batch_rows}
+    batches = 0
+    while True:
+        with engine.begin() as conn:
+            deleted = conn.execute(query, params).rowcount
+        if not deleted:
+            break
+        batches += 1
+    return f"batched DELETE ({batches} batch(es) of up to {delete_batch_rows:,} rows)"
+
+
+def archive_month(engine, month: str, archive_dir, chunksize: int = 500_000, compression: str = "zstd",
+                  delete_batch_rows: int = 100_000) -> dict:
+    """
+    Archives the Bronze rows of `month` ('YYYY-MM') to Parquet, checks the
+    file and removes the rows from Bronze. Returns the manifest entry.
+    """
+    _require_pyarrow()
+    path = _archive_path(archive_dir, month)
+    start, end = _datetime_bounds(month)
+    entry = load_manifest(archive_dir).get(month, {})
+    if entry.get("status") == "archiving":
+        # An earlier run wrote the file but was interrupted while removing: the file is
+        # complete and Bronze may be partly deleted, so only finish the removal
+        rows_archived, archived_through = entry["rows"], entry["archived_through"]
+    else:
+        with engine.connect() as conn:
+            rows_archived, archived_through = _write_month(conn, month, path, chunksize, compression)
+        if pq.ParquetFile(path).metadata.num_rows != rows_archived:
+            raise IOError(f"Archive file {path} does not hold the {rows_archived} rows written; Bronze left unchanged.")
+        _update_manifest(archive_dir, month, status="archiving", file=path.relative_to(archive_dir).as_posix(),
+                         rows=rows_archived, archived_through=archived_through)
+
+    method = _remove_month(engine, month, rows_archived, archived_through, delete_batch_rows)
+    with engine.connect() as conn:
+        remaining = conn.execute(text(MONTH_REMAINING_QUERY), {"start": start, "end": end}).scalar()
+    entry = {"status": "archived", "rows": rows_archived, "removal": method, "rows_left_in_bronze": remaining,
+             "archived_at": datetime.now(timezone.utc).isoformat()}
+    _update_manifest(archive_dir, month, **entry)
+    return entry
+
+
+# =================================================
+# Restore
+# =================================================
+def restore_month(engine, month: str, archive_dir, chunksize: int = 500_000) -> int:
+    """
+    Inserts the archived rows of `month` back into Bronze (with their original
+    loaded_at). Refuses if Bronze already has rows of that month. Returns the
+    rows restored.
+    """
+    _require_pyarrow()
+    entry = load_manifest(archive_dir).get(month)
+    if entry is None or entry.get("status") not in ("archived", "archiving"):
+        raise ValueError(f"Month {month} is not archived in {archive_dir}.")
+    if entry["status"] == "archiving":
+        raise ValueError(f"Archiving {month} was interrupted; run the retention stage again to finish it, then restore.")
+    start, end = _datetime_bounds(month)
+    path = Path(archive_dir) / entry["file"]
+
+    with engine.begin() as conn:
+        present = conn.execute(text(MONTH_REMAINING_QUERY), {"start": start, "end": end}).scalar()
+        if present:
+            raise ValueError(f"Bronze already holds {present} rows of {month}; restoring would duplicate them.")
+        rows_restored = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            df = batch.to_pandas()
+            df = df.astype({"price": "float64"}).where(df.notna(), None)
+            df.to_sql(name="ecommerce_behavior", schema="bronze", con=conn, if_exists="append", index=False)
+            rows_restored += len(df)
+    _update_manifest(archive_dir, month, status="restored", restored_at=datetime.now(timezone.utc).isoformat())
+    return rows_restored
@@ -0,0 +1,233 @@
+"""
+================================================================================
+File: row_validation.py
+Purpose: Vectorized row-level validation of parsed source chunks against the
+         constraints of bronze.ecommerce_behavior (ddl_bronze.sql), so a bad
+         record costs one row instead of the whole file:
+           - valid rows are returned typed and ready for the Bronze insert
+           - invalid rows are returned as text, with the source file, their
+             row number in the file and the reason code(s), for
+             bronze.ecommerce_behavior_rejects
+Functions:
+    - validate_chunk()        : Splits a parsed chunk into valid rows and rejects.
+    - write_rejects()         : Appends rejects to bronze.ecommerce_behavior_rejects.
+    - reject_reason_counts()  : Rejected rows per reason code.
+Reason codes (a row may have several, separated by ';'):
+    - MISSING_EVENT_TIME      : event_time is empty (column is NOT NULL)
+    - INVALID_EVENT_TIME      : event_time cannot be parsed as a timestamp
+    - EVENT_TIME_OUT_OF_RANGE : before 1753-01-01 (SQL Server DATETIME range)
+    - INVALID_<COLUMN>        : BIGINT column not an integer in the BIGINT range
+    - INVALID_PRICE           : price not numeric
+    - PRICE_OUT_OF_RANGE      : price does not fit DECIMAL(10,2)
+    - <COLUMN>_TOO_LONG       : text longer than the VARCHAR(n) column
+Notes:
+    - Checks work on whole columns; for categorical columns string lengths are
+      computed once per distinct value.
+    - BIGINT columns are returned as int64 or nullable Int64. The ingest reads
+      them as text (BRONZE_CSV_DTYPES), and integer text is parsed exactly,
+      never through float64, which rounds 19-digit ids. Float input (and
+      decimal text such as '12.0') is only accepted below 2**53, where
+      float64 is exact.
+    - Rejected values are stored as text (numbers as pandas parsed them), so a
+      reject can be fixed and re-loaded without going back to the source file.
+    - Rows the CSV parser itself cannot split (wrong number of fields) still
+      fail the file; they are not type errors of a single value.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# =================================================
+# Configuration (mirrors bronze.ecommerce_behavior)
+# =================================================
+BRONZE_COLUMNS = [
+    "event_time", "event_type", "product_id", "category_id", "category_code",
+    "brand", "price", "user_id", "user_session",
+]
+
+VARCHAR_LENGTHS = {
+    "event_type": 10,
+    "category_code": 100,
+    "brand": 50,
+    "user_session": 36,
+}
+
+BIGINT_COLUMNS = ["product_id", "category_id", "user_id"]
+BIGINT_LIMIT = 2 ** 63
+BIGINT_MAX_DIGITS = str(BIGINT_LIMIT - 1)    # 9223372036854775807
+FLOAT_EXACT_LIMIT = 2 ** 53                  # larger float64 values may have been rounded
+
+PRICE_LIMIT = 10 ** 8                        # DECIMAL(10,2): at most 99,999,999.99
+DATETIME_MIN = pd.Timestamp("1753-01-01")    # SQL Server DATETIME lower bound
+FORMAT_SAMPLE_SIZE = 20                      # values tried when guessing the timestamp format
+
+REJECTS_TABLE = "ecommerce_behavior_rejects"
+
+
+# =================================================
+# Column Checks
+# =================================================
+def _text_lengths(series: pd.Series) -> np.ndarray:
+    """Length of each value as text (0 for NULL)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        category_lengths = series.cat.categories.astype(str).str.len().to_numpy()
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes >= 0, category_lengths[codes], 0)
+    return series.astype("string").str.len().fillna(0).to_numpy()
+
+
+def _to_number(series: pd.Series):
+    """(numeric values, mask of non-empty values that are not numbers)."""
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.astype("float64"), np.zeros(len(series), dtype=bool)
+    values = pd.to_numeric(series, errors="coerce")
+    return values, (values.isna() & series.notna()).to_numpy()
+
+
+def _to_bigint(series: pd.Series):
+    """(integer values, mask of non-empty values that are not integers in the BIGINT range)."""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series, np.zeros(len(series), dtype=bool)
+    if pd.api.types.is_float_dtype(series.dtype):
+        # A float64 id above 2**53 may already be rounded: reject it rather than store a wrong id
+        with np.errstate(invalid="ignore"):
+            invalid = (series.notna() & ((series.abs() >= FLOAT_EXACT_LIMIT) | (series % 1 != 0))).to_numpy()
+        return series.where(~invalid).astype("Int64"), invalid
+
+    text = series.astype("string").str.strip()
+    is_integer = text.str.fullmatch(r"[+-]?\d+").fillna(False).to_numpy(dtype=bool)
+    # In range when |value| <= 2**63 - 1: fewer digits, or as many and not greater as text
+    digits = text.str.lstrip("+-").str.lstrip("0")
+    lengths = digits.str.len().fillna(0).to_numpy()
+    in_range = (lengths < len(BIGINT_MAX_DIGITS)) | (
+        (lengths == len(BIGINT_MAX_DIGITS)) & (digits <= BIGINT_MAX_DIGITS).fillna(False).to_numpy(dtype=bool))
+    exact = is_integer & in_range
+    # Integer text is converted to int64 directly, never through float64 (19-digit ids)
+    values = pd.to_numeric(text.where(exact), errors="coerce", dtype_backend="numpy_nullable").astype("Int64")
+    # Whole numbers written as decimals or exponents ('12.0', '1e3') are accepted while float64 is exact
+    other = text.notna().to_numpy(dtype=bool) & ~is_integer
+    if other.any():
+        decimals, _ = _to_number(text[other])
+        with np.errstate(invalid="ignore"):
+            whole = ((decimals.abs() < FLOAT_EXACT_LIMIT) & (decimals % 1 == 0)).fillna(False).astype(bool)
+        values[decimals.index[whole]] = decimals[whole].astype("int64")
+    return values, (values.isna() & series.notna()).to_numpy()
+
+
+def _guess_time_format(raw: pd.Series):
+    """Timestamp format of the first values that have a recognizable one."""
+    for value in raw.dropna().head(FORMAT_SAMPLE_SIZE):
+        time_format = guess_datetime_format(str(value))
+        if time_format is not None:
+            return time_format
+    return None
+
+
+def _check_event_time(raw: pd.Series, problems: dict):
+    missing = raw.isna().to_numpy()
+    # Parse UTC-aware with the format of the chunk (a bad first value must not force the
+    # slow per-value path), retry the few misses value by value, then drop the timezone
+    parsed = pd.to_datetime(raw, utc=True, errors="coerce", format=_guess_time_format(raw))
+    retry = parsed.isna() & raw.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(raw[retry], utc=True, errors="coerce", format="mixed")
+    parsed = parsed.dt.tz_localize(None)
+    invalid = parsed.isna().to_numpy() & ~missing
+    problems["MISSING_EVENT_TIME"] = missing
+    problems["INVALID_EVENT_TIME"] = invalid
+    problems["EVENT_TIME_OUT_OF_RANGE"] = (parsed < DATETIME_MIN).to_numpy()
+    return parsed
+
+
+# =================================================
+# Validation
+# =================================================
+def validate_chunk(df: pd.DataFrame, source_file: str, first_row: int):
+    """
+    Validates a chunk parsed from `source_file` whose first row is data row
+    `first_row` (1-based) of the file. Returns (valid rows with event_time as
+    datetime, rejects with source_file, source_row, reason_codes and the
+    rejected values as text).
+    """
+    problems = {}
+    event_time = _check_event_time(df["event_time"], problems)
+
+    numeric = {}
+    for column in BIGINT_COLUMNS:
+        values, invalid = _to_bigint(df[column])
+        problems[f"INVALID_{column.upper()}"] = invalid
+        numeric[column] = values
+
+    price, not_number = _to_number(df["price"])
+    problems["INVALID_PRICE"] = not_number
+    problems["PRICE_OUT_OF_RANGE"] = (price.abs() >= PRICE_LIMIT).fillna(False).to_numpy()
+    numeric["price"] = price
+
+    for column, max_length in VARCHAR_LENGTHS.items():
+        problems[f"{column.upper()}_TOO_LONG"] = _text_lengths(df[column]) > max_length
+
+    is_reject = np.zeros(len(df), dtype=bool)
+    for mask in problems.values():
+        is_reject |= mask
+
+    valid = df[~is_reject].copy()
+    valid["event_time"] = event_time[~is_reject]
+    for column, values in numeric.items():
+        # int64 columns are already exact; text and float columns are converted
+        if values is not df[column]:
+            valid[column] = values[~is_reject]
+
+    rejects = _build_rejects(df, is_reject, problems, source_file, first_row)
+    return valid, rejects
+
+
+def _build_rejects(df, is_reject, problems, source_file, first_row) -> pd.DataFrame:
+    positions = np.flatnonzero(is_reject)
+    if len(positions) == 0:
+        return pd.DataFrame(columns=["source_file", "source_row", "reason_codes"] + BRONZE_COLUMNS)
+
+    reason_codes = pd.Series("", index=positions, dtype=object)
+    for code, mask in problems.items():
+        hit = mask[positions]
+        if hit.any():
+            reason_codes[hit] = reason_codes[hit] + code + ";"
+
+    rejected = df.iloc[positions]
+    rejects = pd.DataFrame({
+        "source_file": source_file,
+        "source_row": first_row + positions,
+        "reason_codes": reason_codes.str.rstrip(";").to_numpy(),
+    })
+    for column in BRONZE_COLUMNS:
+        values = rejected[column].astype(object)
+        rejects[column] = values.where(values.notna(), None).map(lambda v: v if v is None else str(v)).to_numpy()
+    return rejects
+
+
+# =================================================
+# Quarantine
+# =================================================
+def write_rejects(conn, rejects: pd.DataFrame) -> int:
+    """Appends `rejects` to bronze.ecommerce_behavior_rejects. Returns the row count."""
+    if rejects.empty:
+        return 0
+    rejects.to_sql(
+        name=REJECTS_TABLE,
+        schema="bronze",
+        con=conn,
+        if_exists="append",
+        index=False,
+    )
+    return len(rejects)
+
+
+def reject_reason_counts(rejects: pd.DataFrame) -> dict:
+    """Rows per reason code (a row with several reasons counts for each)."""
+    if rejects.empty:
+        return {}
+    return rejects["reason_codes"].str.split(";").explode().value_counts().to_dict()
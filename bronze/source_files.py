@@ -0,0 +1,183 @@
+"""
+================================================================================
+File: source_files.py
+Purpose: Discovers and opens the source exports for the Bronze ingest, plain or
+         compressed (.csv, .csv.gz, .zip, .bz2, .zst). Compressed files are
+         decompressed as a stream straight into the CSV parser, so nothing is
+         written to disk. Decompression runs in a background thread (zlib, bz2
+         and zstd release the GIL), overlapping with parsing.
+Functions:
+    - find_source_files()          : Files matching a glob pattern with a
+                                     supported suffix.
+    - open_source()                : Binary stream of the CSV content of a file.
+    - ThreadedDecompressionReader  : Raw stream that reads ahead in a thread
+                                     through a bounded queue of blocks.
+Notes:
+    - .zst needs the optional 'zstandard' package.
+    - .zip archives must contain a .csv member; the first one is read.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import bz2
+import gzip
+import io
+import queue
+import threading
+import zipfile
+from glob import glob
+
+try:
+    import zstandard
+except ImportError:  # .zst sources are unavailable
+    zstandard = None
+
+# =================================================
+# Configuration
+# =================================================
+SUPPORTED_SUFFIXES = (".csv", ".csv.gz", ".gz", ".zip", ".bz2", ".zst")
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 ** 2   # decompressed bytes per block
+DEFAULT_QUEUE_DEPTH = 8              # blocks buffered ahead of the parser
+
+
+def find_source_files(pattern: str) -> list:
+    """Files matching `pattern` whose name ends in a supported suffix, sorted."""
+    return sorted(path for path in glob(pattern) if path.lower().endswith(SUPPORTED_SUFFIXES))
+
+
+# =================================================
+# Threaded Read-Ahead
+# =================================================
+class ThreadedDecompressionReader(io.RawIOBase):
+    """
+    Reads `stream` in blocks on a background thread and hands them to the
+    consumer through a queue of at most `queue_depth` blocks, so memory stays
+    bounded while decompression and parsing overlap.
+    """
+
+    def __init__(self, stream, block_size: int = DEFAULT_BLOCK_SIZE, queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                 close_also=()):
+        super().__init__()
+        self._stream = stream
+        self._close_also = list(close_also)
+        self._block_size = block_size
+        self._queue = queue.Queue(maxsize=queue_depth)
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="source-decompress", daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            while not self._stop.is_set():
+                block = self._stream.read(self._block_size)
+                if not block or not self._put(block):
+                    break
+        except Exception as e:  # re-raised in the consumer
+            self._error = e
+        finally:
+            self._put(None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            if self._eof:
+                return 0
+            block = self._queue.get()
+            if block is None:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+                return 0
+            self._buffer = memoryview(block)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            # Stop the producer (it may be blocked on a full queue) before closing its stream
+            self._stop.set()
+            while self._thread.is_alive():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._thread.join(timeout=0.05)
+            self._stream.close()
+            for handle in self._close_also:
+                handle.close()
+        super().close()
+
+
+# =================================================
+# Opening Sources
+# =================================================
+def _open_decompressed(path: str):
+    """Returns (decompressed stream, other handles to close with it) or None for plain CSV."""
+    lower = path.lower()
+    if lower.endswith(".gz"):
+        return gzip.open(path, "rb"), []
+    if lower.endswith(".bz2"):
+        return bz2.open(path, "rb"), []
+    if lower.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Reading .zst files requires the 'zstandard' package (pip install zstandard).")
+        raw = open(path, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(raw), [raw]
+    if lower.endswith(".zip"):
+        archive = zipfile.ZipFile(path)
+        members = [name for name in archive.namelist() if name.lower().endswith(".csv")]
+        if not members:
+            archive.close()
+            raise ValueError(f"No .csv member in {path}")
+        return archive.open(members[0]), [archive]
+    return None
+
+
+def open_source(path: str, threaded: bool = True, block_size: int = DEFAULT_BLOCK_SIZE,
+                queue_depth: int = DEFAULT_QUEUE_DEPTH):
+    """
+    Opens `path` as a binary stream of CSV text, decompressing on the fly.
+    With `threaded`, decompression runs on a read-ahead thread.
+    """
+    opened = _open_decompressed(path)
+    if opened is None:
+        return open(path, "rb")
+    stream, close_also = opened
+    if not threaded:
+        if close_also:
+            return _ClosingStream(stream, close_also)
+        return stream
+    reader = ThreadedDecompressionReader(stream, block_size, queue_depth, close_also)
+    return io.BufferedReader(reader, buffer_size=block_size)
+
+
+class _ClosingStream(io.BufferedReader):
+    """Buffered stream that also closes the archive / file it was opened from."""
+
+    def __init__(self, stream, close_also):
+        super().__init__(stream)
+        self._close_also = close_also
+
+    def close(self):
+        super().close()
+        for handle in self._close_also:
+            handle.close()
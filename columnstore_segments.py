@@ -0,0 +1,138 @@
+"""
+================================================================================
+File: columnstore_segments.py
+Purpose: Measures how well the clustered columnstore tables are ordered for
+         segment elimination. SQL Server keeps the min/max of every column
+         segment (one per column and compressed rowgroup) and skips segments
+         whose range cannot match a filter, so a date filter only saves I/O if
+         the segments' date ranges do not overlap. For each table/column the
+         report shows how many segments overlap each segment's min/max range
+         and which share of the segments a filter on one segment's range
+         still has to read.
+           - SQL Server: ranges from sys.column_store_segments
+           - other databases (the SQLite stand-in): rowgroups are simulated by
+             cutting the rows, in insertion order, into groups of rowgroup_rows
+Functions:
+    - SegmentOverlap          : Overlap statistics of one table column.
+    - segment_ranges()        : min/max/row count per segment of a column.
+    - overlap_stats()         : Overlap statistics of a set of ranges.
+    - measure_segment_overlap(): Statistics for every configured table column.
+    - report_segment_overlap(): Prints the statistics.
+Notes:
+    - min_data_id/max_data_id are compared as stored. That is the value for
+      value-encoded (numeric, date/time) columns, which are the ones listed
+      in SEGMENT_COLUMNS; for dictionary-encoded strings it would be a
+      dictionary id.
+    - Rows still in delta stores (open rowgroups) have no segment yet and are
+      always scanned; they are not part of the report.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# =================================================
+# Configuration
+# =================================================
+# Columns that queries filter on, per columnstore table
+SEGMENT_COLUMNS = {
+    "bronze.ecommerce_behavior": ["event_time", "product_id"],
+    "silver.ecommerce_behavior": ["event_date", "product_id"],
+    "gold.fact_ecommerce": ["date_key", "event_key", "product_id"],
+}
+
+# sys.column_store_segments.column_id is the column's position in the columnstore index
+SEGMENT_QUERY = """
+SELECT s.min_data_id AS min_value, s.max_data_id AS max_value, s.row_count
+FROM sys.column_store_segments s
+JOIN sys.partitions p ON p.hobt_id = s.hobt_id
+JOIN sys.index_columns ic
+    ON ic.object_id = p.object_id AND ic.index_id = p.index_id AND ic.index_column_id = s.column_id
+JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+WHERE p.object_id = OBJECT_ID(:table_name) AND c.name = :column_name
+ORDER BY p.partition_number, s.segment_id;
+"""
+
+# Stand-in: rows in insertion order (table/column names come from SEGMENT_COLUMNS only)
+STANDIN_ROWS_QUERY = "SELECT {column} AS value FROM {table} ORDER BY rowid"
+
+
+# =================================================
+# Statistics
+# =================================================
+@dataclass
+class SegmentOverlap:
+    table: str
+    column: str
+    segments: int
+    rows: int
+    mean_overlap: float     # other segments whose range overlaps a segment's range, on average
+    max_overlap: int
+    scan_fraction: float    # share of segments a filter on one segment's range reads (1/segments is ideal)
+
+
+def segment_ranges(conn, table: str, column: str, rowgroup_rows: int = 1_048_576) -> pd.DataFrame:
+    """min_value, max_value and row_count of every segment of a column (all-NULL segments excluded)."""
+    if conn.dialect.name == "mssql":
+        ranges = pd.read_sql(text(SEGMENT_QUERY), conn, params={"table_name": table, "column_name": column})
+        return ranges.dropna(subset=["min_value", "max_value"]).reset_index(drop=True)
+
+    groups = []
+    query = text(STANDIN_ROWS_QUERY.format(table=table, column=column))
+    for chunk in pd.read_sql(query, conn, chunksize=rowgroup_rows):
+        values = chunk["value"].dropna()
+        if len(values):
+            groups.append({"min_value": values.min(), "max_value": values.max(), "row_count": len(chunk)})
+    return pd.DataFrame(groups, columns=["min_value", "max_value", "row_count"])
+
+
+def overlap_stats(ranges: pd.DataFrame):
+    """(mean overlap, max overlap, scan fraction) of the segment ranges."""
+    n = len(ranges)
+    if n == 0:
+        return 0.0, 0, 0.0
+    mins = ranges["min_value"].to_numpy(dtype=object)
+    maxs = ranges["max_value"].to_numpy(dtype=object)
+    # overlaps[i, j]: segment j has rows inside segment i's [min, max]
+    overlaps = (mins[np.newaxis, :] <= maxs[:, np.newaxis]) & (maxs[np.newaxis, :] >= mins[:, np.newaxis])
+    others = overlaps.sum(axis=1) - 1
+    return float(others.mean()), int(others.max()), float((others + 1).mean() / n)
+
+
+def measure_segment_overlap(conn, columns: dict = None, rowgroup_rows: int = 1_048_576) -> list:
+    """Overlap statistics for every table column in `columns` (default SEGMENT_COLUMNS)."""
+    results = []
+    for table, table_columns in (columns or SEGMENT_COLUMNS).items():
+        for column in table_columns:
+            ranges = segment_ranges(conn, table, column, rowgroup_rows)
+            mean_overlap, max_overlap, scan_fraction = overlap_stats(ranges)
+            results.append(SegmentOverlap(
+                table=table,
+                column=column,
+                segments=len(ranges),
+                rows=int(ranges["row_count"].sum()) if len(ranges) else 0,
+                mean_overlap=round(mean_overlap, 2),
+                max_overlap=max_overlap,
+                scan_fraction=round(scan_fraction, 4),
+            ))
+    return results
+
+
+def report_segment_overlap(results, simulated: bool = False):
+    """Prints the overlap statistics of every table column."""
+    source = "simulated rowgroups" if simulated else "sys.column_store_segments"
+    print(f"\n--- Columnstore Segment Overlap ({source}) ---")
+    print(f"    {'table.column':<40} {'segments':>8} {'rows':>12} {'avg overlap':>12} {'max':>6} {'scanned':>8}")
+    for result in results:
+        name = f"{result.table}.{result.column}"
+        if result.segments == 0:
+            print(f"    {name:<40} {'-':>8}  (no compressed segments yet)")
+            continue
+        print(f"    {name:<40} {result.segments:>8,} {result.rows:>12,} {result.mean_overlap:>12.2f} "
+              f"{result.max_overlap:>6} {result.scan_fraction:>8.1%}")
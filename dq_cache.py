@@ -0,0 +1,206 @@
+"""
+================================================================================
+File: dq_cache.py
+Purpose: Result cache for the data quality checks. Every check result is saved
+         together with a cheap version fingerprint of the tables it reads; as
+         long as none of those tables has changed, re-running the check serves
+         the saved report instead of re-scanning the tables (e.g. re-running
+         gold_dq_flow after fixing an unrelated issue).
+Functions:
+    - table_fingerprint()  : Cheap version fingerprint of one table.
+    - DqResultCache        : JSON-file cache; its `cached()` decorator wraps a
+                             check function.
+Fingerprints:
+    - SQL Server: row count from sys.dm_db_partition_stats, the summed
+      modification counters of the table's statistics, the last user update
+      from sys.dm_db_index_usage_stats, and MAX() of a version column
+      (e.g. loaded_at) where the table has one. All of these are metadata or
+      segment-eliminated reads.
+    - Other databases (the SQLite stand-in): COUNT(*) and MAX() of the
+      version column; tables without a version column are compared by row
+      count only there.
+Notes:
+    - A fingerprint can change without a data change (statistics update,
+      server restart resetting usage stats); that only costs a cache miss.
+    - The cache key includes a hash of the check's source code, so editing a
+      check invalidates its cached results.
+    - Pass force_refresh=True to a cached check to recompute it.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import contextlib
+import functools
+import hashlib
+import inspect
+import io
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+
+from pipeline_telemetry import record_rows
+
+# =================================================
+# Configuration
+# =================================================
+# Monotonic column per table whose MAX() moves with every load
+TABLE_VERSION_COLUMNS = {
+    "bronze.ecommerce_behavior": "loaded_at",
+    "gold.fact_ecommerce": "event_key",
+    "gold.fact_load_batches": "batch_id",
+    "gold.batch_consumers": "processed_at",
+}
+
+MSSQL_FINGERPRINT_QUERY = """
+SELECT
+    (SELECT SUM(row_count)
+     FROM sys.dm_db_partition_stats
+     WHERE object_id = OBJECT_ID(:table_name) AND index_id IN (0, 1))       AS row_count,
+    (SELECT SUM(sp.modification_counter)
+     FROM sys.stats s
+     CROSS APPLY sys.dm_db_stats_properties(s.object_id, s.stats_id) sp
+     WHERE s.object_id = OBJECT_ID(:table_name))                            AS modification_counter,
+    (SELECT MAX(last_user_update)
+     FROM sys.dm_db_index_usage_stats
+     WHERE database_id = DB_ID() AND object_id = OBJECT_ID(:table_name))    AS last_user_update;
+"""
+
+
+# =================================================
+# Table Fingerprints
+# =================================================
+def table_fingerprint(conn, table: str) -> dict:
+    """Version fingerprint of `table` (JSON-serializable)."""
+    fingerprint = {}
+    if conn.dialect.name == "mssql":
+        row = conn.execute(text(MSSQL_FINGERPRINT_QUERY), {"table_name": table}).fetchone()
+        fingerprint.update({key: str(value) if value is not None else None for key, value in row._mapping.items()})
+    else:
+        fingerprint["row_count"] = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+    version_column = TABLE_VERSION_COLUMNS.get(table)
+    if version_column is not None:
+        value = conn.execute(text(f"SELECT MAX({version_column}) FROM {table}")).scalar()
+        fingerprint[f"max_{version_column}"] = str(value) if value is not None else None
+    return fingerprint
+
+
+class _Tee(io.TextIOBase):
+    """Writes to the real stdout and keeps a copy of the text."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.captured = io.StringIO()
+
+    def write(self, s):
+        self.captured.write(s)
+        return self._stream.write(s)
+
+    def flush(self):
+        self._stream.flush()
+
+
+# =================================================
+# Result Cache
+# =================================================
+class DqResultCache:
+    """
+    Caches the report (printed output) and return value of DQ checks.
+
+    Usage:
+        dq_cache = DqResultCache(lambda: engine, {"enabled": True, "path": "state/dq_cache.json"})
+
+        @task(name="DQ: ...")
+        @instrumented_stage
+        @dq_cache.cached("bronze.ecommerce_behavior")
+        def dq_invalid_ids(): ...
+
+        dq_invalid_ids()                     # served from the cache while the table is unchanged
+        dq_invalid_ids(force_refresh=True)   # always recomputed
+    `settings` is read on every call, so the cache can be switched off or
+    moved at runtime.
+    """
+
+    def __init__(self, get_engine, settings: dict):
+        self.get_engine = get_engine
+        self.settings = settings
+
+    # --- storage ---
+    def _path(self) -> Path:
+        return Path(self.settings["path"])
+
+    def _load(self) -> dict:
+        path = self._path()
+        if not path.exists():
+            return {}
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}   # unreadable cache: recompute everything
+
+    def _store(self, check_name: str, entry: dict):
+        entries = self._load()
+        entries[check_name] = entry
+        path = self._path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(entries, fh, indent=2, default=str)
+        tmp_path.replace(path)
+
+    def _fingerprints(self, tables) -> dict:
+        with self.get_engine().connect() as conn:
+            return {table: table_fingerprint(conn, table) for table in tables}
+
+    # --- decorator ---
+    def cached(self, *tables):
+        """Decorator: serves the check from the cache while `tables` are unchanged."""
+        def decorator(func):
+            check_version = hashlib.sha1(inspect.getsource(func).encode("utf-8")).hexdigest()
+
+            @functools.wraps(func)
+            def wrapper(*args, force_refresh: bool = False, **kwargs):
+                if not self.settings.get("enabled", True):
+                    return func(*args, **kwargs)
+                try:
+                    fingerprints = self._fingerprints(tables)
+                except Exception as e:  # e.g. no VIEW SERVER STATE permission
+                    print(f"⚠️ DQ cache unavailable for {func.__name__} ({e}); running the check.")
+                    return func(*args, **kwargs)
+
+                entry = self._load().get(func.__name__)
+                if (not force_refresh and entry is not None
+                        and entry["check_version"] == check_version
+                        and entry["fingerprints"] == fingerprints):
+                    print(f"\n♻️ {func.__name__}: tables unchanged since {entry['computed_at']}, "
+                          f"serving the cached result.")
+                    sys.stdout.write(entry["output"])
+                    record_rows(dq_cache="hit")
+                    return entry["result"]
+
+                tee = _Tee(sys.stdout)
+                with contextlib.redirect_stdout(tee):
+                    result = func(*args, **kwargs)
+                self._store(func.__name__, {
+                    "check_version": check_version,
+                    "fingerprints": fingerprints,
+                    "computed_at": datetime.now(timezone.utc).isoformat(),
+                    "output": tee.captured.getvalue(),
+                    "result": result,
+                })
+                record_rows(dq_cache="refresh" if force_refresh else "miss")
+                return result
+
+            # Expose force_refresh in the signature, so Prefect accepts it as a task parameter
+            signature = inspect.signature(func)
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("force_refresh", inspect.Parameter.KEYWORD_ONLY, default=False, annotation=bool),
+            ])
+            return wrapper
+        return decorator
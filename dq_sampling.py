@@ -0,0 +1,194 @@
+"""
+================================================================================
+File: dq_sampling.py
+Purpose: Approximate (sampled) mode for the rate-type DQ checks. Instead of
+         scanning the full history, the same per-row conditions (NULL key,
+         UNKNOWN category, ...) are evaluated on a sample and reported as rate
+         estimates with confidence intervals:
+           - SQL Server: block sample with TABLESAMPLE (n PERCENT) REPEATABLE,
+             aggregated on the server (only the sampled pages are read)
+           - other databases (the SQLite stand-in): the rows are streamed and
+             reservoir-sampled in Python, so memory stays at the sample size
+         A metric whose interval reaches its threshold asks for escalation; the
+         calling flow then runs the exact check.
+Functions:
+    - RateEstimate           : One estimated rate with its interval.
+    - wilson_interval()      : Confidence interval of a proportion.
+    - reservoir_sample()     : Uniform fixed-size sample of a stream of chunks.
+    - estimate_rates()       : Evaluates rate metrics on a sample of a source.
+    - report_rate_estimates(): Prints the estimates; True if any needs escalation.
+Notes:
+    - TABLESAMPLE picks whole pages, and rows on a page were loaded together,
+      so they are not independent. The interval is widened by a design effect
+      (variance multiplier) for block samples; 1.0 treats rows as independent.
+    - Distinct counts cannot be estimated from a sample; they are reported by
+      the exact checks only.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+
+# =================================================
+# Estimates and Intervals
+# =================================================
+@dataclass
+class RateEstimate:
+    metric: str
+    sample_rows: int
+    hits: int
+    rate: float
+    lower: float
+    upper: float
+    max_rate: float = None      # threshold; None = reported only
+
+    @property
+    def needs_escalation(self) -> bool:
+        # Escalate when the threshold cannot be ruled out, not only when the point estimate crosses it
+        return self.max_rate is not None and self.upper > self.max_rate
+
+
+def wilson_interval(hits: int, n: int, confidence: float = 0.95, design_effect: float = 1.0):
+    """
+    Wilson score interval of the proportion hits / n. `design_effect` inflates
+    the variance (the effective sample size is n / design_effect).
+    """
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    n_eff = n / max(design_effect, 1.0)
+    p = hits / n
+    denominator = 1 + z ** 2 / n_eff
+    center = (p + z ** 2 / (2 * n_eff)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n_eff + z ** 2 / (4 * n_eff ** 2)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+# =================================================
+# Sampling
+# =================================================
+def reservoir_sample(chunks, size: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Uniform random sample of at most `size` rows from a stream of DataFrame
+    chunks (Algorithm R, vectorized per chunk).
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    seen = 0
+    for chunk in chunks:
+        chunk = chunk.reset_index(drop=True)
+        if reservoir is None:
+            reservoir = chunk.iloc[:size].copy()
+            seen = len(reservoir)
+            chunk = chunk.iloc[len(reservoir):]
+        elif len(reservoir) < size:
+            fill = chunk.iloc[: size - len(reservoir)]
+            reservoir = pd.concat([reservoir, fill], ignore_index=True)
+            seen += len(fill)
+            chunk = chunk.iloc[len(fill):]
+        if chunk.empty:
+            continue
+        # Row i (0-based stream position) replaces slot j ~ U[0, i] when j < size; later rows
+        # overwrite earlier ones in the same slot, exactly as in the sequential algorithm
+        positions = np.arange(seen, seen + len(chunk))
+        slots = rng.integers(0, positions + 1)
+        rows = np.flatnonzero(slots < size)
+        slots = slots[rows]
+        _, last_in_reversed = np.unique(slots[::-1], return_index=True)
+        winners = len(slots) - 1 - last_in_reversed
+        reservoir.iloc[slots[winners]] = chunk.iloc[rows[winners]].to_numpy()
+        seen += len(chunk)
+    return reservoir if reservoir is not None else pd.DataFrame()
+
+
+def _indicator_columns(metrics: dict) -> str:
+    return ",\n        ".join(f"CASE WHEN {condition} THEN 1 ELSE 0 END AS {name}" for name, condition in metrics.items())
+
+
+def estimate_rates(conn, source: str, metrics: dict, max_rates: dict, percent: float = 1.0,
+                   reservoir_size: int = 100_000, confidence: float = 0.95, design_effect: float = 1.0,
+                   seed: int = 42, chunksize: int = 100_000):
+    """
+    Estimates the rate of every metric (name -> SQL condition) over `source`,
+    a FROM clause with a '{sample}' placeholder after the sampled table, e.g.
+        "gold.fact_ecommerce f {sample} LEFT JOIN gold.dim_category c ON ..."
+    Returns (estimates, sampling method description).
+    """
+    if conn.dialect.name == "mssql":
+        sums = ",\n        ".join(f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END) AS {name}"
+                                  for name, condition in metrics.items())
+        query = f"""
+        SELECT
+        COUNT(*) AS sample_rows,
+        {sums}
+        FROM {source.format(sample=f"TABLESAMPLE ({percent} PERCENT) REPEATABLE ({seed})")};
+        """
+        row = conn.execute(text(query)).fetchone()._mapping
+        sample_rows = row["sample_rows"] or 0
+        hits = {name: int(row[name] or 0) for name in metrics}
+        method = f"TABLESAMPLE {percent}% (block sample, design effect {design_effect})"
+        exhaustive = False
+    else:
+        query = f"SELECT\n        {_indicator_columns(metrics)}\n    FROM {source.format(sample='')}"
+        chunks = pd.read_sql(text(query), conn, chunksize=chunksize)
+        sample = reservoir_sample(chunks, reservoir_size, seed)
+        sample_rows = len(sample)
+        hits = {name: int(sample[name].sum()) if sample_rows else 0 for name in metrics}
+        design_effect = 1.0    # row-level sample
+        # A table smaller than the reservoir was read completely: the rates are exact
+        exhaustive = sample_rows < reservoir_size
+        method = "all rows, table smaller than the reservoir" if exhaustive else f"reservoir sample of {reservoir_size:,} rows"
+
+    estimates = []
+    for name in metrics:
+        if exhaustive and sample_rows:
+            lower = upper = hits[name] / sample_rows
+        else:
+            lower, upper = wilson_interval(hits[name], sample_rows, confidence, design_effect)
+        estimates.append(RateEstimate(
+            metric=name,
+            sample_rows=sample_rows,
+            hits=hits[name],
+            rate=hits[name] / sample_rows if sample_rows else 0.0,
+            lower=lower,
+            upper=upper,
+            max_rate=max_rates.get(name),
+        ))
+    return estimates, method
+
+
+# =================================================
+# Reporting
+# =================================================
+def report_rate_estimates(estimates, method: str, confidence: float = 0.95, min_sample_rows: int = 1_000) -> bool:
+    """Prints the estimates. Returns True if the exact check should run."""
+    sample_rows = estimates[0].sample_rows if estimates else 0
+    print(f"    Sample: {sample_rows:,} rows ({method}), {confidence:.0%} confidence intervals")
+    if sample_rows < min_sample_rows and not all(e.lower == e.upper for e in estimates):
+        print(f"⚠️ Sample smaller than {min_sample_rows:,} rows; escalating to the exact check.")
+        return True
+
+    escalate = False
+    for estimate in estimates:
+        threshold = f"  (max {estimate.max_rate:.2%})" if estimate.max_rate is not None else ""
+        line = (f"{estimate.metric}: {estimate.rate:.3%} "
+                f"[{estimate.lower:.3%}, {estimate.upper:.3%}]{threshold}")
+        if estimate.needs_escalation:
+            escalate = True
+            print(f"⚠️ {line}")
+        else:
+            print(f"    {line}")
+    if escalate:
+        print("⚠️ A rate may exceed its threshold; escalating to the exact check.")
+    else:
+        print("✅ All sampled rates are within their thresholds.")
+    return escalate
@@ -7,12 +7,29 @@
 # The pipeline is designed to load, clean, transform, and validate e-commerce behavior data.
 #
 # The master flow, `medallion_pipeline_flow`, executes the following stages sequentially:
-# 1. Bronze Load: Reads ALL CSV files matching the pattern in the source directory and loads them.
+# 1. Bronze Load: Reads ALL CSV files (plain or .gz/.zip/.bz2/.zst) matching the pattern in the
+#    source directory and loads them; with DISTRIBUTED_EXECUTION the files are loaded as
+#    month shards on a pool of worker processes.
 # 2. Bronze DQ: Performs data quality checks (nulls, invalid IDs) on the raw data.
-# 3. Silver Load: Executes a SQL Stored Procedure to transform Bronze data into the Silver layer.
+# 3. Silver Load: Transforms Bronze data into the Silver layer, either with a SQL Stored Procedure
+#    or with the equivalent vectorized Python engine (SILVER_TRANSFORM_ENGINE).
 # 4. Silver DQ: Checks for nulls, unknowns, and consistency in the Silver layer.
-# 5. Gold Load: Executes Stored Procedures to build `gold.dim_products` and `gold.fact_ecommerce`.
+# 5. Gold Load: Executes Stored Procedures to build `gold.dim_products`, the lookup dims
+#    (`gold.dim_brand`, `gold.dim_category`, `gold.dim_session`) and `gold.fact_ecommerce`;
+#    the calendar dims (`gold.dim_date`, `gold.dim_time`) are generated in Python.
+#    The daily rollups, `gold.fact_sessions` and `gold.user_features` are then extended from
+#    the new fact batches. All columnstore loads write rows in date order (SORTED_LOADS), and
+#    the segment min/max overlap of the tables is reported afterwards (columnstore_segments.py).
 # 6. Gold DQ: Performs integrity checks (referential integrity, key duplicates) on the Gold layer.
+# 7. Gold Export (opt-in, GOLD_PARQUET_EXPORT): writes the changed fact date partitions and the
+#    product dim as Parquet files for analysts.
+# 8. Bronze Retention (opt-in, BRONZE_RETENTION): archives event months that Silver and Gold have
+#    consumed to Parquet and removes them from Bronze (`python etl_pipeline.py restore <YYYY-MM>`
+#    brings them back).
+#
+# Every task is wrapped with `instrumented_stage` (pipeline_telemetry.py). At the end of a run the
+# per-stage metrics are written to TELEMETRY_DIR as JSON lines and a Prometheus textfile, and
+# attached to the Prefect flow run as a table artifact.
 #
 # Prerequisites:
 # 1. Python environment with 'prefect', 'pandas', 'SQLAlchemy', and 'glob' installed.
@@ -30,8 +47,37 @@
 from prefect import task, flow
 import pandas as pd
 from sqlalchemy import create_engine, text
-from glob import glob # Required for finding multiple files
 from pathlib import Path # Useful for printing clean file names
+import contextlib
+import copy
+import glob
+import os
+import sys
+import threading
+
+from pipeline_telemetry import (
+    add_stage_metrics, instrument_engine, instrumented_stage, publish_run_telemetry, record_rows,
+    table_row_count, take_stage_metrics,
+)
+from sql_profiler import SqlProfiler
+from sharded_runner import dask_executor_factory, plan_month_shards, process_pool_factory, run_shards
+from dq_cache import DqResultCache
+from dq_sampling import estimate_rates, report_rate_estimates
+from columnstore_segments import measure_segment_overlap, report_segment_overlap
+from bronze.batch_controller import AdaptiveBatchController
+from bronze.duplicate_filter import (
+    DuplicateFilterStore, clear_shard_filters, drop_duplicate_events, merge_shard_filters,
+    remove_cross_shard_duplicates,
+)
+from bronze.ingest_pipeline import run_ingest_pipeline
+from bronze.retention import archive_month, bronze_month_counts, consumed_months, load_manifest, restore_month
+from bronze.row_validation import reject_reason_counts, validate_chunk, write_rejects
+from bronze.source_files import find_source_files, open_source
+from silver.silver_transform import load_silver_python
+from gold.sessionize import load_fact_sessions
+from gold.calendar_dims import load_calendar_dims
+from gold.parquet_export import export_dim_products, export_fact_partitions
+from gold.product_bitmap import check_new_fact_batches, load_product_bitmap, refresh_product_bitmap
 
 # =================================================
 # 1. Configuration and Database Setup
@@ -46,7 +92,142 @@ DATABASE_CONFIG = {
 
 # Path to CSVs for Bronze Layer loading - now a pattern to find multiple files
 # NOTE: Updated to include the 'csv_files' subdirectory based on user feedback.
-SOURCE_FILES_PATTERN = r"C:\Users\mmbesu\Desktop\_SQL projects\ecommerce behavior data project\November data\csv_files\*.csv"
+# Plain and compressed exports are both accepted (.csv, .csv.gz, .zip, .bz2, .zst); files
+# matching the pattern with any other suffix are ignored.
+SOURCE_FILES_PATTERN = r"C:\Users\mmbesu\Desktop\_SQL projects\ecommerce behavior data project\November data\csv_files\*"
+
+# Rows loaded per source file: 10_000 keeps the original test mode (first 10,000 rows of
+# each file); None loads whole files.
+MAX_ROWS_PER_FILE = 10_000
+
+# Bronze ingest runs as a producer/consumer pipeline (bronze/ingest_pipeline.py): chunks are
+# parsed on a parser thread while writers append earlier chunks to Bronze.
+BRONZE_INGEST = {
+    "chunksize": 100_000,   # rows per parsed chunk (starting size when ADAPTIVE_BATCHING is enabled)
+    "queue_size": 4,        # parsed chunks waiting for a writer (backpressure beyond this)
+    "writers": 1,           # concurrent writers; with DUPLICATE_FILTER enabled writes are serialized
+}
+
+# Sorted columnstore loads: rows reach the clustered columnstore tables in date order, so each
+# rowgroup's event_time/event_date min/max covers a short range and date filters skip the other
+# segments. Bronze chunks are presorted here; silver.LoadEcommerceBehavior and gold.LoadFactEcommerce
+# insert with ORDER BY. columnstore_segments.py reports the segment min/max overlap per table.
+SORTED_LOADS = {
+    "bronze_sort_keys": ["event_time"],     # presort of every Bronze chunk, e.g. ["event_time", "product_id"]; [] = off
+    "segment_report": True,                 # print the segment overlap report after the Gold loads
+    "standin_rowgroup_rows": 1_048_576,     # rows per simulated rowgroup on the SQLite stand-in
+}
+
+# The chunk size adapts to measured parse time, write latency and process RSS
+# (bronze/batch_controller.py): it grows or shrinks within the bounds to maximize rows/sec
+# while RSS stays under the memory budget. Adjustments are printed and logged to log_path.
+ADAPTIVE_BATCHING = {
+    "enabled": True,
+    "min_chunksize": 10_000,
+    "max_chunksize": 1_000_000,
+    # With MAX_ROWS_PER_FILE no chunk can exceed the cap: the size starts at most at the cap, which
+    # is also the upper bound, and the lower bound drops to this share of the cap if that is smaller
+    "capped_min_fraction": 0.25,
+    "memory_budget_mb": 2048,       # needs the current RSS (psutil or Linux /proc), else disabled
+    "growth": 1.5,                  # size factor per step
+    "samples_per_step": 2,          # chunks measured at a size before the next decision
+    "tolerance": 0.05,              # throughput changes within +/-5% are treated as noise
+    "log_path": "telemetry/batch_tuning.jsonl",
+}
+
+# Compressed sources are decompressed as a stream on a read-ahead thread (bronze/source_files.py)
+SOURCE_DECOMPRESSION = {
+    "threaded": True,
+    "block_size": 4 * 1024 ** 2,   # decompressed bytes per block
+    "queue_depth": 8,              # blocks buffered ahead of the CSV parser
+}
+
+# Repeated string columns are parsed as pandas categoricals: each distinct value is stored
+# once and rows hold small integer codes, which cuts ingest memory (sessions repeat ~4-5x,
+# brands/categories/event types thousands of times). BIGINT ids are read as text and parsed
+# exactly by row validation: with one empty id in a chunk pandas would read the column as
+# float64 and round 19-digit ids.
+BRONZE_CSV_DTYPES = {
+    "event_type": "category",
+    "category_code": "category",
+    "brand": "category",
+    "user_session": "category",
+    "product_id": "string",
+    "category_id": "string",
+    "user_id": "string",
+}
+
+# Duplicate-event detection at ingest (bronze/duplicate_filter.py): row fingerprints are checked
+# against per-month scalable Bloom filters, and only suspects are verified exactly against Bronze.
+DUPLICATE_FILTER = {
+    "enabled": True,
+    "directory": "state/dedup",     # one bloom_<YYYY-MM>.npz per event month
+    "error_rate": 0.001,            # target false-positive rate per month
+    "initial_capacity": 1_000_000,  # fingerprints in the first filter of each month (grows 2x)
+}
+
+# Distributed Bronze load (sharded_runner.py): one shard per source file, keyed by month, run on
+# a pool of worker processes (or a Dask cluster) with retries; Silver, Gold and DQ then run once
+# on the merged Bronze table. The master flow takes distributed=True/False to override.
+DISTRIBUTED_EXECUTION = {
+    "enabled": False,
+    "workers": 4,
+    "max_retries": 2,               # re-runs of a failed shard (with an exact duplicate re-check)
+    "retry_delay_s": 5.0,           # doubled on every further retry
+    "dask_scheduler": None,         # e.g. "tcp://scheduler:8786"; None = local process pool
+}
+# Settings sent to the workers, so they load exactly as this process would
+SHARD_WORKER_CONFIG = (
+    "MAX_ROWS_PER_FILE", "BRONZE_INGEST", "ADAPTIVE_BATCHING", "SOURCE_DECOMPRESSION",
+    "BRONZE_CSV_DTYPES", "DUPLICATE_FILTER", "SORTED_LOADS",
+)
+
+# Bronze retention (bronze/retention.py, needs pyarrow): event months that Silver and Gold have
+# consumed are archived to Parquet under archive_dir and removed from bronze.ecommerce_behavior
+# (partition switch-out if Bronze is partitioned by month, see bronze/ddl_bronze_partitioning.sql,
+# else batched DELETEs). Restore with: python etl_pipeline.py restore 2019-10 [2019-11 ...]
+BRONZE_RETENTION = {
+    "enabled": False,
+    "keep_months": 2,               # latest event months that always stay in Bronze
+    "archive_dir": "archive/bronze",
+    "compression": "zstd",
+    "chunksize": 500_000,           # rows per Parquet batch when archiving / restoring
+    "delete_batch_rows": 100_000,   # rows per DELETE transaction without partitioning
+}
+
+# Bronze -> Silver transform engine, selectable per run:
+#   "sql"    : stored procedure silver.LoadEcommerceBehavior (in-database)
+#   "python" : vectorized, chunk-parallel transform in silver/silver_transform.py
+SILVER_TRANSFORM_ENGINE = "sql"
+SILVER_PYTHON_ENGINE = {
+    "chunksize": 250_000,   # Bronze rows per chunk
+    "workers": None,        # transform processes (None = CPU count)
+}
+
+# Streaming sessionizer (gold/sessionize.py) that builds gold.fact_sessions from new fact batches
+SESSIONIZATION = {
+    "chunksize": 250_000,   # fact events per chunk (memory = one chunk + one carried session)
+}
+
+# Calendar dims gold.dim_date / gold.dim_time (gold/calendar_dims.py), generated in Python before
+# every fact load: dim_date is extended to Silver's date range, dim_time is filled once.
+CALENDAR_DIMS = {
+    "extra_holidays": {},   # store-specific days, {"YYYY-MM-DD": "name"}, on top of FIXED_HOLIDAYS
+}
+
+# Roaring-style bitmap of gold.dim_products product_ids (gold/product_bitmap.py). It is rebuilt
+# after every dim load and used by the RI check, which then only tests new fact batches.
+PRODUCT_BITMAP_PATH = "state/dim_products_bitmap.npz"
+
+# Parquet export of the Gold fact and product dim for analysts (gold/parquet_export.py,
+# needs pyarrow). Only the event_date partitions touched by new fact batches are rewritten.
+GOLD_PARQUET_EXPORT = {
+    "enabled": False,
+    "output_dir": "exports/gold",
+    "batch_rows": 100_000,          # rows fetched per server-side cursor batch
+    "row_group_rows": 1_000_000,    # rows per Parquet row group (min/max statistics per group)
+    "compression": "zstd",
+}
 
 # Construct connection string and engine
 connection_string = (
@@ -56,71 +237,457 @@ connection_string = (
 )
 engine = create_engine(connection_string)
 
+# Per-stage telemetry (wall time, DB vs. Python time, rows, RSS, round-trips)
+# is written here as JSON lines and a Prometheus textfile after each run.
+TELEMETRY_DIR = "telemetry"
+instrument_engine(engine)
+
+# Opt-in SQL statement profiler (sql_profiler.py): records every statement's duration,
+# row count and originating task, logs slow statements and prints a top-N report.
+SQL_PROFILING = {
+    "enabled": False,
+    "slow_threshold_s": 5.0,                               # statements at/above this are "slow"
+    "slow_log_path": f"{TELEMETRY_DIR}/slow_queries.jsonl",
+    "capture_plans": False,                                # save SQL Server plans of slow statements
+    "plan_dir": f"{TELEMETRY_DIR}/plans",
+    "top_n": 10,
+}
+
+# DQ results are cached with a version fingerprint of the tables each check reads
+# (dq_cache.py); unchanged tables serve the saved report. DQ flows take force_refresh=True
+# to recompute every check.
+DQ_CACHE = {
+    "enabled": True,
+    "path": "state/dq_cache.json",
+}
+dq_cache = DqResultCache(lambda: engine, DQ_CACHE)
+
+# Sampled DQ mode (dq_sampling.py): null/UNKNOWN rates of the Silver table and the Gold fact
+# are estimated on a sample with confidence intervals; the exact check runs only when a
+# rate's interval reaches its threshold. DQ flows take sampled=True/False to override.
+DQ_SAMPLING = {
+    "enabled": False,
+    "percent": 1.0,                 # TABLESAMPLE percent (SQL Server block sample)
+    "reservoir_size": 100_000,      # rows sampled in Python on other databases
+    "min_sample_rows": 1_000,       # smaller samples always escalate
+    "confidence": 0.95,
+    "design_effect": 2.0,           # variance inflation for block samples (rows on a page are correlated)
+    "seed": 42,                     # TABLESAMPLE REPEATABLE seed / reservoir RNG seed
+    "max_null_rate": 0.001,         # threshold of every *_null metric
+    "max_unknown_rate": 0.25,       # threshold of every *_unknown metric
+    "max_rates": {},                # per-metric overrides, e.g. {"brand_unknown": 0.40}
+}
+
 # =================================================
 # 2. Bronze Layer Tasks (Load & DQ)
 # =================================================
 
 @task(name="Load CSVs to Bronze")
-def load_csvs_to_bronze(file_pattern: str):
+@instrumented_stage
+def load_csvs_to_bronze(file_pattern: str, recheck_duplicates: bool = False, shard_filter_dir: str = None):
     """
-    Finds all CSV files matching the pattern, reads the first 10,000 rows 
-    of each file, and loads them into the Bronze layer.
+    Finds all CSV files (plain or compressed) matching the pattern and loads
+    them into the Bronze layer (at most MAX_ROWS_PER_FILE rows per file).
+    Parsing and writing overlap: chunks are parsed on a parser thread and
+    written by BRONZE_INGEST["writers"] writers through a bounded queue.
+    With ADAPTIVE_BATCHING the chunk size is tuned while the load runs.
     Cleans and transforms data:
+      - Validates rows against the Bronze DDL; invalid rows go to
+        bronze.ecommerce_behavior_rejects with reason codes
       - event_time → datetime (remove timezone)
+      - Drops duplicate events (DUPLICATE_FILTER); `recheck_duplicates`
+        verifies every row exactly (re-running a partially committed load)
+      - Sorts every chunk by SORTED_LOADS["bronze_sort_keys"]
       - Replace NaN with None for SQL compatibility
+    A file or chunk that fails does not stop the others; once all files are
+    processed the load raises RuntimeError listing the failures.
+    With `shard_filter_dir` (sharded loads) the duplicate filter is private
+    to the shard: it starts from the shared filters and saves to that folder.
     """
-    # Use glob to find all matching files
-    csv_files = glob(file_pattern)
+    # Use glob to find all matching files with a supported (plain or compressed) suffix
+    csv_files = find_source_files(file_pattern)
     
     if not csv_files:
         print(f"❌ ERROR: No CSV files found matching pattern: {file_pattern}")
         return False
         
-    total_rows_loaded = 0
+    totals = {"rows_loaded": 0, "rows_rejected": 0}
     print(f"Found {len(csv_files)} files to process.")
     
-    for file_path in csv_files:
+    duplicate_filter = None
+    dedup_totals = {"suspects": 0, "confirmed": 0, "false_positives": 0, "in_chunk": 0}
+    reject_totals = {}
+    if DUPLICATE_FILTER["enabled"]:
+        duplicate_filter = DuplicateFilterStore(
+            shard_filter_dir or DUPLICATE_FILTER["directory"],
+            error_rate=DUPLICATE_FILTER["error_rate"],
+            initial_capacity=DUPLICATE_FILTER["initial_capacity"],
+            seed_directory=DUPLICATE_FILTER["directory"] if shard_filter_dir else None,
+        )
+    # Serializes dedup check + insert + filter update, so concurrent writers cannot
+    # both insert the same event; also guards the counters.
+    write_lock = threading.Lock()
+    
+    controller = None
+    if ADAPTIVE_BATCHING["enabled"]:
+        initial_size = BRONZE_INGEST["chunksize"]
+        min_size, max_size = ADAPTIVE_BATCHING["min_chunksize"], ADAPTIVE_BATCHING["max_chunksize"]
+        if MAX_ROWS_PER_FILE is not None:
+            # Chunks are cut at the per-file cap, so only sizes up to it are ever read (and measured)
+            max_size = min(max_size, MAX_ROWS_PER_FILE)
+            min_size = min(min_size, max(1, int(MAX_ROWS_PER_FILE * ADAPTIVE_BATCHING["capped_min_fraction"])))
+            initial_size = min(initial_size, max_size)
+        controller = AdaptiveBatchController(
+            initial_size,
+            min_size,
+            max_size,
+            memory_budget_bytes=ADAPTIVE_BATCHING["memory_budget_mb"] * 1024 ** 2,
+            # queued chunks + one being parsed + one per writer
+            in_flight_chunks=BRONZE_INGEST["queue_size"] + 1 + BRONZE_INGEST["writers"],
+            growth=ADAPTIVE_BATCHING["growth"],
+            samples_per_step=ADAPTIVE_BATCHING["samples_per_step"],
+            tolerance=ADAPTIVE_BATCHING["tolerance"],
+            log_path=ADAPTIVE_BATCHING["log_path"],
+        )
+    
+    def read_chunks(file_path):
+        """Parses one file into (valid rows, rejects) chunks (runs on the parser thread)."""
         file_name = Path(file_path).name
         print(f"Loading data from file: {file_name}")
+        record_rows(bytes_read=os.path.getsize(file_path))
+        rows_read = 0
         
-        try:
-            # Read only the first 10,000 rows using chunking to limit the data size per file
-            # pd.read_csv with chunksize returns an iterator. next() gets the first chunk (max 10,000 rows).
-            chunk_iterator = pd.read_csv(file_path, chunksize=10000)
-            df = next(chunk_iterator)
-            
-            # Convert 'event_time' to datetime (UTC-aware), then remove timezone info
-            df['event_time'] = pd.to_datetime(df['event_time'], utc=True).dt.tz_localize(None)
-
-            # Replace NaN values with None so SQL can handle them
-            df = df.where(pd.notnull(df), None)
-
-            # Append data to Bronze schema
-            df.to_sql(
-                name="ecommerce_behavior",    # target table
-                schema="bronze",             # schema
-                con=engine,                  # database connection
-                if_exists="append",          # append instead of replace
-                index=False                  # do not write DataFrame index
-            )
-            
-            rows_in_file = len(df)
-            total_rows_loaded += rows_in_file
-            print(f"  -> Appended {rows_in_file} rows (max 10,000) from {file_name}.")
-
-        except FileNotFoundError:
-            print(f"❌ ERROR: File not found: {file_name}. Skipping.")
-        except StopIteration:
-            # This handles the case where the file is empty and next() fails
+        # Compressed files are stream-decompressed into the parser (never written to disk).
+        with open_source(file_path, **SOURCE_DECOMPRESSION) as source:
+            with pd.read_csv(source, iterator=True, dtype=BRONZE_CSV_DTYPES) as reader:
+                while True:
+                    # The size of every chunk is decided when it is read
+                    chunksize = controller.size if controller is not None else BRONZE_INGEST["chunksize"]
+                    if MAX_ROWS_PER_FILE is not None:
+                        chunksize = min(chunksize, MAX_ROWS_PER_FILE - rows_read)
+                    try:
+                        df = reader.get_chunk(chunksize)
+                    except StopIteration:
+                        break
+                    first_row = rows_read + 1
+                    rows_read += len(df)
+                    record_rows(rows_in=len(df))
+                
+                    # Check the rows against the Bronze DDL (also converts 'event_time' to a
+                    # timezone-naive datetime); a bad record is quarantined, not the whole file
+                    yield validate_chunk(df, str(file_path), first_row)
+                
+                    if MAX_ROWS_PER_FILE is not None and rows_read >= MAX_ROWS_PER_FILE:
+                        break
+        if rows_read == 0:
             print(f"  -> File {file_name} was empty.")
-        except Exception as e:
-            print(f"❌ ERROR processing {file_name}: {e}. Skipping.")
+    
+    def write_chunk(file_path, chunk):
+        """Quarantines rejects, drops duplicates and appends one chunk to Bronze (runs on a writer thread)."""
+        file_name = Path(file_path).name
+        df, rejects = chunk
+        rows_read = len(df)
+        with write_lock if duplicate_filter is not None else contextlib.nullcontext():
+            with engine.begin() as conn:
+                # Rejects are written in the same transaction as the valid rows of the chunk
+                write_rejects(conn, rejects)
+                
+                # Drop events already in this chunk or in Bronze (only Bloom filter suspects hit the DB)
+                if duplicate_filter is not None:
+                    df, months, fingerprints, dedup_stats = drop_duplicate_events(
+                        conn, df, duplicate_filter, recheck=recheck_duplicates
+                    )
+                    event_times = df["event_time"].to_numpy()   # aligned with the fingerprints (before sorting)
+                    for key, value in dedup_stats.items():
+                        dedup_totals[key] += value
+
+                # Write the chunk in date order, so its rowgroup's min/max ranges stay narrow
+                if SORTED_LOADS["bronze_sort_keys"]:
+                    df = df.sort_values(SORTED_LOADS["bronze_sort_keys"], kind="stable")
 
-    print(f"\n✅ Total rows appended to Bronze layer: {total_rows_loaded}")
+                # Replace NaN values with None so SQL can handle them
+                df = df.where(pd.notnull(df), None)
+
+                # Append data to Bronze schema
+                df.to_sql(
+                    name="ecommerce_behavior",    # target table
+                    schema="bronze",             # schema
+                    con=conn,                    # database connection
+                    if_exists="append",          # append instead of replace
+                    index=False                  # do not write DataFrame index
+                )
+            
+            # Remember the new events only once they are committed
+            if duplicate_filter is not None:
+                duplicate_filter.add(months, fingerprints, event_times)
+        
+        with write_lock:
+            totals["rows_loaded"] += len(df)
+            totals["rows_rejected"] += len(rejects)
+            for reason, count in reject_reason_counts(rejects).items():
+                reject_totals[reason] = reject_totals.get(reason, 0) + count
+        record_rows(rows_out=len(df))
+        if len(rejects):
+            print(f"  -> Quarantined {len(rejects)} invalid rows from {file_name} in bronze.ecommerce_behavior_rejects.")
+        if len(df) < rows_read:
+            print(f"  -> Skipped {rows_read - len(df)} duplicate events from {file_name}.")
+        print(f"  -> Appended {len(df)} rows from {file_name}.")
+    
+    def observe_chunk(chunk, parse_s, write_s):
+        """Feeds the measurements of a written chunk to the adaptive controller."""
+        df, rejects = chunk
+        controller.observe(len(df) + len(rejects), parse_s, write_s, int(df.memory_usage(deep=True).sum()))
+    
+    try:
+        stats = run_ingest_pipeline(
+            csv_files,
+            read_chunks,
+            write_chunk,
+            queue_size=BRONZE_INGEST["queue_size"],
+            writers=BRONZE_INGEST["writers"],
+            observe_chunk=observe_chunk if controller is not None else None,
+        )
+    finally:
+        # Saved even when the load fails, so the filter covers every committed chunk
+        if duplicate_filter is not None:
+            duplicate_filter.save()
+
+    print(f"\n✅ Total rows appended to Bronze layer: {totals['rows_loaded']}")
+    if totals["rows_rejected"]:
+        print(f"⚠️ Rows quarantined in bronze.ecommerce_behavior_rejects: {totals['rows_rejected']}, by reason:")
+        for reason, count in sorted(reject_totals.items(), key=lambda item: -item[1]):
+            print(f"    {reason:<28} {count:>10,}")
+    record_rows(rows_rejected=totals["rows_rejected"])
+    stats.report()
+    record_rows(**stats.as_metrics())
+    if controller is not None:
+        controller.report()
+        record_rows(**controller.as_metrics())
+    
+    if duplicate_filter is not None:
+        duplicate_filter.report()
+        print(f"    Suspects: {dedup_totals['suspects']}, confirmed duplicates: {dedup_totals['confirmed']}, "
+              f"false positives: {dedup_totals['false_positives']}, repeated within a file: {dedup_totals['in_chunk']}")
+        record_rows(
+            duplicates_dropped=dedup_totals["confirmed"] + dedup_totals["in_chunk"],
+            dedup_suspects=dedup_totals["suspects"],
+            dedup_false_positives=dedup_totals["false_positives"],
+            dedup_filter_bytes=duplicate_filter.nbytes,
+        )
+    
+    # Failed files / chunks are not in Bronze: fail the load instead of reporting success
+    if stats.failures:
+        raise RuntimeError(f"Bronze load incomplete, {len(stats.failures)} file(s)/chunk(s) failed: "
+                           f"{'; '.join(stats.failures)}")
     return True
 
+def shard_filters_dir() -> Path:
+    """Folder of the shard-private duplicate filters, merged by the coordinator after a sharded load."""
+    return Path(DUPLICATE_FILTER["directory"]) / "shards"
+
+def run_bronze_shard(shard, attempt: int, config: dict, engine_factory=None):
+    """
+    Worker side of the sharded Bronze load (runs in a worker process): applies
+    the coordinator's Bronze settings, loads the shard's files and returns the
+    stage metrics measured here. Any file or chunk that fails to load fails
+    the shard (load_csvs_to_bronze raises), so it is retried; retries
+    re-check every row for duplicates. Every attempt writes its own private
+    duplicate filter, so shards never share a filter file.
+    """
+    global engine
+    globals().update(copy.deepcopy(config))
+    if engine_factory is not None:
+        engine = instrument_engine(engine_factory())
+    take_stage_metrics()   # a reused worker process starts with an empty collector
+    filter_dir = shard_filters_dir() / shard.shard_id.replace("/", "_") / f"attempt-{attempt}"
+    try:
+        for file_path in shard.files:
+            if not load_csvs_to_bronze.fn(glob.escape(file_path), recheck_duplicates=attempt > 1,
+                                          shard_filter_dir=str(filter_dir)):
+                raise FileNotFoundError(f"Source file not found or unsupported: {file_path}")
+    finally:
+        if engine_factory is not None:
+            engine.dispose()
+    metrics = take_stage_metrics()
+    for stage in metrics:
+        stage.stage = f"{stage.stage}[{shard.shard_id}]"
+    return metrics
+
+@task(name="Load CSVs to Bronze (Sharded)")
+@instrumented_stage
+def load_bronze_sharded(file_pattern: str, workers: int = None, engine_factory=None):
+    """
+    Loads the files matching the pattern into Bronze on a pool of worker
+    processes (DISTRIBUTED_EXECUTION), one shard per file in month order.
+    Failed shards are retried; if a shard still fails this raises, so
+    nothing downstream runs on a partial Bronze load.
+    Shards load with private duplicate filters and run concurrently whatever
+    their months; afterwards their fingerprints are merged into the shared
+    filters and events loaded by more than one shard are removed from Bronze.
+    `engine_factory` (picklable, e.g. functools.partial) creates the workers'
+    engine; by default they connect with DATABASE_CONFIG.
+    """
+    csv_files = find_source_files(file_pattern)
+    if not csv_files:
+        print(f"❌ ERROR: No CSV files found matching pattern: {file_pattern}")
+        return False
+    
+    workers = workers or DISTRIBUTED_EXECUTION["workers"]
+    shards = plan_month_shards(csv_files)
+    print(f"Found {len(csv_files)} files: {len(shards)} shards on {workers} workers.")
+    if DISTRIBUTED_EXECUTION["dask_scheduler"]:
+        executor_factory = dask_executor_factory(DISTRIBUTED_EXECUTION["dask_scheduler"])
+    else:
+        executor_factory = process_pool_factory(workers)
+    
+    config = {name: globals()[name] for name in SHARD_WORKER_CONFIG}
+    report = run_shards(
+        shards,
+        run_bronze_shard,
+        (config, engine_factory),
+        workers=workers,
+        max_retries=DISTRIBUTED_EXECUTION["max_retries"],
+        retry_delay_s=DISTRIBUTED_EXECUTION["retry_delay_s"],
+        executor_factory=executor_factory,
+    )
+    report.report()
+    
+    # Per-shard stages (measured in the workers) are published with this run's telemetry
+    shard_metrics = [stage for metrics in report.results.values() for stage in metrics]
+    add_stage_metrics(shard_metrics)
+    rows_loaded = sum(stage.rows_out or 0 for stage in shard_metrics)
+    
+    # Merge the shard-private filters (also of failed shards: their committed chunks are in Bronze).
+    # Shards could not see each other's rows, so fingerprints recorded by two shards are checked exactly.
+    cross_shard_duplicates = 0
+    if DUPLICATE_FILTER["enabled"]:
+        duplicate_filter = DuplicateFilterStore(
+            DUPLICATE_FILTER["directory"],
+            error_rate=DUPLICATE_FILTER["error_rate"],
+            initial_capacity=DUPLICATE_FILTER["initial_capacity"],
+        )
+        suspect_times = merge_shard_filters(duplicate_filter, shard_filters_dir())
+        with engine.begin() as conn:
+            cross_shard_duplicates = remove_cross_shard_duplicates(conn, suspect_times)
+        duplicate_filter.save()
+        clear_shard_filters(shard_filters_dir())
+        rows_loaded -= cross_shard_duplicates
+        print(f"🔍 Shard filters merged: {len(suspect_times)} event time(s) loaded by several shards, "
+              f"{cross_shard_duplicates} duplicate row(s) removed.")
+    record_rows(
+        rows_in=sum(stage.rows_in or 0 for stage in shard_metrics),
+        rows_out=rows_loaded,
+        shards=len(shards),
+        shard_retries=report.retries,
+        shards_failed=len(report.failed),
+        cross_shard_duplicates=cross_shard_duplicates,
+    )
+    if report.failed:
+        raise RuntimeError(f"{len(report.failed)} Bronze shard(s) failed: "
+                           f"{', '.join(shard.shard_id for shard in report.failed)}")
+    print(f"\n✅ Total rows appended to Bronze layer: {rows_loaded} ({len(shards)} shards).")
+    return True
+
+@task(name="Archive Consumed Bronze Months")
+@instrumented_stage
+def archive_bronze_months():
+    """
+    Archives the Bronze event months that Silver and Gold have consumed
+    (except the latest BRONZE_RETENTION["keep_months"]) to Parquet and removes
+    them from bronze.ecommerce_behavior. Archives interrupted by an earlier
+    run are finished first.
+    """
+    settings = BRONZE_RETENTION
+    with engine.connect() as conn:
+        months = bronze_month_counts(conn)
+        keep = settings["keep_months"]
+        candidates = dict(list(months.items())[:-keep]) if keep else months
+        archivable = consumed_months(conn, candidates)
+    interrupted = [month for month, entry in load_manifest(settings["archive_dir"]).items()
+                   if entry.get("status") == "archiving" and month not in archivable]
+    
+    rows_archived = 0
+    for month in interrupted + archivable:
+        entry = archive_month(
+            engine, month, settings["archive_dir"],
+            chunksize=settings["chunksize"],
+            compression=settings["compression"],
+            delete_batch_rows=settings["delete_batch_rows"],
+        )
+        rows_archived += entry["rows"]
+        print(f"  -> {month}: {entry['rows']} rows archived, removed by {entry['removal']}.")
+        if entry["rows_left_in_bronze"]:
+            print(f"⚠️ {entry['rows_left_in_bronze']} rows of {month} were loaded during archiving and stay in Bronze.")
+    
+    pending = [month for month in candidates if month not in archivable]
+    if pending:
+        print(f"    Not yet consumed by Silver/Gold (kept): {', '.join(pending)}")
+    record_rows(rows_in=rows_archived, rows_out=rows_archived, months_archived=len(interrupted) + len(archivable))
+    print(f"✅ Bronze retention: {len(interrupted) + len(archivable)} month(s) archived to "
+          f"{settings['archive_dir']} ({rows_archived} rows); {len(months) - len(archivable)} month(s) live.")
+    return True
+
+@task(name="Restore Archived Bronze Months")
+@instrumented_stage
+def restore_bronze_months(months: list):
+    """Inserts archived event months ('YYYY-MM') back into bronze.ecommerce_behavior."""
+    rows_restored = 0
+    for month in months:
+        rows = restore_month(engine, month, BRONZE_RETENTION["archive_dir"], chunksize=BRONZE_RETENTION["chunksize"])
+        rows_restored += rows
+        print(f"  -> {month}: {rows} rows restored to Bronze.")
+    record_rows(rows_out=rows_restored)
+    print(f"✅ Restored {len(months)} month(s) ({rows_restored} rows) from {BRONZE_RETENTION['archive_dir']}.")
+    return True
+
+@task(name="Report Columnstore Segment Overlap")
+@instrumented_stage
+def report_columnstore_segments(rowgroup_rows: int = None):
+    """
+    Prints how much the segment min/max ranges of the columnstore tables
+    overlap (SEGMENT_COLUMNS in columnstore_segments.py), i.e. how many
+    segments date and key filters can eliminate.
+    """
+    with engine.connect() as conn:
+        results = measure_segment_overlap(
+            conn, rowgroup_rows=rowgroup_rows or SORTED_LOADS["standin_rowgroup_rows"]
+        )
+    report_segment_overlap(results, simulated=engine.dialect.name != "mssql")
+    record_rows(**{
+        f"segment_scan_fraction_{result.table.replace('.', '_')}_{result.column}": result.scan_fraction
+        for result in results if result.segments
+    })
+    return True
+
+# --- Sampled DQ (shared) ---
+def sampled_rate_check(source: str, metrics: dict) -> bool:
+    """
+    Estimates the rates of `metrics` on a sample of `source` (DQ_SAMPLING) and
+    prints them. Returns True when the exact check should run.
+    """
+    max_rates = {
+        name: DQ_SAMPLING["max_null_rate"] if name.endswith("_null") else DQ_SAMPLING["max_unknown_rate"]
+        for name in metrics
+    }
+    max_rates.update({name: rate for name, rate in DQ_SAMPLING["max_rates"].items() if name in metrics})
+    with engine.connect().execution_options(stream_results=True) as conn:
+        estimates, method = estimate_rates(
+            conn, source, metrics, max_rates,
+            percent=DQ_SAMPLING["percent"],
+            reservoir_size=DQ_SAMPLING["reservoir_size"],
+            confidence=DQ_SAMPLING["confidence"],
+            design_effect=DQ_SAMPLING["design_effect"],
+            seed=DQ_SAMPLING["seed"],
+        )
+    sample_rows = estimates[0].sample_rows if estimates else 0
+    escalate = report_rate_estimates(estimates, method, DQ_SAMPLING["confidence"], DQ_SAMPLING["min_sample_rows"])
+    record_rows(rows_in=sample_rows, dq_sample_rows=sample_rows, dq_escalated=escalate)
+    return escalate
+
 # --- Bronze DQ Tasks ---
 @task(name="DQ: Check Invalid IDs (Bronze)")
+@instrumented_stage
+@dq_cache.cached("bronze.ecommerce_behavior")
 def dq_invalid_ids():
     query = """
     SELECT *
@@ -129,6 +696,7 @@ def dq_invalid_ids():
     """
     with engine.begin() as conn:
         rows = conn.execute(text(query)).fetchall()
+    record_rows(rows_out=len(rows))
     print("\n--- 1. Bronze DQ: Invalid Product/Category IDs ---")
     if rows:
         print(f"❌ Found {len(rows)} invalid rows. First 5 shown:")
@@ -138,6 +706,8 @@ def dq_invalid_ids():
         print("✅ No invalid product_id or category_id found.")
 
 @task(name="DQ: Check Nulls and Distinct Counts (Bronze)")
+@instrumented_stage
+@dq_cache.cached("bronze.ecommerce_behavior")
 def dq_nulls_and_distincts():
     query = """
     SELECT
@@ -159,11 +729,14 @@ def dq_nulls_and_distincts():
     with engine.begin() as conn:
         result = conn.execute(text(query)).fetchone()
     stats = dict(result._mapping)
+    record_rows(rows_in=stats.get("total_rows"))
     print("\n--- 2. Bronze DQ: Null Counts and Distincts ---")
     for col, val in stats.items():
         print(f"    {col}: {val}")
 
 @task(name="DQ: Check Duplicate Product IDs (Bronze)")
+@instrumented_stage
+@dq_cache.cached("bronze.ecommerce_behavior")
 def dq_duplicate_products():
     query = """
     SELECT COUNT(*) AS total_duplicates
@@ -187,15 +760,36 @@ def dq_duplicate_products():
 # 3. Silver Layer Tasks (Load & DQ)
 # =================================================
 
-@task(name="Load Silver Layer via SP")
-def load_silver():
+@task(name="Load Silver Layer")
+@instrumented_stage
+def load_silver(transform_engine: str = None):
+    """
+    Rebuilds the Silver layer from Bronze with the chosen transform engine
+    ("sql" = stored procedure, "python" = vectorized chunk-parallel transform).
+    Both engines produce identical rows.
+    """
+    transform_engine = transform_engine or SILVER_TRANSFORM_ENGINE
+    if transform_engine == "python":
+        with engine.begin() as conn:
+            rows_in = table_row_count(conn, "bronze.ecommerce_behavior")
+        rows_out = load_silver_python(engine, **SILVER_PYTHON_ENGINE)
+        record_rows(rows_in=rows_in, rows_out=rows_out)
+        print(f"\n✅ Silver layer loaded via Python transform engine ({rows_out} rows).")
+        return True
+    if transform_engine != "sql":
+        raise ValueError(f"Unknown Silver transform engine: {transform_engine!r} (use 'sql' or 'python')")
+
     with engine.begin() as conn:
+        rows_in = table_row_count(conn, "bronze.ecommerce_behavior")
         conn.execute(text("EXEC silver.LoadEcommerceBehavior"))
+        record_rows(rows_in=rows_in, rows_out=table_row_count(conn, "silver.ecommerce_behavior"))
     print("\n✅ Silver layer loaded via stored procedure.")
     return True
 
 # --- Silver DQ Tasks ---
 @task(name="DQ: Check Nulls and Distinct Counts (Silver)")
+@instrumented_stage
+@dq_cache.cached("silver.ecommerce_behavior")
 def dq_nulls_and_distincts_silver():
     query = """
     SELECT
@@ -218,14 +812,18 @@ def dq_nulls_and_distincts_silver():
     with engine.begin() as conn:
         result = conn.execute(text(query)).fetchone()
     stats = dict(result._mapping)
+    record_rows(rows_in=stats.get("total_rows"))
     print("\n--- 1. Silver DQ: Null Counts and Distincts ---")
     for col, val in stats.items():
         print(f"    {col}: {val}")
 
 @task(name="DQ: Check UNKNOWN Values (Silver)")
+@instrumented_stage
+@dq_cache.cached("silver.ecommerce_behavior")
 def dq_unknown_values_silver():
     query = """
     SELECT
+        COUNT(*) AS total_rows,
         SUM(CASE WHEN category = 'UNKNOWN' THEN 1 ELSE 0 END) AS category_unknowns,
         SUM(CASE WHEN subcategory = 'UNKNOWN' THEN 1 ELSE 0 END) AS subcategory_unknowns,
         SUM(CASE WHEN brand = 'UNKNOWN' THEN 1 ELSE 0 END) AS brand_unknowns,
@@ -235,11 +833,14 @@ def dq_unknown_values_silver():
     with engine.begin() as conn:
         result = conn.execute(text(query)).fetchone()
     stats = dict(result._mapping)
+    record_rows(rows_in=stats.get("total_rows"))
     print("\n--- 2. Silver DQ: UNKNOWN Value Counts ---")
     for col, val in stats.items():
         print(f"    {col}: {val}")
 
 @task(name="DQ: Check Duplicate Product IDs (Silver)")
+@instrumented_stage
+@dq_cache.cached("silver.ecommerce_behavior")
 def dq_duplicate_products_silver():
     query = """
     SELECT COUNT(*) AS total_duplicates
@@ -259,26 +860,158 @@ def dq_duplicate_products_silver():
     else:
         print("✅ No duplicate product_id values found.")
 
+SILVER_RATE_SOURCE = "silver.ecommerce_behavior {sample}"
+SILVER_RATE_METRICS = {
+    "event_time_null": "event_time_only IS NULL",
+    "event_date_null": "event_date IS NULL",
+    "event_type_null": "event_type IS NULL",
+    "product_id_null": "product_id IS NULL",
+    "category_id_null": "category_id IS NULL",
+    "brand_null": "brand IS NULL",
+    "price_null": "price IS NULL",
+    "user_id_null": "user_id IS NULL",
+    "user_session_null": "user_session IS NULL",
+    "category_unknown": "category = 'UNKNOWN'",
+    "subcategory_unknown": "subcategory = 'UNKNOWN'",
+    "brand_unknown": "brand = 'UNKNOWN'",
+    "user_session_unknown": "user_session = 'UNKNOWN'",
+}
+
+@task(name="DQ (sampled): Null/UNKNOWN Rates (Silver)")
+@instrumented_stage
+def dq_rates_sampled_silver():
+    """Sampled null/UNKNOWN rates of Silver. Returns True if the exact checks should run."""
+    print("\n--- 1-2. Silver DQ (sampled): Null and UNKNOWN Rates ---")
+    return sampled_rate_check(SILVER_RATE_SOURCE, SILVER_RATE_METRICS)
+
 # =================================================
 # 4. Gold Layer Tasks (Load & DQ)
 # =================================================
 
 @task(name="Load Gold Fact Table via SP")
+@instrumented_stage
 def load_gold_fact():
     with engine.begin() as conn:
+        rows_before = table_row_count(conn, "gold.fact_ecommerce")
         conn.execute(text("EXEC gold.LoadFactEcommerce"))
+        record_rows(
+            rows_in=table_row_count(conn, "silver.ecommerce_behavior"),
+            rows_out=table_row_count(conn, "gold.fact_ecommerce") - rows_before,
+        )
     print("\n✅ Gold Fact Ecommerce loaded via stored procedure.")
     return True
 
+@task(name="Load Gold Lookup Dims (Brand/Category/Session) via SP")
+@instrumented_stage
+def load_gold_dim_lookups():
+    lookup_tables = ("gold.dim_brand", "gold.dim_category", "gold.dim_session")
+    with engine.begin() as conn:
+        rows_before = sum(table_row_count(conn, table) for table in lookup_tables)
+        conn.execute(text("EXEC gold.LoadDimLookups"))
+        record_rows(
+            rows_in=table_row_count(conn, "silver.ecommerce_behavior"),
+            rows_out=sum(table_row_count(conn, table) for table in lookup_tables) - rows_before,
+        )
+    print("✅ Gold lookup dims (brand, category, session) loaded via stored procedure.")
+    return True
+
+@task(name="Load Gold Calendar Dims (Date/Time)")
+@instrumented_stage
+def load_gold_dim_calendar():
+    """Extends gold.dim_date to Silver's date range and fills gold.dim_time if needed."""
+    dates_added, times_added = load_calendar_dims(engine, **CALENDAR_DIMS)
+    record_rows(rows_out=dates_added + times_added)
+    print(f"✅ Gold calendar dims loaded: {dates_added} new date(s), {times_added} time(s) of day.")
+    return True
+
 @task(name="Load Gold Dim Products Table via SP")
+@instrumented_stage
 def load_gold_dim_products():
     with engine.begin() as conn:
         conn.execute(text("EXEC gold.LoadDimProducts"))
+        record_rows(
+            rows_in=table_row_count(conn, "silver.ecommerce_behavior"),
+            rows_out=table_row_count(conn, "gold.dim_products"),
+        )
     print("✅ Gold Dim Products table loaded via stored procedure.")
+    bitmap = refresh_product_bitmap(engine, PRODUCT_BITMAP_PATH)
+    record_rows(bitmap_bytes=bitmap.nbytes, bitmap_containers=len(bitmap.containers))
+    print(f"✅ Product-id bitmap rebuilt ({len(bitmap)} ids, {bitmap.nbytes / 1024:.1f} KB).")
+    return True
+
+def pending_fact_batches(conn, consumer: str):
+    """Number of fact load batches (and their rows) not yet processed by `consumer`."""
+    query = """
+    SELECT COUNT(*) AS pending_batches, COALESCE(SUM(b.row_count), 0) AS pending_rows
+    FROM gold.fact_load_batches b
+    WHERE NOT EXISTS (
+        SELECT 1 FROM gold.batch_consumers c
+        WHERE c.consumer = :consumer AND c.batch_id = b.batch_id
+    );
+    """
+    return conn.execute(text(query), {"consumer": consumer}).fetchone()
+
+@task(name="Refresh Gold Daily Rollups via SP")
+@instrumented_stage
+def refresh_gold_daily_rollups():
+    """Adds the fact load batches that are not rolled up yet to the daily rollups."""
+    rollup_tables = ("gold.agg_daily_product_event", "gold.agg_daily_category_funnel")
+    with engine.begin() as conn:
+        pending = pending_fact_batches(conn, "daily_rollups")
+        rows_before = sum(table_row_count(conn, table) for table in rollup_tables)
+        conn.execute(text("EXEC gold.RefreshDailyRollups"))
+        record_rows(
+            rows_in=pending.pending_rows,
+            rows_out=sum(table_row_count(conn, table) for table in rollup_tables) - rows_before,
+            batches=pending.pending_batches,
+        )
+    print(f"✅ Gold daily rollups refreshed from {pending.pending_batches} new fact batch(es) "
+          f"({pending.pending_rows} rows).")
+    return True
+
+@task(name="Refresh Gold User Features via SP")
+@instrumented_stage
+def refresh_gold_user_features():
+    """Merges the per-user aggregates of the new fact batches into gold.user_features."""
+    with engine.begin() as conn:
+        pending = pending_fact_batches(conn, "user_features")
+        users_before = table_row_count(conn, "gold.user_features")
+        conn.execute(text("EXEC gold.RefreshUserFeatures"))
+        record_rows(
+            rows_in=pending.pending_rows,
+            rows_out=table_row_count(conn, "gold.user_features") - users_before,
+            batches=pending.pending_batches,
+        )
+    print(f"✅ Gold user features refreshed from {pending.pending_batches} new fact batch(es) "
+          f"({pending.pending_rows} rows).")
+    return True
+
+@task(name="Load Gold Session Fact (Streaming Sessionizer)")
+@instrumented_stage
+def load_gold_fact_sessions():
+    """Sessionizes the new fact batches and merges them into gold.fact_sessions."""
+    events_read, sessions_merged = load_fact_sessions(engine, **SESSIONIZATION)
+    record_rows(rows_in=events_read, rows_out=sessions_merged)
+    print(f"✅ Gold session fact updated: {events_read} events -> {sessions_merged} sessions merged.")
+    return True
+
+@task(name="Export Gold to Parquet")
+@instrumented_stage
+def export_gold_parquet():
+    """Writes the changed fact date partitions and, if it changed, the product dim to Parquet."""
+    settings = {key: value for key, value in GOLD_PARQUET_EXPORT.items() if key != "enabled"}
+    partitions, fact_rows = export_fact_partitions(engine, **settings)
+    dim_rows = export_dim_products(engine, **settings)
+    record_rows(rows_out=fact_rows + dim_rows, partitions=partitions)
+    dim_status = f"{dim_rows} rows" if dim_rows else "unchanged"
+    print(f"✅ Gold exported to Parquet in {settings['output_dir']}: {partitions} fact partition(s) "
+          f"({fact_rows} rows), dim_products {dim_status}.")
     return True
 
 # --- Gold DQ Tasks ---
 @task(name="DQ: Check Duplicate Event Keys (Gold Fact)")
+@instrumented_stage
+@dq_cache.cached("gold.fact_ecommerce")
 def check_event_key_duplicates():
     query = """
     SELECT event_key, COUNT(*) AS duplicate_count
@@ -288,6 +1021,7 @@ def check_event_key_duplicates():
     """
     with engine.begin() as conn:
         results = conn.execute(text(query)).fetchall()
+    record_rows(rows_out=len(results))
     
     print("\n--- 1. Gold DQ: Duplicate Event Keys in Fact Table ---")
     if results:
@@ -298,29 +1032,41 @@ def check_event_key_duplicates():
         print("✅ No duplicate event_keys found.")
 
 @task(name="DQ: Check Nulls/Unknowns/Distincts (Gold Fact)")
+@instrumented_stage
+@dq_cache.cached("gold.fact_ecommerce", "gold.dim_category", "gold.dim_date", "gold.dim_time")
 def check_fact_nulls_unknowns():
     query = """
     SELECT
         COUNT(*) AS total_rows,
-        SUM(CASE WHEN event_key IS NULL THEN 1 ELSE 0 END)        AS event_key_null_count,
-        SUM(CASE WHEN event_date IS NULL THEN 1 ELSE 0 END)       AS event_date_null_count,
-        SUM(CASE WHEN event_time_only IS NULL THEN 1 ELSE 0 END)  AS event_time_only_null_count,
-        SUM(CASE WHEN event_type IS NULL THEN 1 ELSE 0 END)       AS event_type_null_count,
-        SUM(CASE WHEN product_id IS NULL THEN 1 ELSE 0 END)       AS product_id_null_count,
-        SUM(CASE WHEN category IS NULL THEN 1 ELSE 0 END)         AS category_null_count,
-        SUM(CASE WHEN subcategory IS NULL THEN 1 ELSE 0 END)      AS subcategory_null_count,
-        SUM(CASE WHEN price IS NULL THEN 1 ELSE 0 END)            AS price_null_count,
-        SUM(CASE WHEN user_id IS NULL THEN 1 ELSE 0 END)          AS user_id_null_count,
-        SUM(CASE WHEN user_session IS NULL THEN 1 ELSE 0 END)     AS user_session_null_count,
-        SUM(CASE WHEN category = 'UNKNOWN' THEN 1 ELSE 0 END)     AS category_unknown_count,
-        SUM(CASE WHEN subcategory = 'UNKNOWN' THEN 1 ELSE 0 END)  AS subcategory_unknown_count,
-        COUNT(DISTINCT category)        AS total_distinct_category,
-        COUNT(DISTINCT subcategory)     AS total_distinct_subcategory,
-        COUNT(DISTINCT product_id)      AS total_distinct_product_id
-    FROM gold.fact_ecommerce;
+        SUM(CASE WHEN f.event_key IS NULL THEN 1 ELSE 0 END)        AS event_key_null_count,
+        SUM(CASE WHEN f.event_date IS NULL THEN 1 ELSE 0 END)       AS event_date_null_count,
+        SUM(CASE WHEN f.event_time_only IS NULL THEN 1 ELSE 0 END)  AS event_time_only_null_count,
+        SUM(CASE WHEN f.event_type IS NULL THEN 1 ELSE 0 END)       AS event_type_null_count,
+        SUM(CASE WHEN f.product_id IS NULL THEN 1 ELSE 0 END)       AS product_id_null_count,
+        SUM(CASE WHEN f.category_key IS NULL THEN 1 ELSE 0 END)     AS category_key_null_count,
+        SUM(CASE WHEN f.brand_key IS NULL THEN 1 ELSE 0 END)        AS brand_key_null_count,
+        SUM(CASE WHEN f.price IS NULL THEN 1 ELSE 0 END)            AS price_null_count,
+        SUM(CASE WHEN f.user_id IS NULL THEN 1 ELSE 0 END)          AS user_id_null_count,
+        SUM(CASE WHEN f.session_key IS NULL THEN 1 ELSE 0 END)      AS session_key_null_count,
+        SUM(CASE WHEN c.category = 'UNKNOWN' THEN 1 ELSE 0 END)     AS category_unknown_count,
+        SUM(CASE WHEN c.subcategory = 'UNKNOWN' THEN 1 ELSE 0 END)  AS subcategory_unknown_count,
+        SUM(CASE WHEN f.session_key = 0 THEN 1 ELSE 0 END)          AS session_unknown_count,
+        SUM(CASE WHEN d.date_key IS NULL THEN 1 ELSE 0 END)         AS date_key_unknown_count,
+        SUM(CASE WHEN t.time_key IS NULL THEN 1 ELSE 0 END)         AS time_key_unknown_count,
+        COUNT(DISTINCT c.category)      AS total_distinct_category,
+        COUNT(DISTINCT c.subcategory)   AS total_distinct_subcategory,
+        COUNT(DISTINCT f.product_id)    AS total_distinct_product_id
+    FROM gold.fact_ecommerce f
+    LEFT JOIN gold.dim_category c
+        ON c.category_key = f.category_key
+    LEFT JOIN gold.dim_date d
+        ON d.date_key = f.date_key
+    LEFT JOIN gold.dim_time t
+        ON t.time_key = f.time_key;
     """
     with engine.begin() as conn:
         result = conn.execute(text(query)).fetchone()
+    record_rows(rows_in=result.total_rows)
     
     print("\n--- 2. Gold DQ: Fact Ecommerce Summary ---")
     for key, value in result._mapping.items():
@@ -329,27 +1075,58 @@ def check_fact_nulls_unknowns():
         else:
             print(f"    {key}: {value}")
 
+FACT_RATE_SOURCE = (
+    "gold.fact_ecommerce f {sample} LEFT JOIN gold.dim_category c ON c.category_key = f.category_key"
+    " LEFT JOIN gold.dim_date d ON d.date_key = f.date_key LEFT JOIN gold.dim_time t ON t.time_key = f.time_key"
+)
+FACT_RATE_METRICS = {
+    "event_key_null": "f.event_key IS NULL",
+    "event_date_null": "f.event_date IS NULL",
+    "event_time_only_null": "f.event_time_only IS NULL",
+    "event_type_null": "f.event_type IS NULL",
+    "product_id_null": "f.product_id IS NULL",
+    "category_key_null": "f.category_key IS NULL",
+    "brand_key_null": "f.brand_key IS NULL",
+    "price_null": "f.price IS NULL",
+    "user_id_null": "f.user_id IS NULL",
+    "session_key_null": "f.session_key IS NULL",
+    "category_unknown": "c.category = 'UNKNOWN'",
+    "subcategory_unknown": "c.subcategory = 'UNKNOWN'",
+    "session_unknown": "f.session_key = 0",
+    "date_key_unknown": "d.date_key IS NULL",
+    "time_key_unknown": "t.time_key IS NULL",
+}
+
+@task(name="DQ (sampled): Null/UNKNOWN Rates (Gold Fact)")
+@instrumented_stage
+def check_fact_rates_sampled():
+    """Sampled null/UNKNOWN rates of the fact table. Returns True if the exact check should run."""
+    print("\n--- 2. Gold DQ (sampled): Fact Null/UNKNOWN Rates ---")
+    return sampled_rate_check(FACT_RATE_SOURCE, FACT_RATE_METRICS)
+
 @task(name="DQ: Check Fact to Dim Referential Integrity (Gold)")
+@instrumented_stage
 def check_referential_integrity():
-    query = """
-    SELECT f.product_id
-    FROM gold.fact_ecommerce f
-    LEFT JOIN gold.dim_products p
-        ON f.product_id = p.product_id
-    WHERE p.product_id IS NULL;
     """
-    with engine.begin() as conn:
-        results = conn.execute(text(query)).fetchall()
+    Checks the fact batches not yet checked against the dim_products bitmap
+    (vectorized membership test in Python, no join over the fact history).
+    """
+    bitmap = load_product_bitmap(engine, PRODUCT_BITMAP_PATH)
+    rows_checked, orphan_rows, missing_sample = check_new_fact_batches(engine, bitmap)
+    record_rows(rows_in=rows_checked, rows_out=orphan_rows)
     
     print("\n--- 3. Gold DQ: Referential Integrity (Fact -> Dim) ---")
-    if results:
-        print(f"⚠️ Found {len(results)} fact records without a matching product in dim_products.")
-        for row in results[:5]:
-            print(f"    Product ID missing in Dim: {row.product_id}")
+    print(f"    New fact rows checked: {rows_checked}")
+    if orphan_rows:
+        print(f"⚠️ Found {orphan_rows} fact records without a matching product in dim_products.")
+        for product_id in missing_sample:
+            print(f"    Product ID missing in Dim: {product_id}")
     else:
         print("✅ All fact products exist in dim_products.")
 
 @task(name="DQ: Check Brand/Category Consistency (Silver vs. Gold Dim)")
+@instrumented_stage
+@dq_cache.cached("silver.ecommerce_behavior", "gold.dim_products")
 def check_brand_category_consistency():
     brand_query = """
     SELECT COUNT(DISTINCT f.brand) AS mismatched_brands
@@ -380,6 +1157,71 @@ def check_brand_category_consistency():
     else:
         print("✅ No category mismatches found.")
 
+@task(name="DQ: Check Daily Rollups vs. Fact (Gold)")
+@instrumented_stage
+@dq_cache.cached(
+    "gold.fact_ecommerce", "gold.fact_load_batches", "gold.batch_consumers",
+    "gold.agg_daily_product_event", "gold.agg_daily_category_funnel",
+)
+def check_daily_rollups():
+    # Only fact rows of batches already rolled up are compared, so a pending
+    # batch is not reported as a mismatch.
+    query = """
+    WITH fact_days AS (
+        SELECT
+            f.event_date,
+            COUNT(*) AS event_count,
+            SUM(CASE WHEN f.event_type IN ('view', 'cart', 'purchase') THEN 1 ELSE 0 END) AS funnel_events,
+            COALESCE(SUM(CASE WHEN f.event_type = 'purchase' THEN f.price END), 0) AS revenue
+        FROM gold.fact_ecommerce f
+        JOIN gold.fact_load_batches b
+            ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+        JOIN gold.batch_consumers c
+            ON c.batch_id = b.batch_id AND c.consumer = 'daily_rollups'
+        GROUP BY f.event_date
+    ),
+    product_days AS (
+        SELECT event_date, SUM(event_count) AS event_count, SUM(revenue) AS revenue
+        FROM gold.agg_daily_product_event
+        GROUP BY event_date
+    ),
+    funnel_days AS (
+        SELECT event_date, SUM(view_count + cart_count + purchase_count) AS funnel_events, SUM(revenue) AS revenue
+        FROM gold.agg_daily_category_funnel
+        GROUP BY event_date
+    )
+    SELECT
+        COALESCE(f.event_date, p.event_date, u.event_date) AS event_date,
+        f.event_count   AS fact_events,
+        p.event_count   AS rollup_events,
+        f.funnel_events AS fact_funnel_events,
+        u.funnel_events AS rollup_funnel_events,
+        f.revenue       AS fact_revenue,
+        p.revenue       AS rollup_revenue
+    FROM fact_days f
+    FULL OUTER JOIN product_days p ON p.event_date = f.event_date
+    FULL OUTER JOIN funnel_days u ON u.event_date = COALESCE(f.event_date, p.event_date)
+    WHERE f.event_date IS NULL OR p.event_date IS NULL OR u.event_date IS NULL
+       OR f.event_count <> p.event_count
+       OR f.funnel_events <> u.funnel_events
+       OR ABS(f.revenue - p.revenue) > 0.01
+       OR ABS(f.revenue - u.revenue) > 0.01
+    ORDER BY 1;
+    """
+    with engine.begin() as conn:
+        results = conn.execute(text(query)).fetchall()
+    record_rows(rows_out=len(results))
+
+    print("\n--- 5. Gold DQ: Daily Rollups vs. Fact Table ---")
+    if results:
+        print(f"⚠️ Rollups disagree with the fact table on {len(results)} day(s).")
+        for row in results[:5]:
+            print(f"    {row.event_date}: events {row.fact_events} vs {row.rollup_events}, "
+                  f"funnel {row.fact_funnel_events} vs {row.rollup_funnel_events}, "
+                  f"revenue {row.fact_revenue} vs {row.rollup_revenue}")
+    else:
+        print("✅ Daily rollups match the fact table.")
+
 # =================================================
 # 5. Prefect Flow Definitions
 # =================================================
@@ -393,34 +1235,72 @@ def bronze_load_flow():
     # Pass the global file pattern to the task
     load_csvs_to_bronze(SOURCE_FILES_PATTERN)
 
+@flow(name="Bronze Layer Sharded Load Flow")
+def bronze_sharded_load_flow(workers: int = None):
+    """Loads the Bronze layer on DISTRIBUTED_EXECUTION workers, sharded by source file and month."""
+    print("\n===============================")
+    print("⚡ Starting Bronze Layer Load (sharded)...")
+    print("===============================")
+    load_bronze_sharded(SOURCE_FILES_PATTERN, workers)
+
+@flow(name="Bronze Layer Retention Flow")
+def bronze_retention_flow():
+    """Archives consumed Bronze months to Parquet and removes them from the live table."""
+    print("\n===============================")
+    print("⚡ Starting Bronze Retention...")
+    print("===============================")
+    archive_bronze_months()
+
+@flow(name="Bronze Layer Restore Flow")
+def bronze_restore_flow(months: list):
+    """
+    Brings archived Bronze months back for reprocessing; the next pipeline run
+    reloads them into Silver and Gold (and archives them again once consumed,
+    if retention is enabled).
+    """
+    print("\n===============================")
+    print(f"⚡ Restoring Bronze months: {', '.join(months)}...")
+    print("===============================")
+    restore_bronze_months(months)
+
 @flow(name="Bronze Layer DQ Flow")
-def bronze_dq_flow():
-    """Orchestrates data quality checks on the Bronze layer."""
+def bronze_dq_flow(force_refresh: bool = False):
+    """
+    Orchestrates data quality checks on the Bronze layer. Checks whose tables
+    are unchanged are served from the DQ cache unless `force_refresh`.
+    """
     print("\n===============================")
     print("⚡ Starting Bronze Layer DQ Checks...")
     print("===============================")
-    dq_invalid_ids()
-    dq_nulls_and_distincts()
-    dq_duplicate_products()
+    dq_invalid_ids(force_refresh=force_refresh)
+    dq_nulls_and_distincts(force_refresh=force_refresh)
+    dq_duplicate_products(force_refresh=force_refresh)
     print("🏁 Bronze DQ checks completed.")
 
 @flow(name="Silver Layer Load Flow")
-def silver_load_flow():
-    """Orchestrates loading data into the Silver layer via SP."""
+def silver_load_flow(transform_engine: str = None):
+    """Orchestrates loading data into the Silver layer (SP or Python engine)."""
     print("\n===============================")
     print("⚡ Starting Silver Layer Load...")
     print("===============================")
-    load_silver()
+    load_silver(transform_engine)
 
 @flow(name="Silver Layer DQ Flow")
-def silver_dq_flow():
-    """Orchestrates data quality checks on the Silver layer."""
+def silver_dq_flow(force_refresh: bool = False, sampled: bool = None):
+    """
+    Orchestrates data quality checks on the Silver layer. Checks whose tables
+    are unchanged are served from the DQ cache unless `force_refresh`.
+    With `sampled` (default DQ_SAMPLING["enabled"]) the null/UNKNOWN rates are
+    estimated on a sample and the exact checks run only on escalation.
+    """
     print("\n===============================")
     print("⚡ Starting Silver Layer DQ Checks...")
     print("===============================")
-    dq_nulls_and_distincts_silver()
-    dq_unknown_values_silver()
-    dq_duplicate_products_silver()
+    sampled = DQ_SAMPLING["enabled"] if sampled is None else sampled
+    if not sampled or dq_rates_sampled_silver():
+        dq_nulls_and_distincts_silver(force_refresh=force_refresh)
+        dq_unknown_values_silver(force_refresh=force_refresh)
+    dq_duplicate_products_silver(force_refresh=force_refresh)
     print("🏁 Silver DQ checks completed.")
 
 @flow(name="Gold Layer Fact Load Flow")
@@ -439,16 +1319,81 @@ def gold_dim_products_load_flow():
     print("===============================")
     load_gold_dim_products()
 
+@flow(name="Gold Layer Lookup Dims Load Flow")
+def gold_dim_lookups_load_flow():
+    """Orchestrates loading the Gold lookup dims (brand, category, session)."""
+    print("\n===============================")
+    print("⚡ Starting Gold Lookup Dims Load...")
+    print("===============================")
+    load_gold_dim_lookups()
+
+@flow(name="Gold Layer Calendar Dims Load Flow")
+def gold_dim_calendar_load_flow():
+    """Orchestrates loading the Gold calendar dims (date, time of day)."""
+    print("\n===============================")
+    print("⚡ Starting Gold Calendar Dims Load...")
+    print("===============================")
+    load_gold_dim_calendar()
+
+@flow(name="Gold Layer Daily Rollups Refresh Flow")
+def gold_rollups_refresh_flow():
+    """Refreshes the daily rollup tables from the new fact batches."""
+    print("\n===============================")
+    print("⚡ Starting Gold Daily Rollups Refresh...")
+    print("===============================")
+    refresh_gold_daily_rollups()
+
+@flow(name="Gold Layer User Features Refresh Flow")
+def gold_user_features_refresh_flow():
+    """Merges the new fact batches into the per-user feature table."""
+    print("\n===============================")
+    print("⚡ Starting Gold User Features Refresh...")
+    print("===============================")
+    refresh_gold_user_features()
+
+@flow(name="Gold Layer Session Fact Load Flow")
+def gold_sessions_load_flow():
+    """Builds / extends gold.fact_sessions from the new fact batches."""
+    print("\n===============================")
+    print("⚡ Starting Gold Session Fact Load...")
+    print("===============================")
+    load_gold_fact_sessions()
+
+@flow(name="Gold Layer Parquet Export Flow")
+def gold_parquet_export_flow():
+    """Exports the Gold partitions changed since the last export to Parquet."""
+    print("\n===============================")
+    print("⚡ Starting Gold Parquet Export...")
+    print("===============================")
+    export_gold_parquet()
+
+@flow(name="Columnstore Segment Report Flow")
+def columnstore_segment_report_flow():
+    """Reports the segment min/max overlap of the Bronze, Silver and Gold columnstore tables."""
+    print("\n===============================")
+    print("⚡ Measuring Columnstore Segment Overlap...")
+    print("===============================")
+    report_columnstore_segments()
+
 @flow(name="Gold Layer DQ Flow")
-def gold_dq_flow():
-    """Orchestrates data quality and integrity checks on the Gold layer."""
+def gold_dq_flow(force_refresh: bool = False, sampled: bool = None):
+    """
+    Orchestrates data quality and integrity checks on the Gold layer. Checks
+    whose tables are unchanged are served from the DQ cache unless
+    `force_refresh` (the RI check is incremental and always runs).
+    With `sampled` (default DQ_SAMPLING["enabled"]) the fact null/UNKNOWN
+    rates are estimated on a sample and the exact check runs only on escalation.
+    """
     print("\n===============================")
     print("⚡ Starting Gold Layer DQ Checks...")
     print("===============================")
-    check_event_key_duplicates()
-    check_fact_nulls_unknowns()
+    sampled = DQ_SAMPLING["enabled"] if sampled is None else sampled
+    check_event_key_duplicates(force_refresh=force_refresh)
+    if not sampled or check_fact_rates_sampled():
+        check_fact_nulls_unknowns(force_refresh=force_refresh)
     check_referential_integrity()
-    check_brand_category_consistency()
+    check_brand_category_consistency(force_refresh=force_refresh)
+    check_daily_rollups(force_refresh=force_refresh)
     print("🏁 Gold DQ checks completed.")
 
 # =================================================
@@ -456,29 +1401,71 @@ def gold_dq_flow():
 # =================================================
 
 @flow(name="Medallion ETL Pipeline Master Flow")
-def medallion_pipeline_flow():
+def medallion_pipeline_flow(silver_transform_engine: str = None, dq_force_refresh: bool = False,
+                            dq_sampled: bool = None, distributed: bool = None):
     """
     The master flow that orchestrates the entire Bronze -> Silver -> Gold 
     pipeline with all embedded Data Quality checks.
+    `silver_transform_engine` overrides SILVER_TRANSFORM_ENGINE for this run.
+    `dq_force_refresh` recomputes every DQ check instead of using the DQ cache.
+    `dq_sampled` overrides DQ_SAMPLING["enabled"] for the Silver and Gold DQ flows.
+    `distributed` overrides DISTRIBUTED_EXECUTION["enabled"]: the Bronze load runs
+    sharded on worker processes, and the later stages run once on the merged result.
     """
     print("\n========================================================")
     print("🚀 Starting Medallion ETL Pipeline: Bronze -> Silver -> Gold")
     print("========================================================")
     
-    # 1. Bronze Load & DQ
-    bronze_load_flow()
-    bronze_dq_flow()
-    
-    # 2. Silver Load & DQ
-    silver_load_flow()
-    silver_dq_flow()
+    profiler = None
+    if SQL_PROFILING["enabled"]:
+        profiler = SqlProfiler(
+            engine,
+            slow_threshold_s=SQL_PROFILING["slow_threshold_s"],
+            slow_log_path=SQL_PROFILING["slow_log_path"],
+            capture_plans=SQL_PROFILING["capture_plans"],
+        ).attach()
     
-    # 3. Gold Load (Fact depends on Dim, but here we run them sequentially)
-    gold_dim_products_load_flow()
-    gold_fact_load_flow()
-    
-    # 4. Gold DQ
-    gold_dq_flow()
+    try:
+        # 1. Bronze Load & DQ
+        if DISTRIBUTED_EXECUTION["enabled"] if distributed is None else distributed:
+            bronze_sharded_load_flow()
+        else:
+            bronze_load_flow()
+        bronze_dq_flow(dq_force_refresh)
+        
+        # 2. Silver Load & DQ
+        silver_load_flow(silver_transform_engine)
+        silver_dq_flow(dq_force_refresh, dq_sampled)
+        
+        # 3. Gold Load (Fact depends on Dims, but here we run them sequentially)
+        gold_dim_products_load_flow()
+        gold_dim_lookups_load_flow()
+        gold_dim_calendar_load_flow()
+        gold_fact_load_flow()
+        gold_rollups_refresh_flow()
+        gold_sessions_load_flow()
+        gold_user_features_refresh_flow()
+        if SORTED_LOADS["segment_report"]:
+            columnstore_segment_report_flow()
+        
+        # 4. Gold DQ
+        gold_dq_flow(dq_force_refresh, dq_sampled)
+        
+        # 5. Gold Parquet export (opt-in)
+        if GOLD_PARQUET_EXPORT["enabled"]:
+            gold_parquet_export_flow()
+        
+        # 6. Bronze retention (opt-in): archive the months Silver and Gold have consumed
+        if BRONZE_RETENTION["enabled"]:
+            bronze_retention_flow()
+    finally:
+        # Emit telemetry even for a failed run, so the slow/failed stage is visible
+        publish_run_telemetry(TELEMETRY_DIR)
+        if profiler is not None:
+            profiler.detach()
+            if profiler.capture_plans:
+                profiler.capture_slow_plans(SQL_PROFILING["plan_dir"])
+            profiler.top_n_report(SQL_PROFILING["top_n"], output_path=f"{TELEMETRY_DIR}/sql_profile_top.json")
     
     print("\n========================================================")
     print("🎉 Pipeline Execution Complete!")
@@ -489,5 +1476,9 @@ def medallion_pipeline_flow():
 # =================================================
 
 if __name__ == "__main__":
-    # Execute the single master flow
-    medallion_pipeline_flow()
+    if len(sys.argv) > 2 and sys.argv[1] == "restore":
+        # python etl_pipeline.py restore 2019-10 [2019-11 ...]
+        bronze_restore_flow(sys.argv[2:])
+    else:
+        # Execute the single master flow
+        medallion_pipeline_flow()
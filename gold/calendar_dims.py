@@ -0,0 +1,174 @@
+"""
+================================================================================
+File: calendar_dims.py
+Purpose: Generates the Gold calendar dimensions in Python and keeps them
+         covering the loaded data:
+           - gold.dim_date: one row per day, date_key = yyyymmdd (INT), with
+             year/quarter/month, ISO week and weekday, weekend and holiday
+             flags
+           - gold.dim_time: one row per second of the day, time_key = seconds
+             since midnight (0 - 86399), with hour/minute and part of the day
+         gold.LoadFactEcommerce derives date_key and time_key arithmetically
+         from event_date / event_time_only, so calendar queries join the fact
+         to these small dimensions on integer keys instead of applying date
+         functions to every fact row.
+Functions:
+    - date_key() / time_key() : Key of a date / a time of day.
+    - holiday_calendar()      : Holidays and retail events in a date range.
+    - build_dim_date()        : dim_date rows for a date range.
+    - build_dim_time()        : The 86,400 dim_time rows.
+    - load_calendar_dims()    : Adds the dates of Silver's date range that are
+                                missing from dim_date (and fills dim_time once).
+Notes:
+    - Dates are only ever added, never removed, so dim_date still covers the
+      months archived out of Bronze (bronze/retention.py).
+    - Holiday flags are set when a date is added; a date already in dim_date
+      keeps its flags if the holiday list changes later.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+from datetime import date, time, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+# =================================================
+# Configuration
+# =================================================
+SECONDS_PER_DAY = 86_400
+
+# Holidays and retail events on the same day every year: (month, day) -> name
+FIXED_HOLIDAYS = {
+    (1, 1): "New Year's Day",
+    (2, 14): "Valentine's Day",
+    (3, 8): "International Women's Day",
+    (10, 31): "Halloween",
+    (11, 11): "Singles' Day",
+    (12, 24): "Christmas Eve",
+    (12, 25): "Christmas Day",
+    (12, 31): "New Year's Eve",
+}
+
+DAY_PARTS = [(6, "night"), (12, "morning"), (18, "afternoon"), (24, "evening")]   # (hour before, name)
+
+SILVER_DATE_RANGE_QUERY = "SELECT MIN(event_date), MAX(event_date) FROM silver.ecommerce_behavior;"
+EXISTING_DATE_KEYS_QUERY = "SELECT date_key FROM gold.dim_date WHERE date_key BETWEEN :first_key AND :last_key;"
+
+
+# =================================================
+# Keys
+# =================================================
+def date_key(day: date) -> int:
+    """yyyymmdd as an integer, e.g. 20191101."""
+    return day.year * 10_000 + day.month * 100 + day.day
+
+
+def time_key(moment: time) -> int:
+    """Seconds since midnight (0 - 86399)."""
+    return moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+# =================================================
+# Dimension Rows
+# =================================================
+def _thanksgiving(year: int) -> date:
+    """US Thanksgiving: the fourth Thursday of November."""
+    first = date(year, 11, 1)
+    return first + timedelta(days=(3 - first.weekday()) % 7 + 21)
+
+
+def holiday_calendar(start: date, end: date, extra_holidays: dict = None) -> dict:
+    """
+    Holidays between start and end (inclusive) as {date: name}:
+    FIXED_HOLIDAYS, Black Friday / Cyber Monday, and `extra_holidays`
+    ({"YYYY-MM-DD": name}, e.g. store-specific sale days).
+    """
+    holidays = {}
+    for year in range(start.year, end.year + 1):
+        for (month, day), name in FIXED_HOLIDAYS.items():
+            holidays[date(year, month, day)] = name
+        black_friday = _thanksgiving(year) + timedelta(days=1)
+        holidays[black_friday] = "Black Friday"
+        holidays[black_friday + timedelta(days=3)] = "Cyber Monday"
+    for day, name in (extra_holidays or {}).items():
+        holidays[date.fromisoformat(day)] = name
+    return {day: name for day, name in holidays.items() if start <= day <= end}
+
+
+def build_dim_date(start: date, end: date, extra_holidays: dict = None) -> pd.DataFrame:
+    """One gold.dim_date row per day from start to end (inclusive)."""
+    days = pd.date_range(start, end, freq="D")
+    iso = days.isocalendar()
+    holidays = holiday_calendar(start, end, extra_holidays)
+    holiday_names = pd.Series([holidays.get(day.date()) for day in days], dtype=object)
+    return pd.DataFrame({
+        "date_key": days.year * 10_000 + days.month * 100 + days.day,
+        "full_date": days.date,
+        "year": days.year,
+        "quarter": days.quarter,
+        "month": days.month,
+        "month_name": days.month_name(),
+        "day_of_month": days.day,
+        "day_of_year": days.dayofyear,
+        "day_of_week": days.dayofweek + 1,          # ISO: 1 = Monday ... 7 = Sunday
+        "day_name": days.day_name(),
+        "iso_year": iso["year"].to_numpy(),
+        "iso_week": iso["week"].to_numpy(),
+        "is_weekend": days.dayofweek >= 5,
+        "is_holiday": holiday_names.notna().to_numpy(),
+        "holiday_name": holiday_names.to_numpy(),
+    })
+
+
+def build_dim_time() -> pd.DataFrame:
+    """The 86,400 gold.dim_time rows (one per second of the day)."""
+    seconds = pd.RangeIndex(SECONDS_PER_DAY)
+    hours = seconds // 3600
+    day_part = pd.cut(hours, bins=[-1] + [bound - 1 for bound, _ in DAY_PARTS],
+                      labels=[name for _, name in DAY_PARTS]).astype(object)
+    return pd.DataFrame({
+        "time_key": seconds,
+        "full_time": [time(second // 3600, second // 60 % 60, second % 60) for second in seconds],
+        "hour": hours,
+        "minute": seconds // 60 % 60,
+        "second": seconds % 60,
+        "day_part": day_part,
+    })
+
+
+# =================================================
+# Load
+# =================================================
+def _append(conn, df: pd.DataFrame, table: str):
+    df.to_sql(name=table, schema="gold", con=conn, if_exists="append", index=False, chunksize=10_000)
+
+
+def load_calendar_dims(engine, extra_holidays: dict = None):
+    """
+    Adds every date of Silver's event_date range that gold.dim_date lacks,
+    and fills gold.dim_time if it is incomplete. Returns (dates added,
+    times added).
+    """
+    with engine.begin() as conn:
+        first_day, last_day = conn.execute(text(SILVER_DATE_RANGE_QUERY)).one()
+        dates_added = 0
+        if first_day is not None:
+            first_day, last_day = pd.Timestamp(first_day).date(), pd.Timestamp(last_day).date()
+            existing = {row[0] for row in conn.execute(
+                text(EXISTING_DATE_KEYS_QUERY),
+                {"first_key": date_key(first_day), "last_key": date_key(last_day)},
+            )}
+            dim_date = build_dim_date(first_day, last_day, extra_holidays)
+            dim_date = dim_date[~dim_date["date_key"].isin(existing)]
+            _append(conn, dim_date, "dim_date")
+            dates_added = len(dim_date)
+
+        times_added = 0
+        if conn.execute(text("SELECT COUNT(*) FROM gold.dim_time;")).scalar() < SECONDS_PER_DAY:
+            conn.execute(text("DELETE FROM gold.dim_time;"))
+            _append(conn, build_dim_time(), "dim_time")
+            times_added = SECONDS_PER_DAY
+    return dates_added, times_added
@@ -3,18 +3,30 @@
 File: gold_data_quality.py
 Purpose: Performs data quality (DQ) checks on the Gold layer including:
     1. Duplicate event_key detection
-    2. Nulls, UNKNOWNs, and distinct counts in fact_ecommerce
-    3. Referential integrity between fact_ecommerce and dim_products
+    2. Nulls, UNKNOWNs, calendar keys missing from dim_date / dim_time, and
+       distinct counts in fact_ecommerce
+    3. Referential integrity between fact_ecommerce and dim_products (new fact
+       batches against the dim_products bitmap, gold/product_bitmap.py)
     4. Consistency of brand and category values between Silver and Gold layers
+    5. Daily rollup tables vs. fact_ecommerce (rolled-up batches only)
+Notes:
+    - Same checks as the Gold DQ tasks of etl_pipeline.py; keep both in sync.
+    - The RI check keeps its own batch bookkeeping (consumer 'product_ri_adhoc'),
+      so running this script never marks batches as checked for the pipeline.
+    - Run from the repository root: python -m gold.data_quality_checks
 ================================================================================
 """
 
 # =================================================
 # Imports
 # =================================================
+from pathlib import Path
+
 from prefect import flow, task
 from sqlalchemy import create_engine, text
 
+from gold.product_bitmap import check_new_fact_batches, load_product_bitmap
+
 # =================================================
 # Database Engine (replace with your connection string)
 # =================================================
@@ -23,6 +35,14 @@ engine = create_engine(
     "driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
 )
 
+# Same file as PRODUCT_BITMAP_PATH in etl_pipeline.py, resolved against the repository root so
+# the script finds it from any working directory. A missing file, or one older than
+# gold.dim_products, is rebuilt from the dim by load_product_bitmap.
+PRODUCT_BITMAP_PATH = Path(__file__).resolve().parents[1] / "state" / "dim_products_bitmap.npz"
+
+# Batch bookkeeping of this script's RI check, separate from the pipeline's 'product_ri'
+RI_CONSUMER_NAME = "product_ri_adhoc"
+
 
 # =================================================
 # Task: Check for duplicate event_key in fact_ecommerce
@@ -58,26 +78,38 @@ def check_event_key_duplicates():
 def check_fact_nulls_unknowns():
     """
     Summarizes nulls, UNKNOWNs, and distinct counts in gold.fact_ecommerce.
+    Category names are resolved through the small gold.dim_category lookup;
+    date_key / time_key values missing from gold.dim_date / gold.dim_time
+    are counted as unknown.
     """
     query = """
     SELECT
         COUNT(*) AS total_rows,
-        SUM(CASE WHEN event_key IS NULL THEN 1 ELSE 0 END)        AS event_key_null_count,
-        SUM(CASE WHEN event_date IS NULL THEN 1 ELSE 0 END)       AS event_date_null_count,
-        SUM(CASE WHEN event_time_only IS NULL THEN 1 ELSE 0 END)  AS event_time_only_null_count,
-        SUM(CASE WHEN event_type IS NULL THEN 1 ELSE 0 END)       AS event_type_null_count,
-        SUM(CASE WHEN product_id IS NULL THEN 1 ELSE 0 END)       AS product_id_null_count,
-        SUM(CASE WHEN category IS NULL THEN 1 ELSE 0 END)         AS category_null_count,
-        SUM(CASE WHEN subcategory IS NULL THEN 1 ELSE 0 END)      AS subcategory_null_count,
-        SUM(CASE WHEN price IS NULL THEN 1 ELSE 0 END)            AS price_null_count,
-        SUM(CASE WHEN user_id IS NULL THEN 1 ELSE 0 END)          AS user_id_null_count,
-        SUM(CASE WHEN user_session IS NULL THEN 1 ELSE 0 END)     AS user_session_null_count,
-        SUM(CASE WHEN category = 'UNKNOWN' THEN 1 ELSE 0 END)     AS category_unknown_count,
-        SUM(CASE WHEN subcategory = 'UNKNOWN' THEN 1 ELSE 0 END)  AS subcategory_unknown_count,
-        COUNT(DISTINCT category)      AS total_distinct_category,
-        COUNT(DISTINCT subcategory)   AS total_distinct_subcategory,
-        COUNT(DISTINCT product_id)    AS total_distinct_product_id
-    FROM gold.fact_ecommerce;
+        SUM(CASE WHEN f.event_key IS NULL THEN 1 ELSE 0 END)        AS event_key_null_count,
+        SUM(CASE WHEN f.event_date IS NULL THEN 1 ELSE 0 END)       AS event_date_null_count,
+        SUM(CASE WHEN f.event_time_only IS NULL THEN 1 ELSE 0 END)  AS event_time_only_null_count,
+        SUM(CASE WHEN f.event_type IS NULL THEN 1 ELSE 0 END)       AS event_type_null_count,
+        SUM(CASE WHEN f.product_id IS NULL THEN 1 ELSE 0 END)       AS product_id_null_count,
+        SUM(CASE WHEN f.category_key IS NULL THEN 1 ELSE 0 END)     AS category_key_null_count,
+        SUM(CASE WHEN f.brand_key IS NULL THEN 1 ELSE 0 END)        AS brand_key_null_count,
+        SUM(CASE WHEN f.price IS NULL THEN 1 ELSE 0 END)            AS price_null_count,
+        SUM(CASE WHEN f.user_id IS NULL THEN 1 ELSE 0 END)          AS user_id_null_count,
+        SUM(CASE WHEN f.session_key IS NULL THEN 1 ELSE 0 END)      AS session_key_null_count,
+        SUM(CASE WHEN c.category = 'UNKNOWN' THEN 1 ELSE 0 END)     AS category_unknown_count,
+        SUM(CASE WHEN c.subcategory = 'UNKNOWN' THEN 1 ELSE 0 END)  AS subcategory_unknown_count,
+        SUM(CASE WHEN f.session_key = 0 THEN 1 ELSE 0 END)          AS session_unknown_count,
+        SUM(CASE WHEN d.date_key IS NULL THEN 1 ELSE 0 END)         AS date_key_unknown_count,
+        SUM(CASE WHEN t.time_key IS NULL THEN 1 ELSE 0 END)         AS time_key_unknown_count,
+        COUNT(DISTINCT c.category)      AS total_distinct_category,
+        COUNT(DISTINCT c.subcategory)   AS total_distinct_subcategory,
+        COUNT(DISTINCT f.product_id)    AS total_distinct_product_id
+    FROM gold.fact_ecommerce f
+    LEFT JOIN gold.dim_category c
+        ON c.category_key = f.category_key
+    LEFT JOIN gold.dim_date d
+        ON d.date_key = f.date_key
+    LEFT JOIN gold.dim_time t
+        ON t.time_key = f.time_key;
     """
     with engine.begin() as conn:
         result = conn.execute(text(query)).fetchone()
@@ -96,24 +128,19 @@ def check_fact_nulls_unknowns():
 @task
 def check_referential_integrity():
     """
-    Checks that all product_ids in fact_ecommerce exist in dim_products.
-    """
-    query = """
-    SELECT f.product_id
-    FROM gold.fact_ecommerce f
-    LEFT JOIN gold.dim_products p
-        ON f.product_id = p.product_id
-    WHERE p.product_id IS NULL;
+    Checks that the product_ids of the fact batches not yet checked exist in
+    dim_products (vectorized membership test against the dim_products
+    bitmap, no join over the fact history). The first run checks every
+    batch; later runs only the batches loaded since.
     """
-    with engine.begin() as conn:
-        results = conn.execute(text(query)).fetchall()
+    bitmap = load_product_bitmap(engine, PRODUCT_BITMAP_PATH)
+    rows_checked, orphan_rows, missing_sample = check_new_fact_batches(engine, bitmap, consumer=RI_CONSUMER_NAME)
 
-    if results:
-        print("⚠️ Products in fact_ecommerce missing in dim_products:")
-        for row in results[:20]:
-            print(f"    product_id: {row.product_id}")
-        if len(results) > 20:
-            print(f"    ...and {len(results)-20} more")
+    print(f"    New fact rows checked: {rows_checked}")
+    if orphan_rows:
+        print(f"⚠️ Found {orphan_rows} fact records without a matching product in dim_products.")
+        for product_id in missing_sample:
+            print(f"    product_id: {product_id}")
     else:
         print("✅ All fact products exist in dim_products.")
 
@@ -127,14 +154,14 @@ def check_brand_category_consistency():
     Checks that brand and category values are consistent between Silver and Gold.
     """
     brand_query = """
-    SELECT COUNT(DISTINCT p.brand) AS mismatched_brands
+    SELECT COUNT(DISTINCT f.brand) AS mismatched_brands
     FROM silver.ecommerce_behavior f
     JOIN gold.dim_products p
         ON f.product_id = p.product_id
     WHERE f.brand <> p.brand;
     """
     category_query = """
-    SELECT COUNT(DISTINCT p.category_id) AS mismatched_categories
+    SELECT COUNT(DISTINCT f.category_id) AS mismatched_categories
     FROM silver.ecommerce_behavior f
     JOIN gold.dim_products p
         ON f.product_id = p.product_id
@@ -155,6 +182,68 @@ def check_brand_category_consistency():
         print("✅ No category mismatches found.")
 
 
+# =================================================
+# Task: Daily rollups vs. fact_ecommerce
+# =================================================
+@task
+def check_daily_rollups():
+    # Only fact rows of batches already rolled up are compared, so a pending
+    # batch is not reported as a mismatch.
+    query = """
+    WITH fact_days AS (
+        SELECT
+            f.event_date,
+            COUNT(*) AS event_count,
+            SUM(CASE WHEN f.event_type IN ('view', 'cart', 'purchase') THEN 1 ELSE 0 END) AS funnel_events,
+            COALESCE(SUM(CASE WHEN f.event_type = 'purchase' THEN f.price END), 0) AS revenue
+        FROM gold.fact_ecommerce f
+        JOIN gold.fact_load_batches b
+            ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+        JOIN gold.batch_consumers c
+            ON c.batch_id = b.batch_id AND c.consumer = 'daily_rollups'
+        GROUP BY f.event_date
+    ),
+    product_days AS (
+        SELECT event_date, SUM(event_count) AS event_count, SUM(revenue) AS revenue
+        FROM gold.agg_daily_product_event
+        GROUP BY event_date
+    ),
+    funnel_days AS (
+        SELECT event_date, SUM(view_count + cart_count + purchase_count) AS funnel_events, SUM(revenue) AS revenue
+        FROM gold.agg_daily_category_funnel
+        GROUP BY event_date
+    )
+    SELECT
+        COALESCE(f.event_date, p.event_date, u.event_date) AS event_date,
+        f.event_count   AS fact_events,
+        p.event_count   AS rollup_events,
+        f.funnel_events AS fact_funnel_events,
+        u.funnel_events AS rollup_funnel_events,
+        f.revenue       AS fact_revenue,
+        p.revenue       AS rollup_revenue
+    FROM fact_days f
+    FULL OUTER JOIN product_days p ON p.event_date = f.event_date
+    FULL OUTER JOIN funnel_days u ON u.event_date = COALESCE(f.event_date, p.event_date)
+    WHERE f.event_date IS NULL OR p.event_date IS NULL OR u.event_date IS NULL
+       OR f.event_count <> p.event_count
+       OR f.funnel_events <> u.funnel_events
+       OR ABS(f.revenue - p.revenue) > 0.01
+       OR ABS(f.revenue - u.revenue) > 0.01
+    ORDER BY 1;
+    """
+    with engine.begin() as conn:
+        results = conn.execute(text(query)).fetchall()
+
+    if results:
+        print(f"⚠️ Rollups disagree with the fact table on {len(results)} day(s).")
+        for row in results[:5]:
+            print(f"    {row.event_date}: events {row.fact_events} vs {row.rollup_events}, "
+                  f"funnel {row.fact_funnel_events} vs {row.rollup_funnel_events}, "
+                  f"revenue {row.fact_revenue} vs {row.rollup_revenue}")
+    else:
+        print("✅ Daily rollups match the fact table.")
+
+
 # =================================================
 # Prefect Flow: Orchestrate Gold DQ Tasks
 # =================================================
@@ -164,6 +253,7 @@ def gold_dq_flow():
     check_fact_nulls_unknowns()
     check_referential_integrity()
     check_brand_category_consistency()
+    check_daily_rollups()
     print("🏁 Gold DQ checks completed.")
 
 
@@ -0,0 +1,59 @@
+/*
+================================================================================
+Tables: gold.agg_daily_product_event, gold.agg_daily_category_funnel
+Purpose: Pre-aggregated daily rollups of gold.fact_ecommerce for dashboards.
+         They are maintained incrementally by gold.RefreshDailyRollups from
+         each fact load batch, so queries read thousands of rows instead of
+         scanning the event-grain fact table.
+Columns:
+    agg_daily_product_event  (one row per day x product x event type)
+    - event_date, product_id, event_type
+    - event_count   : Number of events
+    - revenue       : Sum of price over purchase events
+    agg_daily_category_funnel (one row per day x category)
+    - event_date, category_key (gold.dim_category)
+    - view_count, cart_count, purchase_count
+    - revenue       : Sum of price over purchase events
+Notes:
+    - NULL keys are stored as product_id -1, event_type 'UNKNOWN' and
+      category_key 0 so they can be part of the primary keys.
+================================================================================
+*/
+
+-- ==============================================
+-- Step 0: Drop tables if they exist
+-- ==============================================
+IF OBJECT_ID('gold.agg_daily_product_event', 'U') IS NOT NULL
+    DROP TABLE gold.agg_daily_product_event;
+GO
+
+IF OBJECT_ID('gold.agg_daily_category_funnel', 'U') IS NOT NULL
+    DROP TABLE gold.agg_daily_category_funnel;
+GO
+
+-- ==============================================
+-- Step 1: Daily x product x event type
+-- ==============================================
+CREATE TABLE gold.agg_daily_product_event (
+    event_date   DATE          NOT NULL,
+    product_id   BIGINT        NOT NULL,
+    event_type   VARCHAR(10)   NOT NULL,
+    event_count  BIGINT        NOT NULL,
+    revenue      DECIMAL(18,2) NOT NULL,
+    CONSTRAINT PK_agg_daily_product_event PRIMARY KEY (event_date, product_id, event_type)
+);
+GO
+
+-- ==============================================
+-- Step 2: Daily x category funnel
+-- ==============================================
+CREATE TABLE gold.agg_daily_category_funnel (
+    event_date      DATE          NOT NULL,
+    category_key    INT           NOT NULL,
+    view_count      BIGINT        NOT NULL,
+    cart_count      BIGINT        NOT NULL,
+    purchase_count  BIGINT        NOT NULL,
+    revenue         DECIMAL(18,2) NOT NULL,
+    CONSTRAINT PK_agg_daily_category_funnel PRIMARY KEY (event_date, category_key)
+);
+GO
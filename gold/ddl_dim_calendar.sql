@@ -0,0 +1,68 @@
+/*
+================================================================================
+Tables: gold.dim_date, gold.dim_time
+Purpose: Calendar dimensions of the Gold layer. gold.fact_ecommerce carries
+         their integer keys (date_key, time_key), so weekday, week, month,
+         hour-of-day and holiday queries join two small dimensions instead of
+         applying date functions to every fact row.
+Columns:
+    - dim_date : date_key (INT, yyyymmdd) -> full_date, year, quarter, month,
+                 month_name, day_of_month, day_of_year, day_of_week
+                 (ISO, 1 = Monday), day_name, iso_year, iso_week,
+                 is_weekend, is_holiday, holiday_name
+    - dim_time : time_key (INT, seconds since midnight 0 - 86399) ->
+                 full_time, hour, minute, second, day_part
+                 (night / morning / afternoon / evening)
+Notes:
+    - Both tables are generated in Python (gold/calendar_dims.py): dim_date
+      is extended to the date range of every Silver load, dim_time is filled
+      once.
+================================================================================
+*/
+
+-- ==============================================
+-- Step 0: Drop tables if they exist
+-- ==============================================
+IF OBJECT_ID('gold.dim_date', 'U') IS NOT NULL
+    DROP TABLE gold.dim_date;
+GO
+
+IF OBJECT_ID('gold.dim_time', 'U') IS NOT NULL
+    DROP TABLE gold.dim_time;
+GO
+
+-- ==============================================
+-- Step 1: Create date dimension (one row per day)
+-- ==============================================
+CREATE TABLE gold.dim_date (
+    date_key      INT          NOT NULL PRIMARY KEY,
+    full_date     DATE         NOT NULL,
+    year          SMALLINT     NOT NULL,
+    quarter       TINYINT      NOT NULL,
+    month         TINYINT      NOT NULL,
+    month_name    VARCHAR(10)  NOT NULL,
+    day_of_month  TINYINT      NOT NULL,
+    day_of_year   SMALLINT     NOT NULL,
+    day_of_week   TINYINT      NOT NULL,
+    day_name      VARCHAR(10)  NOT NULL,
+    iso_year      SMALLINT     NOT NULL,
+    iso_week      TINYINT      NOT NULL,
+    is_weekend    BIT          NOT NULL,
+    is_holiday    BIT          NOT NULL,
+    holiday_name  VARCHAR(50)  NULL,
+    CONSTRAINT UQ_dim_date_full_date UNIQUE (full_date)
+);
+GO
+
+-- ==============================================
+-- Step 2: Create time dimension (one row per second of the day)
+-- ==============================================
+CREATE TABLE gold.dim_time (
+    time_key   INT          NOT NULL PRIMARY KEY,
+    full_time  TIME(0)      NOT NULL,
+    hour       TINYINT      NOT NULL,
+    minute     TINYINT      NOT NULL,
+    second     TINYINT      NOT NULL,
+    day_part   VARCHAR(10)  NOT NULL
+);
+GO
@@ -0,0 +1,87 @@
+/*
+================================================================================
+Tables: gold.dim_brand, gold.dim_category, gold.dim_session
+Purpose: Lookup (dictionary) dimensions for the Gold layer. They replace the
+         repeated brand, category/subcategory and session strings of
+         gold.fact_ecommerce with small integer surrogate keys, which cuts the
+         width of the fact table and the cost of every scan over it.
+Columns:
+    - dim_brand    : brand_key (INT)    -> brand
+    - dim_category : category_key (INT) -> category, subcategory
+    - dim_session  : session_key (INT)  -> session_uid, the 36-character
+                     session UUID encoded as 16 bytes (BINARY(16))
+Notes:
+    - session_key 0 is the UNKNOWN member (missing or non-UUID session ids).
+    - The original session string can be rebuilt from session_uid with
+      gold.v_dim_session.
+================================================================================
+*/
+
+-- ==============================================
+-- Step 0: Drop tables if they exist
+-- ==============================================
+IF OBJECT_ID('gold.dim_brand', 'U') IS NOT NULL
+    DROP TABLE gold.dim_brand;
+GO
+
+IF OBJECT_ID('gold.dim_category', 'U') IS NOT NULL
+    DROP TABLE gold.dim_category;
+GO
+
+IF OBJECT_ID('gold.dim_session', 'U') IS NOT NULL
+    DROP TABLE gold.dim_session;
+GO
+
+-- ==============================================
+-- Step 1: Create brand lookup
+-- ==============================================
+CREATE TABLE gold.dim_brand (
+    brand_key   INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+    brand       VARCHAR(50)       NOT NULL,
+    CONSTRAINT UQ_dim_brand_brand UNIQUE (brand)
+);
+GO
+
+-- ==============================================
+-- Step 2: Create category lookup
+-- ==============================================
+CREATE TABLE gold.dim_category (
+    category_key INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+    category     VARCHAR(50)       NOT NULL,
+    subcategory  VARCHAR(50)       NOT NULL,
+    CONSTRAINT UQ_dim_category_category_subcategory UNIQUE (category, subcategory)
+);
+GO
+
+-- ==============================================
+-- Step 3: Create session lookup (16-byte encoded UUIDs)
+-- ==============================================
+CREATE TABLE gold.dim_session (
+    session_key  INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+    session_uid  BINARY(16)        NOT NULL,
+    CONSTRAINT UQ_dim_session_session_uid UNIQUE (session_uid)
+);
+GO
+
+-- UNKNOWN member
+SET IDENTITY_INSERT gold.dim_session ON;
+INSERT INTO gold.dim_session (session_key, session_uid)
+VALUES (0, 0x00000000000000000000000000000000);
+SET IDENTITY_INSERT gold.dim_session OFF;
+GO
+
+-- ==============================================
+-- Step 4: Decoding view for ad-hoc queries
+-- ==============================================
+CREATE OR ALTER VIEW gold.v_dim_session
+AS
+SELECT
+    session_key,
+    CASE
+        WHEN session_key = 0 THEN 'UNKNOWN'
+        ELSE LOWER(STUFF(STUFF(STUFF(STUFF(
+                 CONVERT(CHAR(32), session_uid, 2),
+                 21, 0, '-'), 17, 0, '-'), 13, 0, '-'), 9, 0, '-'))
+    END AS user_session
+FROM gold.dim_session;
+GO
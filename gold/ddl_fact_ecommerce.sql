@@ -4,16 +4,34 @@ Table: gold.fact_ecommerce
 Purpose: Stores the fact table for e-commerce events in the Gold layer. 
          Designed for analytics and reporting with a clustered columnstore index.
 Columns:
-    - event_key       : Surrogate key (IDENTITY)
+    - event_key       : Surrogate key, assigned in ranges per load batch
     - event_date      : Date of the event
     - event_time_only : Time of the event
+    - date_key        : Event date as yyyymmdd (gold.dim_date)
+    - time_key        : Event time as seconds since midnight (gold.dim_time)
     - event_type      : Type of event (click, purchase, etc.)
     - product_id      : Unique product identifier
-    - category        : Product category
-    - subcategory     : Product subcategory
+    - category_key    : Category / subcategory key (gold.dim_category)
+    - brand_key       : Brand key (gold.dim_brand)
     - price           : Product price
     - user_id         : Unique user identifier
-    - user_session    : Session identifier
+    - session_key     : Session key (gold.dim_session, 0 = UNKNOWN)
+Notes:
+    - The table is a clustered columnstore. event_key has no IDENTITY: each
+      load reserves a contiguous range from gold.seq_event_key
+      (sp_sequence_get_range) and numbers its rows deterministically, so
+      parallel loaders never contend on an IDENTITY value.
+    - Each load inserts only the Silver rows loaded into Bronze after the
+      previous batch (loaded_at > MAX(source_loaded_through)), so a batch is
+      the delta of one run even though Silver is rebuilt from all of Bronze.
+    - Every load's key range is recorded in gold.fact_load_batches;
+      gold.batch_consumers tracks which batches each incremental Gold table
+      has already processed.
+    - Brand, category and session strings are dictionary-encoded into the
+      lookup dimensions (ddl_dim_lookups.sql); the fact holds only keys.
+    - Calendar queries join gold.dim_date / gold.dim_time (ddl_dim_calendar.sql)
+      on date_key / time_key; rows are loaded in date order, so filters on
+      date_key eliminate columnstore segments.
 ================================================================================
 */
 
@@ -24,19 +42,82 @@ IF OBJECT_ID('gold.fact_ecommerce', 'U') IS NOT NULL
     DROP TABLE gold.fact_ecommerce;
 GO
 
+IF OBJECT_ID('gold.fact_load_batches', 'U') IS NOT NULL
+    DROP TABLE gold.fact_load_batches;
+GO
+
+IF OBJECT_ID('gold.batch_consumers', 'U') IS NOT NULL
+    DROP TABLE gold.batch_consumers;
+GO
+
+IF OBJECT_ID('gold.seq_event_key', 'SO') IS NOT NULL
+    DROP SEQUENCE gold.seq_event_key;
+GO
+
 -- ==============================================
--- Step 1: Create partitioned table with clustered columnstore
+-- Step 1: Key sequence (ranges are reserved per load batch)
+-- ==============================================
+CREATE SEQUENCE gold.seq_event_key
+    AS BIGINT
+    START WITH 1
+    INCREMENT BY 1
+    NO CYCLE;
+GO
+
+-- ==============================================
+-- Step 2: Create fact table
 -- ==============================================
 CREATE TABLE gold.fact_ecommerce (
-    event_key       BIGINT IDENTITY(1,1) PRIMARY KEY,
+    event_key       BIGINT      NOT NULL,
     event_date      DATE        NOT NULL,
     event_time_only TIME(0)     NOT NULL,
+    date_key        INT         NOT NULL,
+    time_key        INT         NOT NULL,
     event_type      VARCHAR(10) NULL,
     product_id      BIGINT      NULL,
-    category        VARCHAR(50) NULL,
-    subcategory     VARCHAR(50) NULL,
+    category_key    INT         NULL,
+    brand_key       INT         NULL,
     price           DECIMAL(10,2) NULL,
     user_id         BIGINT      NULL,
-    user_session    VARCHAR(36) NULL
+    session_key     INT         NULL
+);
+GO
+
+-- ==============================================
+-- Step 3: Clustered columnstore + nonclustered key
+-- ==============================================
+CREATE CLUSTERED COLUMNSTORE INDEX CCI_fact_ecommerce
+ON gold.fact_ecommerce;
+GO
+
+-- Nonclustered B-tree only to enforce event_key uniqueness across batches
+ALTER TABLE gold.fact_ecommerce
+ADD CONSTRAINT PK_fact_ecommerce PRIMARY KEY NONCLUSTERED (event_key);
+GO
+
+-- ==============================================
+-- Step 4: Load batch log (one row per fact load)
+-- ==============================================
+CREATE TABLE gold.fact_load_batches (
+    batch_id         INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+    first_event_key  BIGINT    NOT NULL,
+    last_event_key   BIGINT    NOT NULL,
+    row_count        BIGINT    NOT NULL,
+    -- Latest Bronze loaded_at of the batch's rows: the next load takes only newer Silver rows
+    source_loaded_through DATETIME NULL,
+    loaded_at        DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+-- ==============================================
+-- Step 5: Batch consumption log for incremental Gold tables
+-- ==============================================
+-- Each incremental consumer (rollups, sessions, features, ...) records the
+-- load batches it has processed, so every refresh reads only the new ranges.
+CREATE TABLE gold.batch_consumers (
+    consumer      VARCHAR(50) NOT NULL,
+    batch_id      INT         NOT NULL,
+    processed_at  DATETIME2   NOT NULL DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_batch_consumers PRIMARY KEY (consumer, batch_id)
 );
 GO
@@ -0,0 +1,72 @@
+/*
+================================================================================
+Tables: gold.fact_sessions, gold.fact_sessions_stage
+Purpose: Session-level fact table built from gold.fact_ecommerce by the
+         streaming sessionizer (gold/sessionize.py). One row per user session,
+         so session and funnel metrics no longer need window queries over the
+         event-grain fact table.
+Columns:
+    - session_key    : Surrogate key (gold.dim_session)
+    - user_id        : User of the session
+    - session_start  : First event of the session
+    - session_end    : Last event of the session
+    - duration_s     : session_end - session_start in seconds
+    - event_count    : Number of events
+    - view_count, cart_count, purchase_count : Events by type
+    - converted      : 1 when the session has at least one purchase
+    - basket_value   : Sum of price over purchase events
+    - updated_at     : Last time the row was inserted or merged
+Notes:
+    - gold.fact_sessions_stage holds the partial sessions of one load before
+      gold.MergeFactSessions merges them in.
+================================================================================
+*/
+
+-- ==============================================
+-- Step 0: Drop tables if they exist
+-- ==============================================
+IF OBJECT_ID('gold.fact_sessions', 'U') IS NOT NULL
+    DROP TABLE gold.fact_sessions;
+GO
+
+IF OBJECT_ID('gold.fact_sessions_stage', 'U') IS NOT NULL
+    DROP TABLE gold.fact_sessions_stage;
+GO
+
+-- ==============================================
+-- Step 1: Create session fact
+-- ==============================================
+CREATE TABLE gold.fact_sessions (
+    session_key     INT           NOT NULL,
+    user_id         BIGINT        NULL,
+    session_start   DATETIME2(0)  NOT NULL,
+    session_end     DATETIME2(0)  NOT NULL,
+    duration_s      INT           NOT NULL,
+    event_count     INT           NOT NULL,
+    view_count      INT           NOT NULL,
+    cart_count      INT           NOT NULL,
+    purchase_count  INT           NOT NULL,
+    converted       BIT           NOT NULL,
+    basket_value    DECIMAL(18,2) NOT NULL,
+    updated_at      DATETIME2     NOT NULL DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_fact_sessions PRIMARY KEY (session_key)
+);
+GO
+
+-- ==============================================
+-- Step 2: Create staging table (same columns, no key)
+-- ==============================================
+CREATE TABLE gold.fact_sessions_stage (
+    session_key     INT           NOT NULL,
+    user_id         BIGINT        NULL,
+    session_start   DATETIME2(0)  NOT NULL,
+    session_end     DATETIME2(0)  NOT NULL,
+    duration_s      INT           NOT NULL,
+    event_count     INT           NOT NULL,
+    view_count      INT           NOT NULL,
+    cart_count      INT           NOT NULL,
+    purchase_count  INT           NOT NULL,
+    converted       BIT           NOT NULL,
+    basket_value    DECIMAL(18,2) NOT NULL
+);
+GO
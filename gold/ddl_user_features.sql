@@ -0,0 +1,78 @@
+/*
+================================================================================
+Table: gold.user_features
+View:  gold.v_user_features
+Purpose: Per-user behavioral features for downstream models. The table holds
+         only mergeable state (counts, sums, min/max timestamps), maintained by
+         gold.RefreshUserFeatures from each fact load batch; the view derives
+         recency, frequency, monetary value and funnel rates from it.
+Columns (table):
+    - user_id          : User
+    - first_event_at   : First event of the user
+    - last_event_at    : Latest event of the user
+    - last_purchase_at : Latest purchase (NULL if none)
+    - event_count      : Number of events
+    - view_count, cart_count, purchase_count : Events by type
+    - purchase_value   : Sum of price over purchase events
+    - updated_at       : Last time the row was inserted or merged
+Columns (view, additionally):
+    - recency_days          : Days from last_event_at to the latest event in the table
+    - purchase_recency_days : Same for last_purchase_at
+    - tenure_days           : Days from first_event_at to last_event_at
+    - frequency             : purchase_count
+    - monetary              : purchase_value
+    - avg_purchase_value    : purchase_value / purchase_count
+    - view_to_cart_rate, cart_to_purchase_rate, view_to_purchase_rate
+Notes:
+    - Recency is measured against the data, not the clock, so historical
+      loads give meaningful values.
+================================================================================
+*/
+
+-- ==============================================
+-- Step 0: Drop objects if they exist
+-- ==============================================
+IF OBJECT_ID('gold.v_user_features', 'V') IS NOT NULL
+    DROP VIEW gold.v_user_features;
+GO
+
+IF OBJECT_ID('gold.user_features', 'U') IS NOT NULL
+    DROP TABLE gold.user_features;
+GO
+
+-- ==============================================
+-- Step 1: Create mergeable feature state
+-- ==============================================
+CREATE TABLE gold.user_features (
+    user_id           BIGINT        NOT NULL,
+    first_event_at    DATETIME2(0)  NOT NULL,
+    last_event_at     DATETIME2(0)  NOT NULL,
+    last_purchase_at  DATETIME2(0)  NULL,
+    event_count       BIGINT        NOT NULL,
+    view_count        BIGINT        NOT NULL,
+    cart_count        BIGINT        NOT NULL,
+    purchase_count    BIGINT        NOT NULL,
+    purchase_value    DECIMAL(18,2) NOT NULL,
+    updated_at        DATETIME2     NOT NULL DEFAULT SYSUTCDATETIME(),
+    CONSTRAINT PK_user_features PRIMARY KEY (user_id)
+);
+GO
+
+-- ==============================================
+-- Step 2: Create derived feature view
+-- ==============================================
+CREATE VIEW gold.v_user_features AS
+SELECT
+    u.user_id,
+    DATEDIFF(DAY, u.last_event_at, MAX(u.last_event_at) OVER ())    AS recency_days,
+    DATEDIFF(DAY, u.last_purchase_at, MAX(u.last_event_at) OVER ()) AS purchase_recency_days,
+    DATEDIFF(DAY, u.first_event_at, u.last_event_at)                AS tenure_days,
+    u.event_count,
+    u.purchase_count                                                 AS frequency,
+    u.purchase_value                                                 AS monetary,
+    u.purchase_value / NULLIF(u.purchase_count, 0)                   AS avg_purchase_value,
+    CAST(u.cart_count AS FLOAT) / NULLIF(u.view_count, 0)            AS view_to_cart_rate,
+    CAST(u.purchase_count AS FLOAT) / NULLIF(u.cart_count, 0)        AS cart_to_purchase_rate,
+    CAST(u.purchase_count AS FLOAT) / NULLIF(u.view_count, 0)        AS view_to_purchase_rate
+FROM gold.user_features u;
+GO
@@ -0,0 +1,63 @@
+"""
+================================================================================
+File: fact_batches.py
+Purpose: Bookkeeping for incremental consumers of gold.fact_ecommerce. Every
+         fact load is logged as a key range in gold.fact_load_batches; each
+         consumer (sessions, RI check, exports, ...) records the batches it has
+         processed in gold.batch_consumers, so it only ever reads new ranges.
+Functions:
+    - pending_batch_ids()      : Batch ids not yet processed by a consumer.
+    - mark_batches_consumed()  : Records batches as processed by a consumer.
+    - batch_events_query()     : SELECT over the fact rows of given batches.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+from sqlalchemy import bindparam, text
+
+# =================================================
+# Queries
+# =================================================
+PENDING_BATCHES_QUERY = """
+SELECT b.batch_id
+FROM gold.fact_load_batches b
+WHERE NOT EXISTS (
+    SELECT 1 FROM gold.batch_consumers c
+    WHERE c.consumer = :consumer AND c.batch_id = b.batch_id
+)
+ORDER BY b.batch_id;
+"""
+
+MARK_CONSUMED_SQL = "INSERT INTO gold.batch_consumers (consumer, batch_id) VALUES (:consumer, :batch_id)"
+
+
+def pending_batch_ids(conn, consumer: str) -> list:
+    """Ids of the fact load batches `consumer` has not processed yet."""
+    return [row.batch_id for row in conn.execute(text(PENDING_BATCHES_QUERY), {"consumer": consumer})]
+
+
+def mark_batches_consumed(conn, consumer: str, batch_ids):
+    """Records `batch_ids` as processed by `consumer` (in the caller's transaction)."""
+    if batch_ids:
+        conn.execute(text(MARK_CONSUMED_SQL), [{"consumer": consumer, "batch_id": b} for b in batch_ids])
+
+
+def batch_events_query(columns: str, where: str = None, order_by: str = None):
+    """
+    SELECT of `columns` (aliased against f) over the fact rows of the batches
+    bound to :batch_ids, with an optional extra filter and ordering.
+    """
+    sql = f"""
+    SELECT {columns}
+    FROM gold.fact_ecommerce f
+    JOIN gold.fact_load_batches b
+        ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+    WHERE b.batch_id IN :batch_ids
+    """
+    if where:
+        sql += f"  AND {where}\n"
+    if order_by:
+        sql += f"    ORDER BY {order_by}\n"
+    return text(sql).bindparams(bindparam("batch_ids", expanding=True))
@@ -0,0 +1,56 @@
+"""
+================================================================================
+File: load_dim_lookups.py
+Purpose: Loads new values into the Gold-layer lookup dimensions 'dim_brand',
+         'dim_category' and 'dim_session' by executing the stored procedure
+         'gold.LoadDimLookups' via Prefect tasks. Must run before the fact load.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+from prefect import flow, task
+from sqlalchemy import create_engine, text
+
+# =================================================
+# Database Engine (replace with your connection string)
+# =================================================
+engine = create_engine(
+    "mssql+pyodbc://@ATX11492/ecommerce_behavior?"
+    "driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+)
+
+
+# =================================================
+# Task: Load Gold Lookup Dims via Stored Procedure
+# =================================================
+@task
+def load_gold_dim_lookups():
+    """
+    Executes the Gold-layer stored procedure to add new brands, categories
+    and sessions to the lookup dimensions.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("EXEC gold.LoadDimLookups"))
+
+    print("✅ Gold lookup dims (brand, category, session) loaded via stored procedure.")
+    return "Gold lookup dims loaded ✅"
+
+
+# =================================================
+# Prefect Flow: Orchestrate Gold Lookup Dims Load
+# =================================================
+@flow(name="gold-dim-lookups-load")
+def gold_dim_lookups_flow():
+    print("⚡ Running Gold Lookup Dims Layer...")
+    result = load_gold_dim_lookups()
+    print(result)
+    print("🎉 Gold lookup dims load completed!")
+
+
+# =================================================
+# Main Execution
+# =================================================
+if __name__ == "__main__":
+    gold_dim_lookups_flow()
@@ -0,0 +1,53 @@
+/*
+================================================================================
+Procedure: gold.LoadDimLookups
+Purpose: Adds new brands, category/subcategory pairs and sessions from the
+         Silver layer to the Gold lookup dimensions (dim_brand, dim_category,
+         dim_session). Existing keys are never changed, so the procedure is
+         incremental and safe to re-run.
+Notes:
+    - Sessions are stored as BINARY(16): the UUID with its dashes removed,
+      converted from hex. Values that are not UUIDs map to session_key 0.
+================================================================================
+*/
+
+CREATE OR ALTER PROCEDURE gold.LoadDimLookups
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- ==============================================
+    -- Step 1: New brands
+    -- ==============================================
+    INSERT INTO gold.dim_brand (brand)
+    SELECT DISTINCT s.brand
+    FROM silver.ecommerce_behavior s
+    WHERE s.brand IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM gold.dim_brand b WHERE b.brand = s.brand);
+
+    -- ==============================================
+    -- Step 2: New category / subcategory pairs
+    -- ==============================================
+    INSERT INTO gold.dim_category (category, subcategory)
+    SELECT DISTINCT s.category, s.subcategory
+    FROM silver.ecommerce_behavior s
+    WHERE s.category IS NOT NULL
+      AND s.subcategory IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM gold.dim_category c
+          WHERE c.category = s.category AND c.subcategory = s.subcategory
+      );
+
+    -- ==============================================
+    -- Step 3: New sessions (encoded to 16 bytes)
+    -- ==============================================
+    INSERT INTO gold.dim_session (session_uid)
+    SELECT DISTINCT u.session_uid
+    FROM silver.ecommerce_behavior s
+    CROSS APPLY (
+        SELECT TRY_CONVERT(BINARY(16), REPLACE(s.user_session, '-', ''), 2) AS session_uid
+    ) u
+    WHERE u.session_uid IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM gold.dim_session d WHERE d.session_uid = u.session_uid);
+END;
+GO
@@ -4,6 +4,8 @@ Procedure: gold.LoadDimProducts
 Purpose: Loads the Gold-layer product dimension table by deduplicating data 
          from the Silver layer. Ensures each product_id appears only once with 
          the most relevant category_id and brand.
+         Products that are no longer in Silver (their months were archived
+         out of Bronze, bronze/retention.py) are kept.
 ================================================================================
 */
 
@@ -11,11 +13,16 @@ CREATE OR ALTER PROCEDURE gold.LoadDimProducts
 AS
 BEGIN
     SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    BEGIN TRANSACTION;
 
     -- ==============================================
-    -- Step 0: Clear Gold table
+    -- Step 0: Clear the products Silver will replace
     -- ==============================================
-    TRUNCATE TABLE gold.dim_products;
+    DELETE p
+    FROM gold.dim_products p
+    WHERE EXISTS (SELECT 1 FROM silver.ecommerce_behavior s WHERE s.product_id = p.product_id);
 
     -- ==============================================
     -- Step 1: Insert deduplicated data from Silver
@@ -27,5 +34,7 @@ BEGIN
         MAX(brand) AS brand
     FROM silver.ecommerce_behavior
     GROUP BY product_id;
+
+    COMMIT TRANSACTION;
 END;
 GO
@@ -2,8 +2,24 @@
 ================================================================================
 Procedure: gold.LoadFactEcommerce
 Purpose: Loads the Gold-layer fact table 'fact_ecommerce' from the Silver layer.
+         Only Silver rows whose Bronze loaded_at is newer than the watermark of
+         the previous batch (gold.fact_load_batches.source_loaded_through)
+         are inserted, so every batch is a true delta and re-running without
+         new source data inserts nothing.
          Transfers all relevant event-level data including date, time, product,
          category, price, and user/session information.
+         Brand, category and session strings are replaced by their keys from
+         the lookup dimensions (run gold.LoadDimLookups first).
+         date_key (yyyymmdd) and time_key (seconds since midnight) are
+         computed from event_date / event_time_only; they match the keys of
+         gold.dim_date / gold.dim_time (gold/calendar_dims.py).
+         Surrogate keys are reserved as one contiguous range per load from
+         gold.seq_event_key and assigned in a deterministic order, so several
+         loaders can insert concurrently without an IDENTITY bottleneck. The
+         range is logged in gold.fact_load_batches.
+         Rows are inserted in event_key order (= event_date, event_time_only,
+         ...), so each columnstore rowgroup covers a short date and key range
+         and date or batch filters can skip the other segments.
 ================================================================================
 */
 
@@ -13,29 +29,80 @@ BEGIN
     SET NOCOUNT ON;
 
     -- ==============================================
-    -- Step 1: Insert data from Silver layer
+    -- Step 1: Rows loaded since the previous batch
+    -- ==============================================
+    DECLARE @watermark DATETIME = (SELECT MAX(source_loaded_through) FROM gold.fact_load_batches);
+    DECLARE @row_count BIGINT;
+    DECLARE @loaded_through DATETIME;
+
+    SELECT @row_count = COUNT_BIG(*), @loaded_through = MAX(loaded_at)
+    FROM silver.ecommerce_behavior
+    WHERE @watermark IS NULL OR loaded_at > @watermark;
+
+    IF @row_count = 0
+        RETURN;
+
+    -- ==============================================
+    -- Step 2: Reserve a key range for this batch
+    -- ==============================================
+
+    DECLARE @range_first SQL_VARIANT;
+    EXEC sys.sp_sequence_get_range
+        @sequence_name     = N'gold.seq_event_key',
+        @range_size        = @row_count,
+        @range_first_value = @range_first OUTPUT;
+
+    DECLARE @first_event_key BIGINT = CAST(@range_first AS BIGINT);
+
+    -- ==============================================
+    -- Step 3: Insert the new rows from Silver
     -- ==============================================
     INSERT INTO gold.fact_ecommerce (
+        event_key,
         event_date,
         event_time_only,
+        date_key,
+        time_key,
         event_type,
         product_id,
-        category,
-        subcategory,
+        category_key,
+        brand_key,
         price,
         user_id,
-        user_session
+        session_key
     )
     SELECT
-        event_date,
-        event_time_only,
-        event_type,
-        product_id,
-        category,
-        subcategory,
-        price,
-        user_id,
-        user_session
-    FROM silver.ecommerce_behavior;
+        @first_event_key - 1 + ROW_NUMBER() OVER (
+            ORDER BY s.event_date, s.event_time_only, s.user_id, s.product_id, s.event_type,
+                     s.user_session, s.price
+        ) AS event_key,
+        s.event_date,
+        s.event_time_only,
+        YEAR(s.event_date) * 10000 + MONTH(s.event_date) * 100 + DAY(s.event_date) AS date_key,
+        DATEDIFF(SECOND, CAST('00:00:00' AS TIME(0)), s.event_time_only) AS time_key,
+        s.event_type,
+        s.product_id,
+        c.category_key,
+        b.brand_key,
+        s.price,
+        s.user_id,
+        ISNULL(ds.session_key, 0) AS session_key
+    FROM silver.ecommerce_behavior s
+    LEFT JOIN gold.dim_category c
+        ON c.category = s.category AND c.subcategory = s.subcategory
+    LEFT JOIN gold.dim_brand b
+        ON b.brand = s.brand
+    LEFT JOIN gold.dim_session ds
+        ON ds.session_uid = TRY_CONVERT(BINARY(16), REPLACE(s.user_session, '-', ''), 2)
+    WHERE @watermark IS NULL OR s.loaded_at > @watermark
+    -- Rowgroups are compressed in insertion order; a serial plan keeps the sort order
+    ORDER BY event_key
+    OPTION (MAXDOP 1);
+
+    -- ==============================================
+    -- Step 4: Log the batch key range and watermark
+    -- ==============================================
+    INSERT INTO gold.fact_load_batches (first_event_key, last_event_key, row_count, source_loaded_through)
+    VALUES (@first_event_key, @first_event_key + @row_count - 1, @row_count, @loaded_through);
 END;
 GO
@@ -0,0 +1,44 @@
+/*
+================================================================================
+Procedure: gold.MergeFactSessions
+Purpose: Merges the partial sessions in gold.fact_sessions_stage into
+         gold.fact_sessions:
+         - New sessions are inserted
+         - Sessions that continue from an earlier load batch are combined
+           with their existing row: counts and basket value are added,
+           start/end are widened and duration / converted are recomputed
+Notes:
+    - Called by gold/sessionize.py inside the transaction that fills the
+      staging table and records the consumed batches.
+================================================================================
+*/
+
+CREATE OR ALTER PROCEDURE gold.MergeFactSessions
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE gold.fact_sessions WITH (HOLDLOCK) AS t
+    USING gold.fact_sessions_stage AS s
+        ON t.session_key = s.session_key
+    WHEN MATCHED THEN
+        UPDATE SET
+            t.session_start  = CASE WHEN s.session_start < t.session_start THEN s.session_start ELSE t.session_start END,
+            t.session_end    = CASE WHEN s.session_end > t.session_end THEN s.session_end ELSE t.session_end END,
+            t.duration_s     = DATEDIFF(SECOND,
+                                   CASE WHEN s.session_start < t.session_start THEN s.session_start ELSE t.session_start END,
+                                   CASE WHEN s.session_end > t.session_end THEN s.session_end ELSE t.session_end END),
+            t.event_count    = t.event_count + s.event_count,
+            t.view_count     = t.view_count + s.view_count,
+            t.cart_count     = t.cart_count + s.cart_count,
+            t.purchase_count = t.purchase_count + s.purchase_count,
+            t.converted      = CASE WHEN t.purchase_count + s.purchase_count > 0 THEN 1 ELSE 0 END,
+            t.basket_value   = t.basket_value + s.basket_value,
+            t.updated_at     = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (session_key, user_id, session_start, session_end, duration_s, event_count,
+                view_count, cart_count, purchase_count, converted, basket_value)
+        VALUES (s.session_key, s.user_id, s.session_start, s.session_end, s.duration_s, s.event_count,
+                s.view_count, s.cart_count, s.purchase_count, s.converted, s.basket_value);
+END;
+GO
@@ -0,0 +1,247 @@
+"""
+================================================================================
+File: parquet_export.py
+Purpose: Exports the Gold layer to Parquet for analysts, so they read files
+         with column pruning and predicate pushdown instead of pulling the
+         tables through ODBC row by row:
+           - gold.fact_ecommerce -> fact_ecommerce/event_date=YYYY-MM-DD/part-0.parquet
+             (Hive-style date partitions)
+           - gold.dim_products   -> dim_products/part-0.parquet
+         Rows are streamed from a server-side cursor in batches, converted to
+         Arrow record batches and written in row groups with column statistics
+         (min/max/null count), sorted by time within each date.
+Functions:
+    - export_fact_partitions() : Re-exports the dates touched by fact load
+                                 batches not yet exported.
+    - export_dim_products()    : Exports the product dim when its table
+                                 fingerprint changed.
+    - open_fact_dataset()      : pyarrow dataset over the exported fact.
+Notes:
+    - Changed partitions come from gold.batch_consumers (consumer
+      'parquet_export'): only dates with new rows are rewritten. A partition
+      is rewritten as a whole file, replaced atomically.
+    - _manifest.json lists every exported partition with its row count and
+      export time, and the last exported dim fingerprint.
+    - Needs the optional 'pyarrow' package.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import text
+
+from dq_cache import table_fingerprint
+from gold.fact_batches import batch_events_query, mark_batches_consumed, pending_batch_ids
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export unavailable
+    pa = None
+
+# =================================================
+# Configuration
+# =================================================
+CONSUMER_NAME = "parquet_export"
+MANIFEST_NAME = "_manifest.json"
+
+FACT_COLUMNS = [
+    "event_key", "event_time_only", "event_type", "product_id", "category_key",
+    "brand_key", "price", "user_id", "session_key",
+]
+
+CHANGED_DATES_QUERY = batch_events_query("DISTINCT f.event_date", order_by="f.event_date")
+
+FACT_PARTITION_QUERY = f"""
+SELECT {", ".join(FACT_COLUMNS)}
+FROM gold.fact_ecommerce
+WHERE event_date = :event_date
+ORDER BY event_time_only, event_key;
+"""
+
+DIM_PRODUCTS_QUERY = "SELECT product_id, category_id, brand FROM gold.dim_products ORDER BY product_id;"
+
+
+def _schemas():
+    # event_date is the partition key (directory name), not a column in the files
+    fact = pa.schema([
+        ("event_key", pa.int64()),
+        ("event_time_only", pa.time32("s")),
+        ("event_type", pa.string()),
+        ("product_id", pa.int64()),
+        ("category_key", pa.int32()),
+        ("brand_key", pa.int32()),
+        ("price", pa.decimal128(10, 2)),
+        ("user_id", pa.int64()),
+        ("session_key", pa.int32()),
+    ])
+    dim_products = pa.schema([
+        ("product_id", pa.int64()),
+        ("category_id", pa.int64()),
+        ("brand", pa.string()),
+    ])
+    return fact, dim_products
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The Parquet export requires the 'pyarrow' package (pip install pyarrow).")
+
+
+# =================================================
+# Arrow Conversion
+# =================================================
+def _column_array(values, arrow_type):
+    """Arrow array of `values` as `arrow_type` (drivers return dates/times/decimals as text or float)."""
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array(values)
+        if pa.types.is_string(array.type) and pa.types.is_time(arrow_type):
+            # 'HH:MM:SS' or 'HH:MM:SS.ffffff'; TIME(0) has no fractional seconds
+            array = pc.utf8_slice_codeunits(array, 0, 8)
+            return pc.strptime(array, format="%H:%M:%S", unit="s").cast(arrow_type)
+        return array.cast(arrow_type)
+
+
+def _record_batches(result, schema, batch_rows: int):
+    """Arrow record batches from a streaming result, `batch_rows` rows at a time."""
+    for rows in result.partitions(batch_rows):
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [_column_array(list(values), field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+def _write_parquet(path: Path, batches, schema, row_group_rows: int, compression: str) -> int:
+    """
+    Writes `batches` to `path` (via a temp file, replaced atomically) in row
+    groups of up to `row_group_rows` rows. Returns the rows written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows_written = 0
+    pending, pending_rows = [], 0
+    with pq.ParquetWriter(tmp_path, schema, compression=compression, write_statistics=True) as writer:
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            # Buffer up to one row group, so row groups do not follow the fetch batch size
+            if pending_rows >= row_group_rows:
+                writer.write_table(pa.Table.from_batches(pending, schema), row_group_size=row_group_rows)
+                rows_written += pending_rows
+                pending, pending_rows = [], 0
+        if pending_rows or rows_written == 0:
+            writer.write_table(pa.Table.from_batches(pending, schema), row_group_size=row_group_rows)
+            rows_written += pending_rows
+    tmp_path.replace(path)
+    return rows_written
+
+
+# =================================================
+# Manifest
+# =================================================
+def _load_manifest(output_dir: Path) -> dict:
+    path = output_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"fact_ecommerce": {"partitions": {}}, "dim_products": {}}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_manifest(output_dir: Path, manifest: dict):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, default=str)
+    tmp_path.replace(path)
+
+
+# =================================================
+# Exports
+# =================================================
+def export_fact_partitions(engine, output_dir, batch_rows: int = 100_000, row_group_rows: int = 1_000_000,
+                           compression: str = "zstd"):
+    """
+    Re-exports every event_date partition touched by fact load batches not
+    yet exported, then marks those batches as exported. Returns
+    (partitions written, rows written).
+    """
+    _require_pyarrow()
+    fact_schema, _ = _schemas()
+    output_dir = Path(output_dir)
+    with engine.begin() as conn:
+        batch_ids = pending_batch_ids(conn, CONSUMER_NAME)
+        if not batch_ids:
+            return 0, 0
+        changed_dates = [row.event_date for row in conn.execute(CHANGED_DATES_QUERY, {"batch_ids": batch_ids})]
+
+    manifest = _load_manifest(output_dir)
+    partitions = manifest["fact_ecommerce"]["partitions"]
+    rows_total = 0
+    with engine.connect().execution_options(stream_results=True, yield_per=batch_rows) as conn:
+        for event_date in changed_dates:
+            event_date = str(event_date)
+            relative_path = Path("fact_ecommerce") / f"event_date={event_date}" / "part-0.parquet"
+            result = conn.execute(text(FACT_PARTITION_QUERY), {"event_date": event_date})
+            rows = _write_parquet(output_dir / relative_path, _record_batches(result, fact_schema, batch_rows),
+                                  fact_schema, row_group_rows, compression)
+            partitions[event_date] = {
+                "file": relative_path.as_posix(),
+                "rows": rows,
+                "exported_at": datetime.now(timezone.utc).isoformat(),
+            }
+            rows_total += rows
+    _save_manifest(output_dir, manifest)
+
+    # Only after the files and manifest are in place; a crash before this re-exports the same dates
+    with engine.begin() as conn:
+        mark_batches_consumed(conn, CONSUMER_NAME, batch_ids)
+    return len(changed_dates), rows_total
+
+
+def export_dim_products(engine, output_dir, batch_rows: int = 100_000, row_group_rows: int = 1_000_000,
+                        compression: str = "zstd"):
+    """
+    Exports gold.dim_products unless its table fingerprint matches the last
+    export. Returns the rows written (0 when unchanged).
+    """
+    _require_pyarrow()
+    _, dim_schema = _schemas()
+    output_dir = Path(output_dir)
+    manifest = _load_manifest(output_dir)
+    relative_path = Path("dim_products") / "part-0.parquet"
+    with engine.connect().execution_options(stream_results=True, yield_per=batch_rows) as conn:
+        fingerprint = table_fingerprint(conn, "gold.dim_products")
+        if manifest["dim_products"].get("fingerprint") == fingerprint and (output_dir / relative_path).exists():
+            return 0
+        result = conn.execute(text(DIM_PRODUCTS_QUERY))
+        rows = _write_parquet(output_dir / relative_path, _record_batches(result, dim_schema, batch_rows),
+                              dim_schema, row_group_rows, compression)
+    manifest["dim_products"] = {
+        "file": relative_path.as_posix(),
+        "rows": rows,
+        "fingerprint": fingerprint,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _save_manifest(output_dir, manifest)
+    return rows
+
+
+def open_fact_dataset(output_dir):
+    """
+    pyarrow dataset over the exported fact, with event_date typed as a date,
+    e.g. open_fact_dataset(path).to_table(columns=[...], filter=ds.field("event_date") == date(2019, 11, 1)).
+    """
+    _require_pyarrow()
+    partitioning = ds.partitioning(pa.schema([("event_date", pa.date32())]), flavor="hive")
+    return ds.dataset(Path(output_dir) / "fact_ecommerce", format="parquet", partitioning=partitioning)
@@ -0,0 +1,241 @@
+"""
+================================================================================
+File: product_bitmap.py
+Purpose: Compressed, roaring-style bitmap of the product_ids in gold.dim_products,
+         persisted to disk and used to check new fact batches for referential
+         integrity in Python, without joining the fact history to the dim.
+Functions:
+    - ProductIdBitmap            : Bitmap with vectorized membership tests.
+    - refresh_product_bitmap()   : Rebuilds and saves the bitmap from the dim.
+    - load_product_bitmap()      : Loads the saved bitmap (rebuilds it if missing
+                                   or older than the dim).
+    - check_new_fact_batches()   : Streams the product_ids of the fact batches
+                                   not yet checked and tests them against the bitmap.
+Layout (as in Roaring bitmaps):
+    - ids are split into a high part (id >> 16), selecting a container, and a
+      16-bit low part stored in that container
+    - sparse containers (< 4096 values) are sorted uint16 arrays
+    - dense containers are 65536-bit bitsets (8 KB)
+Notes:
+    - NULL product_ids are reported as orphans, like the SQL LEFT JOIN check.
+    - Only batches without orphans are marked as checked. Batches with
+      orphans stay pending, so their orphans are reported on every run until
+      the dim (or the fact) is fixed.
+    - The bitmap file stores the table fingerprint of gold.dim_products
+      (dq_cache.table_fingerprint) it was built from; a file whose
+      fingerprint no longer matches the dim is rebuilt before use.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from dq_cache import table_fingerprint
+from gold.fact_batches import batch_events_query, mark_batches_consumed, pending_batch_ids
+
+# =================================================
+# Configuration
+# =================================================
+CONSUMER_NAME = "product_ri"
+
+ARRAY_CONTAINER_MAX = 4096      # above this many values a bitset is smaller
+CONTAINER_BITS = 1 << 16
+
+DIM_PRODUCT_IDS_QUERY = "SELECT product_id FROM gold.dim_products WHERE product_id IS NOT NULL"
+
+NEW_FACT_PRODUCTS_QUERY = batch_events_query("b.batch_id, f.product_id")
+
+
+# =================================================
+# Bitmap
+# =================================================
+class ProductIdBitmap:
+    """
+    Roaring-style set of 64-bit integer ids.
+
+    Usage:
+        bitmap = ProductIdBitmap.from_ids(dim_product_ids)
+        is_member = bitmap.contains(fact_product_ids)   # boolean array
+    """
+
+    def __init__(self, containers: dict = None, fingerprint: dict = None):
+        # high key -> sorted np.uint16 array (sparse) or packed np.uint8 bitset (dense)
+        self.containers = containers or {}
+        # table fingerprint of the dim the ids were read from (None if unknown)
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def _split(ids: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        return ids >> 16, (ids & 0xFFFF).astype(np.uint16)
+
+    @staticmethod
+    def _make_container(lows: np.ndarray) -> np.ndarray:
+        lows = np.unique(lows)
+        if len(lows) < ARRAY_CONTAINER_MAX:
+            return lows
+        bits = np.zeros(CONTAINER_BITS, dtype=bool)
+        bits[lows] = True
+        return np.packbits(bits, bitorder="little")
+
+    @staticmethod
+    def _is_bitset(container: np.ndarray) -> bool:
+        return container.dtype == np.uint8
+
+    @classmethod
+    def from_ids(cls, ids) -> "ProductIdBitmap":
+        bitmap = cls()
+        bitmap.add(ids)
+        return bitmap
+
+    def add(self, ids):
+        """Adds `ids` (any integer array-like) to the set."""
+        highs, lows = self._split(ids)
+        if len(highs) == 0:
+            return
+        order = np.argsort(highs, kind="stable")
+        highs, lows = highs[order], lows[order]
+        boundaries = np.flatnonzero(np.diff(highs)) + 1
+        for high_group, low_group in zip(np.split(highs, boundaries), np.split(lows, boundaries)):
+            high = int(high_group[0])
+            existing = self.containers.get(high)
+            if existing is not None:
+                low_group = np.concatenate([self._container_values(existing), low_group])
+            self.containers[high] = self._make_container(low_group)
+
+    def _container_values(self, container: np.ndarray) -> np.ndarray:
+        if self._is_bitset(container):
+            return np.flatnonzero(np.unpackbits(container, bitorder="little")).astype(np.uint16)
+        return container
+
+    def contains(self, ids) -> np.ndarray:
+        """Vectorized membership test: boolean array, True where the id is in the set."""
+        highs, lows = self._split(ids)
+        result = np.zeros(len(highs), dtype=bool)
+        # Group the query ids by container with one sort instead of a mask per container
+        order = np.argsort(highs, kind="stable")
+        group_highs, starts = np.unique(highs[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for high, start, end in zip(group_highs, starts, ends):
+            container = self.containers.get(int(high))
+            if container is None:
+                continue
+            positions_in_query = order[start:end]
+            query = lows[positions_in_query]
+            if self._is_bitset(container):
+                hits = ((container[query >> 3] >> (query & 7).astype(np.uint8)) & 1).astype(bool)
+            else:
+                positions = np.searchsorted(container, query)
+                positions[positions == len(container)] = 0
+                hits = container[positions] == query
+            result[positions_in_query] = hits
+        return result
+
+    def __len__(self):
+        return int(sum(
+            int(np.unpackbits(c).sum()) if self._is_bitset(c) else len(c)
+            for c in self.containers.values()
+        ))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.containers.values())
+
+    # --- persistence ---
+    def save(self, path):
+        """Saves the containers to a compressed .npz file (written atomically)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        highs = np.array(sorted(self.containers), dtype=np.int64)
+        payloads = [self.containers[int(h)].view(np.uint8) for h in highs]
+        kinds = np.array([self._is_bitset(self.containers[int(h)]) for h in highs], dtype=bool)
+        offsets = np.cumsum([0] + [len(p) for p in payloads]).astype(np.int64)
+        payload = np.concatenate(payloads) if payloads else np.zeros(0, dtype=np.uint8)
+        fingerprint = np.array(json.dumps(self.fingerprint, sort_keys=True))
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            np.savez_compressed(fh, highs=highs, kinds=kinds, offsets=offsets, payload=payload,
+                                fingerprint=fingerprint)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path) -> "ProductIdBitmap":
+        with np.load(path) as data:
+            highs, kinds, offsets, payload = data["highs"], data["kinds"], data["offsets"], data["payload"]
+            # files written before fingerprints were stored have none and are treated as stale
+            fingerprint = json.loads(str(data["fingerprint"])) if "fingerprint" in data.files else None
+        containers = {}
+        for i, high in enumerate(highs):
+            raw = payload[offsets[i]:offsets[i + 1]]
+            containers[int(high)] = raw.copy() if kinds[i] else raw.view(np.uint16).copy()
+        return cls(containers, fingerprint)
+
+
+# =================================================
+# Dim Sync and RI Check
+# =================================================
+def refresh_product_bitmap(engine, path) -> ProductIdBitmap:
+    """Rebuilds the bitmap from gold.dim_products and saves it to `path`."""
+    with engine.connect() as conn:
+        fingerprint = table_fingerprint(conn, "gold.dim_products")
+        product_ids = pd.read_sql(text(DIM_PRODUCT_IDS_QUERY), conn)["product_id"].to_numpy()
+    bitmap = ProductIdBitmap.from_ids(product_ids)
+    bitmap.fingerprint = fingerprint
+    bitmap.save(path)
+    return bitmap
+
+
+def load_product_bitmap(engine, path) -> ProductIdBitmap:
+    """
+    Loads the saved bitmap; rebuilds it from the dim first if the file is
+    missing or was built from a different version of gold.dim_products.
+    """
+    if Path(path).exists():
+        bitmap = ProductIdBitmap.load(path)
+        with engine.connect() as conn:
+            if bitmap.fingerprint == table_fingerprint(conn, "gold.dim_products"):
+                return bitmap
+        print("⚠️ Product-id bitmap is older than gold.dim_products, rebuilding it.")
+    return refresh_product_bitmap(engine, path)
+
+
+def check_new_fact_batches(engine, bitmap: ProductIdBitmap, chunksize: int = 1_000_000, sample_size: int = 5,
+                           consumer: str = CONSUMER_NAME):
+    """
+    Tests the product_ids of the fact batches `consumer` has not checked yet
+    against `bitmap` and marks the batches without orphans as checked.
+    Returns (rows checked, orphan rows, sample of missing product_ids).
+    """
+    rows_checked = 0
+    orphan_rows = 0
+    missing_sample = []
+    batches_with_orphans = set()
+    with engine.connect().execution_options(stream_results=True) as read_conn, \
+            engine.begin() as write_conn:
+        batch_ids = pending_batch_ids(write_conn, consumer)
+        if not batch_ids:
+            return 0, 0, []
+        chunks = pd.read_sql(NEW_FACT_PRODUCTS_QUERY, read_conn, params={"batch_ids": batch_ids},
+                             chunksize=chunksize)
+        for chunk in chunks:
+            product_ids = chunk["product_id"]
+            is_null = product_ids.isna().to_numpy()
+            is_member = np.zeros(len(chunk), dtype=bool)
+            is_member[~is_null] = bitmap.contains(product_ids[~is_null].to_numpy(dtype=np.int64))
+            orphans = product_ids[~is_member]
+            batches_with_orphans.update(chunk["batch_id"][~is_member].unique().tolist())
+            rows_checked += len(chunk)
+            orphan_rows += len(orphans)
+            if len(missing_sample) < sample_size:
+                for product_id in orphans.unique()[:sample_size]:
+                    if product_id not in missing_sample and len(missing_sample) < sample_size:
+                        missing_sample.append(product_id)
+        mark_batches_consumed(write_conn, consumer, [b for b in batch_ids if b not in batches_with_orphans])
+    return rows_checked, orphan_rows, missing_sample
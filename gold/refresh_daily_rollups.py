@@ -0,0 +1,58 @@
+"""
+================================================================================
+File: refresh_daily_rollups.py
+Purpose: Incrementally refreshes the Gold-layer daily rollup tables
+         'agg_daily_product_event' and 'agg_daily_category_funnel' by executing
+         the stored procedure 'gold.RefreshDailyRollups' via Prefect tasks.
+         Only fact load batches that have not been rolled up yet are read, so
+         it must run after the fact load.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+from prefect import flow, task
+from sqlalchemy import create_engine, text
+
+# =================================================
+# Database Engine (replace with your connection string)
+# =================================================
+engine = create_engine(
+    "mssql+pyodbc://@ATX11492/ecommerce_behavior?"
+    "driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+)
+
+
+# =================================================
+# Task: Refresh Daily Rollups via Stored Procedure
+# =================================================
+@task
+def refresh_gold_daily_rollups():
+    """
+    Executes the Gold-layer stored procedure that merges the new fact
+    batches into the daily rollup tables.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("EXEC gold.RefreshDailyRollups"))
+
+    print("✅ Gold daily rollups refreshed via stored procedure.")
+    return "Gold daily rollups refreshed ✅"
+
+
+# =================================================
+# Prefect Flow: Orchestrate Daily Rollups Refresh
+# =================================================
+@flow(name="gold-daily-rollups-refresh")
+def gold_rollups_refresh_flow():
+    print("⚡ Running Gold Daily Rollups Refresh...")
+    result = refresh_gold_daily_rollups()
+    print(result)
+    print("🎉 Gold daily rollups refresh completed!")
+
+
+# =================================================
+# Main Execution
+# =================================================
+if __name__ == "__main__":
+    gold_rollups_refresh_flow()
@@ -0,0 +1,107 @@
+/*
+================================================================================
+Procedure: gold.RefreshDailyRollups
+Purpose: Incrementally maintains the daily rollup tables from the fact load
+         batches that have not been rolled up yet:
+         - Aggregates only the new batches' key ranges of gold.fact_ecommerce
+         - MERGEs the partial aggregates into the rollups (counts and revenue
+           are added to existing rows, new groups are inserted)
+         - Records the batches in gold.batch_consumers ('daily_rollups')
+         Everything runs in one transaction, so a batch is applied exactly once.
+================================================================================
+*/
+
+CREATE OR ALTER PROCEDURE gold.RefreshDailyRollups
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    -- ==============================================
+    -- Step 0: Find batches not yet rolled up
+    -- ==============================================
+    DECLARE @batches TABLE (
+        batch_id         INT    NOT NULL PRIMARY KEY,
+        first_event_key  BIGINT NOT NULL,
+        last_event_key   BIGINT NOT NULL
+    );
+
+    INSERT INTO @batches (batch_id, first_event_key, last_event_key)
+    SELECT b.batch_id, b.first_event_key, b.last_event_key
+    FROM gold.fact_load_batches b
+    WHERE NOT EXISTS (
+        SELECT 1 FROM gold.batch_consumers c
+        WHERE c.consumer = 'daily_rollups' AND c.batch_id = b.batch_id
+    );
+
+    IF NOT EXISTS (SELECT 1 FROM @batches)
+        RETURN;
+
+    BEGIN TRANSACTION;
+
+    -- ==============================================
+    -- Step 1: Daily x product x event type
+    -- ==============================================
+    MERGE gold.agg_daily_product_event WITH (HOLDLOCK) AS t
+    USING (
+        SELECT
+            f.event_date,
+            ISNULL(f.product_id, -1)        AS product_id,
+            ISNULL(f.event_type, 'UNKNOWN') AS event_type,
+            COUNT_BIG(*)                    AS event_count,
+            ISNULL(SUM(CASE WHEN f.event_type = 'purchase' THEN f.price END), 0) AS revenue
+        FROM gold.fact_ecommerce f
+        JOIN @batches b
+            ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+        GROUP BY f.event_date, ISNULL(f.product_id, -1), ISNULL(f.event_type, 'UNKNOWN')
+    ) AS d
+        ON  t.event_date = d.event_date
+        AND t.product_id = d.product_id
+        AND t.event_type = d.event_type
+    WHEN MATCHED THEN
+        UPDATE SET
+            t.event_count = t.event_count + d.event_count,
+            t.revenue     = t.revenue + d.revenue
+    WHEN NOT MATCHED THEN
+        INSERT (event_date, product_id, event_type, event_count, revenue)
+        VALUES (d.event_date, d.product_id, d.event_type, d.event_count, d.revenue);
+
+    -- ==============================================
+    -- Step 2: Daily x category funnel
+    -- ==============================================
+    MERGE gold.agg_daily_category_funnel WITH (HOLDLOCK) AS t
+    USING (
+        SELECT
+            f.event_date,
+            ISNULL(f.category_key, 0) AS category_key,
+            SUM(CASE WHEN f.event_type = 'view' THEN 1 ELSE 0 END)     AS view_count,
+            SUM(CASE WHEN f.event_type = 'cart' THEN 1 ELSE 0 END)     AS cart_count,
+            SUM(CASE WHEN f.event_type = 'purchase' THEN 1 ELSE 0 END) AS purchase_count,
+            ISNULL(SUM(CASE WHEN f.event_type = 'purchase' THEN f.price END), 0) AS revenue
+        FROM gold.fact_ecommerce f
+        JOIN @batches b
+            ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+        GROUP BY f.event_date, ISNULL(f.category_key, 0)
+    ) AS d
+        ON  t.event_date = d.event_date
+        AND t.category_key = d.category_key
+    WHEN MATCHED THEN
+        UPDATE SET
+            t.view_count     = t.view_count + d.view_count,
+            t.cart_count     = t.cart_count + d.cart_count,
+            t.purchase_count = t.purchase_count + d.purchase_count,
+            t.revenue        = t.revenue + d.revenue
+    WHEN NOT MATCHED THEN
+        INSERT (event_date, category_key, view_count, cart_count, purchase_count, revenue)
+        VALUES (d.event_date, d.category_key, d.view_count, d.cart_count, d.purchase_count, d.revenue);
+
+    -- ==============================================
+    -- Step 3: Mark batches as rolled up
+    -- ==============================================
+    INSERT INTO gold.batch_consumers (consumer, batch_id)
+    SELECT 'daily_rollups', batch_id
+    FROM @batches;
+
+    COMMIT TRANSACTION;
+END;
+GO
@@ -0,0 +1,58 @@
+"""
+================================================================================
+File: refresh_user_features.py
+Purpose: Incrementally refreshes the Gold-layer per-user feature table
+         'user_features' by executing the stored procedure
+         'gold.RefreshUserFeatures' via Prefect tasks. Only fact load batches
+         that have not been processed yet are read, so it must run after the
+         fact load.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+from prefect import flow, task
+from sqlalchemy import create_engine, text
+
+# =================================================
+# Database Engine (replace with your connection string)
+# =================================================
+engine = create_engine(
+    "mssql+pyodbc://@ATX11492/ecommerce_behavior?"
+    "driver=ODBC+Driver+17+for+SQL+Server&trusted_connection=yes"
+)
+
+
+# =================================================
+# Task: Refresh User Features via Stored Procedure
+# =================================================
+@task
+def refresh_gold_user_features():
+    """
+    Executes the Gold-layer stored procedure that merges the new fact
+    batches' per-user aggregates into gold.user_features.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("EXEC gold.RefreshUserFeatures"))
+
+    print("✅ Gold user features refreshed via stored procedure.")
+    return "Gold user features refreshed ✅"
+
+
+# =================================================
+# Prefect Flow: Orchestrate User Features Refresh
+# =================================================
+@flow(name="gold-user-features-refresh")
+def gold_user_features_refresh_flow():
+    print("⚡ Running Gold User Features Refresh...")
+    result = refresh_gold_user_features()
+    print(result)
+    print("🎉 Gold user features refresh completed!")
+
+
+# =================================================
+# Main Execution
+# =================================================
+if __name__ == "__main__":
+    gold_user_features_refresh_flow()
@@ -0,0 +1,103 @@
+/*
+================================================================================
+Procedure: gold.RefreshUserFeatures
+Purpose: Incrementally maintains gold.user_features from the fact load batches
+         not processed yet:
+         - Aggregates the new batches' events per user (counts, sums, min/max
+           timestamps)
+         - MERGEs the partial aggregates into the stored state
+         - Records the batches in gold.batch_consumers ('user_features')
+         The cost depends on the number of new events, not on the history.
+         A batch holds only the rows gold.LoadFactEcommerce had not loaded
+         before, so adding its aggregates never counts an event twice; a
+         re-run without new fact batches changes nothing.
+================================================================================
+*/
+
+CREATE OR ALTER PROCEDURE gold.RefreshUserFeatures
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+
+    -- ==============================================
+    -- Step 0: Find batches not yet processed
+    -- ==============================================
+    DECLARE @batches TABLE (
+        batch_id         INT    NOT NULL PRIMARY KEY,
+        first_event_key  BIGINT NOT NULL,
+        last_event_key   BIGINT NOT NULL
+    );
+
+    INSERT INTO @batches (batch_id, first_event_key, last_event_key)
+    SELECT b.batch_id, b.first_event_key, b.last_event_key
+    FROM gold.fact_load_batches b
+    WHERE NOT EXISTS (
+        SELECT 1 FROM gold.batch_consumers c
+        WHERE c.consumer = 'user_features' AND c.batch_id = b.batch_id
+    );
+
+    IF NOT EXISTS (SELECT 1 FROM @batches)
+        RETURN;
+
+    BEGIN TRANSACTION;
+
+    -- ==============================================
+    -- Step 1: Merge per-user partial aggregates
+    -- ==============================================
+    MERGE gold.user_features WITH (HOLDLOCK) AS t
+    USING (
+        SELECT
+            e.user_id,
+            MIN(e.event_at)                                                  AS first_event_at,
+            MAX(e.event_at)                                                  AS last_event_at,
+            MAX(CASE WHEN e.event_type = 'purchase' THEN e.event_at END)     AS last_purchase_at,
+            COUNT_BIG(*)                                                     AS event_count,
+            SUM(CASE WHEN e.event_type = 'view' THEN 1 ELSE 0 END)           AS view_count,
+            SUM(CASE WHEN e.event_type = 'cart' THEN 1 ELSE 0 END)           AS cart_count,
+            SUM(CASE WHEN e.event_type = 'purchase' THEN 1 ELSE 0 END)       AS purchase_count,
+            ISNULL(SUM(CASE WHEN e.event_type = 'purchase' THEN e.price END), 0) AS purchase_value
+        FROM (
+            SELECT
+                f.user_id,
+                f.event_type,
+                f.price,
+                DATEADD(SECOND, DATEDIFF(SECOND, CAST('00:00:00' AS TIME(0)), f.event_time_only),
+                        CAST(f.event_date AS DATETIME2(0))) AS event_at
+            FROM gold.fact_ecommerce f
+            JOIN @batches b
+                ON f.event_key BETWEEN b.first_event_key AND b.last_event_key
+            WHERE f.user_id IS NOT NULL
+        ) e
+        GROUP BY e.user_id
+    ) AS d
+        ON t.user_id = d.user_id
+    WHEN MATCHED THEN
+        UPDATE SET
+            t.first_event_at   = CASE WHEN d.first_event_at < t.first_event_at THEN d.first_event_at ELSE t.first_event_at END,
+            t.last_event_at    = CASE WHEN d.last_event_at > t.last_event_at THEN d.last_event_at ELSE t.last_event_at END,
+            t.last_purchase_at = CASE WHEN t.last_purchase_at IS NULL OR d.last_purchase_at > t.last_purchase_at
+                                      THEN ISNULL(d.last_purchase_at, t.last_purchase_at)
+                                      ELSE t.last_purchase_at END,
+            t.event_count      = t.event_count + d.event_count,
+            t.view_count       = t.view_count + d.view_count,
+            t.cart_count       = t.cart_count + d.cart_count,
+            t.purchase_count   = t.purchase_count + d.purchase_count,
+            t.purchase_value   = t.purchase_value + d.purchase_value,
+            t.updated_at       = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (user_id, first_event_at, last_event_at, last_purchase_at, event_count,
+                view_count, cart_count, purchase_count, purchase_value)
+        VALUES (d.user_id, d.first_event_at, d.last_event_at, d.last_purchase_at, d.event_count,
+                d.view_count, d.cart_count, d.purchase_count, d.purchase_value);
+
+    -- ==============================================
+    -- Step 2: Mark batches as processed
+    -- ==============================================
+    INSERT INTO gold.batch_consumers (consumer, batch_id)
+    SELECT 'user_features', batch_id
+    FROM @batches;
+
+    COMMIT TRANSACTION;
+END;
+GO
@@ -0,0 +1,162 @@
+"""
+================================================================================
+File: sessionize.py
+Purpose: Streaming sessionization of the Gold fact table into the session-level
+         fact 'gold.fact_sessions' (one row per user session: start/end,
+         duration, event counts by type, converted flag, basket value).
+Functions:
+    - sessionize_events()  : Aggregates the events of complete sessions.
+    - stream_sessions()    : Turns chunks ordered by session into session rows,
+                             carrying the last (possibly incomplete) session of
+                             each chunk over to the next one.
+    - load_fact_sessions() : Reads the fact load batches not yet sessionized in
+                             one ordered, streaming pass and merges the result
+                             into gold.fact_sessions via 'gold.MergeFactSessions'.
+Notes:
+    - Memory is bounded by one chunk plus the carried-over session.
+    - A session that continues in a later load batch is merged into its
+      existing row (counts and values are added, start/end widened), so the
+      table is maintained incrementally.
+    - Each fact load batch holds only events gold.LoadFactEcommerce had not
+      loaded before, and a batch is marked consumed in the merge
+      transaction, so no event is added to a session twice; re-running
+      without new batches changes nothing.
+    - Events of the UNKNOWN session (session_key 0) are not sessionized.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import pandas as pd
+from sqlalchemy import text
+
+from gold.fact_batches import batch_events_query, mark_batches_consumed, pending_batch_ids
+
+# =================================================
+# Configuration
+# =================================================
+CONSUMER_NAME = "sessions"
+
+SESSION_COLUMNS = [
+    "session_key", "user_id", "session_start", "session_end", "duration_s",
+    "event_count", "view_count", "cart_count", "purchase_count", "converted",
+    "basket_value",
+]
+
+# Events of the pending batches, ordered so every session is contiguous
+DELTA_EVENTS_QUERY = batch_events_query(
+    "f.session_key, f.user_id, f.event_date, f.event_time_only, f.event_type, f.price",
+    where="f.session_key <> 0",
+    order_by="f.session_key, f.event_date, f.event_time_only",
+)
+
+
+# =================================================
+# Session Aggregation
+# =================================================
+def sessionize_events(events: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates events into one row per session_key. All events of each
+    session must be in `events`.
+    """
+    event_ts = pd.to_datetime(
+        events["event_date"].astype(str) + " " + events["event_time_only"].astype(str),
+        format="ISO8601",
+    )
+    is_purchase = events["event_type"] == "purchase"
+    df = pd.DataFrame({
+        "session_key": events["session_key"],
+        "user_id": events["user_id"],
+        "event_ts": event_ts,
+        "is_view": events["event_type"] == "view",
+        "is_cart": events["event_type"] == "cart",
+        "is_purchase": is_purchase,
+        "purchase_price": pd.to_numeric(events["price"]).where(is_purchase, 0.0).fillna(0.0),
+    })
+
+    sessions = df.groupby("session_key", sort=False).agg(
+        user_id=("user_id", "first"),
+        session_start=("event_ts", "min"),
+        session_end=("event_ts", "max"),
+        event_count=("event_ts", "size"),
+        view_count=("is_view", "sum"),
+        cart_count=("is_cart", "sum"),
+        purchase_count=("is_purchase", "sum"),
+        basket_value=("purchase_price", "sum"),
+    ).reset_index()
+    sessions["duration_s"] = (sessions["session_end"] - sessions["session_start"]).dt.total_seconds().astype("int64")
+    sessions["converted"] = (sessions["purchase_count"] > 0).astype("int8")
+    sessions["basket_value"] = sessions["basket_value"].round(2)
+    return sessions[SESSION_COLUMNS]
+
+
+def stream_sessions(chunks):
+    """
+    Yields session rows from event chunks ordered by session_key. The last
+    session of a chunk may continue in the next chunk, so its events are held
+    back and prepended to the next chunk.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        is_last_session = chunk["session_key"] == chunk["session_key"].iat[-1]
+        carry = chunk[is_last_session]
+        complete = chunk[~is_last_session]
+        if not complete.empty:
+            yield sessionize_events(complete)
+    if carry is not None and not carry.empty:
+        yield sessionize_events(carry)
+
+
+# =================================================
+# Incremental Load
+# =================================================
+def _clear_stage(conn):
+    if conn.dialect.name == "mssql":
+        conn.execute(text("TRUNCATE TABLE gold.fact_sessions_stage"))
+    else:
+        conn.execute(text("DELETE FROM gold.fact_sessions_stage"))
+
+
+def load_fact_sessions(engine, chunksize: int = 250_000):
+    """
+    Sessionizes the fact load batches not yet consumed by 'sessions' and
+    merges them into gold.fact_sessions. Staging, merge and the batch
+    bookkeeping share one transaction. Returns (events read, session rows
+    staged).
+    """
+    with engine.begin() as conn:
+        batch_ids = pending_batch_ids(conn, CONSUMER_NAME)
+    if not batch_ids:
+        return 0, 0
+
+    events_read = 0
+    sessions_staged = 0
+    with engine.connect().execution_options(stream_results=True) as read_conn, \
+            engine.begin() as write_conn:
+        _clear_stage(write_conn)
+        chunks = pd.read_sql(DELTA_EVENTS_QUERY, read_conn, params={"batch_ids": batch_ids}, chunksize=chunksize)
+
+        def counted(chunks):
+            nonlocal events_read
+            for chunk in chunks:
+                events_read += len(chunk)
+                yield chunk
+
+        for sessions in stream_sessions(counted(chunks)):
+            sessions.to_sql(
+                name="fact_sessions_stage",
+                schema="gold",
+                con=write_conn,
+                if_exists="append",
+                index=False,
+            )
+            sessions_staged += len(sessions)
+
+        write_conn.execute(text("EXEC gold.MergeFactSessions"))
+        mark_batches_consumed(write_conn, CONSUMER_NAME, batch_ids)
+    return events_read, sessions_staged
@@ -0,0 +1,345 @@
+"""
+================================================================================
+File: pipeline_telemetry.py
+Purpose: Structured per-stage performance telemetry for the medallion pipeline.
+         Every instrumented task records:
+           - wall time, and how much of it was spent in the database vs. Python
+           - rows in / rows out and bytes read
+           - peak process RSS while the task ran
+           - number of database round-trips
+         Results are emitted as JSON lines, as a Prometheus textfile (for the
+         node_exporter textfile collector) and as a Prefect table artifact.
+Functions:
+    - instrument_engine()      : Hooks SQLAlchemy cursor events to time DB calls.
+    - instrumented_stage()     : Decorator that measures one task (stage).
+    - record_rows()            : Adds rows in/out and bytes read to the current stage.
+    - take_stage_metrics() /
+      add_stage_metrics()      : Move stage metrics between processes (sharded runs).
+    - process_rss()            : RSS of the process (for peak sampling).
+    - current_rss()            : Current RSS, or None where only a peak is available.
+    - table_row_count()        : Cheap row count used for rows in/out of SP stages.
+    - publish_run_telemetry()  : Writes JSONL + Prometheus file and attaches to Prefect.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import event, text
+
+try:
+    import psutil
+except ImportError:  # RSS falls back to the resource module / is omitted
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# =================================================
+# Configuration
+# =================================================
+RSS_SAMPLE_INTERVAL_S = 0.05
+PROMETHEUS_PREFIX = "ecommerce_etl_stage"
+
+
+# =================================================
+# Stage Metrics
+# =================================================
+@dataclass
+class StageMetrics:
+    stage: str
+    started_at: str = ""
+    status: str = "running"
+    wall_s: float = 0.0
+    db_time_s: float = 0.0
+    python_time_s: float = 0.0
+    db_round_trips: int = 0
+    rows_in: int = None
+    rows_out: int = None
+    bytes_read: int = None
+    peak_rss_bytes: int = None
+    extra: dict = field(default_factory=dict)
+
+
+# Metrics for every stage run in this process, in execution order
+RUN_METRICS = []
+
+_current_stage = ContextVar("current_stage", default=None)
+_lock = threading.Lock()
+
+
+def current_stage():
+    """Returns the StageMetrics of the stage running in this context (or None)."""
+    return _current_stage.get()
+
+
+def record_rows(rows_in: int = None, rows_out: int = None, bytes_read: int = None, **extra):
+    """Adds row/byte counters (and any extra named values) to the current stage."""
+    stage = _current_stage.get()
+    if stage is None:
+        return
+    with _lock:
+        if rows_in is not None:
+            stage.rows_in = (stage.rows_in or 0) + rows_in
+        if rows_out is not None:
+            stage.rows_out = (stage.rows_out or 0) + rows_out
+        if bytes_read is not None:
+            stage.bytes_read = (stage.bytes_read or 0) + bytes_read
+        stage.extra.update(extra)
+
+
+def take_stage_metrics() -> list:
+    """Removes and returns the stages recorded so far (e.g. to send them from a worker process)."""
+    with _lock:
+        metrics = list(RUN_METRICS)
+        RUN_METRICS.clear()
+    return metrics
+
+
+def add_stage_metrics(metrics):
+    """Adds stages recorded elsewhere (e.g. in worker processes) to this run."""
+    with _lock:
+        RUN_METRICS.extend(metrics)
+
+
+# =================================================
+# Database Timing (SQLAlchemy cursor events)
+# =================================================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("telemetry_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("telemetry_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stage = _current_stage.get()
+    if stage is not None:
+        with _lock:
+            stage.db_time_s += elapsed
+            stage.db_round_trips += 1
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("telemetry_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """Registers the timing hooks on `engine` (safe to call more than once)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def table_row_count(conn, table: str) -> int:
+    """
+    Row count of `table`. On SQL Server this reads partition metadata instead of
+    scanning the table, so it is cheap enough to call around every load.
+    """
+    if conn.dialect.name == "mssql":
+        query = """
+        SELECT SUM(row_count)
+        FROM sys.dm_db_partition_stats
+        WHERE object_id = OBJECT_ID(:table_name) AND index_id IN (0, 1);
+        """
+        return conn.execute(text(query), {"table_name": table}).scalar() or 0
+    return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() or 0
+
+
+# =================================================
+# Peak RSS Sampling
+# =================================================
+def process_rss(process=None):
+    """
+    Resident set size of this process in bytes (None if it cannot be read).
+    Without psutil this is the high-water mark from the resource module.
+    """
+    if psutil is not None:
+        return (process or psutil.Process()).memory_info().rss
+    if resource is not None:
+        # ru_maxrss is the process high-water mark (KB on Linux, bytes on macOS)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    return None
+
+
+def current_rss():
+    """
+    Current resident set size of this process in bytes, or None without a
+    source that can go down again (psutil, or /proc on Linux): unlike
+    process_rss(), never the ru_maxrss high-water mark.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """Polls the process RSS in the background and keeps the highest value."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = None
+        self._stop_event = threading.Event()
+        self._process = psutil.Process() if psutil else None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._sample()
+            self._stop_event.wait(RSS_SAMPLE_INTERVAL_S)
+
+    def _sample(self):
+        rss = process_rss(self._process)
+        if rss is None:
+            return
+        self.peak = rss if self.peak is None else max(self.peak, rss)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self._sample()
+        return self.peak
+
+
+# =================================================
+# Stage Decorator
+# =================================================
+def instrumented_stage(func):
+    """
+    Measures the decorated task. Place it below the Prefect `@task` decorator
+    so Prefect wraps the instrumented function.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stage = StageMetrics(stage=func.__name__, started_at=datetime.now(timezone.utc).isoformat())
+        token = _current_stage.set(stage)
+        sampler = _RssSampler()
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            stage.status = "completed"
+            return result
+        except BaseException:
+            stage.status = "failed"
+            raise
+        finally:
+            stage.wall_s = round(time.perf_counter() - start, 6)
+            stage.peak_rss_bytes = sampler.stop()
+            stage.db_time_s = round(stage.db_time_s, 6)
+            stage.python_time_s = round(max(stage.wall_s - stage.db_time_s, 0.0), 6)
+            _current_stage.reset(token)
+            with _lock:
+                RUN_METRICS.append(stage)
+    return wrapper
+
+
+# =================================================
+# Emitters
+# =================================================
+def _prefect_flow_run_id():
+    try:
+        from prefect.runtime import flow_run
+        return str(flow_run.id) if flow_run.id else None
+    except ImportError:
+        return None
+
+
+def write_jsonl(path, metrics, run_id: str):
+    """Appends one JSON object per stage to `path`."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as fh:
+        for stage in metrics:
+            fh.write(json.dumps({"run_id": run_id, **asdict(stage)}, default=str) + "\n")
+
+
+def write_prometheus_textfile(path, metrics):
+    """
+    Writes the metrics of the latest run in Prometheus text exposition format.
+    The file is replaced atomically so the textfile collector never reads a
+    partial file.
+    """
+    gauges = [
+        ("wall_seconds", "Wall-clock time of the stage.", "wall_s"),
+        ("db_seconds", "Time spent in database calls.", "db_time_s"),
+        ("python_seconds", "Time spent outside database calls.", "python_time_s"),
+        ("db_round_trips", "Number of database round-trips.", "db_round_trips"),
+        ("rows_in", "Rows read by the stage.", "rows_in"),
+        ("rows_out", "Rows written by the stage.", "rows_out"),
+        ("bytes_read", "Bytes read from source files.", "bytes_read"),
+        ("peak_rss_bytes", "Peak resident set size while the stage ran.", "peak_rss_bytes"),
+    ]
+    lines = []
+    for name, help_text, attr in gauges:
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} gauge")
+        for stage in metrics:
+            value = getattr(stage, attr)
+            if value is not None:
+                lines.append(f'{PROMETHEUS_PREFIX}_{name}{{stage="{stage.stage}",status="{stage.status}"}} {value}')
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def attach_to_prefect_run(metrics):
+    """Attaches the stage metrics to the current Prefect flow run as a table artifact."""
+    try:
+        from prefect.artifacts import create_table_artifact
+        create_table_artifact(
+            key="stage-telemetry",
+            table=[{k: v for k, v in asdict(stage).items() if k != "extra"} for stage in metrics],
+            description="Per-stage performance telemetry",
+        )
+    except Exception as e:  # API unavailable
+        print(f"⚠️ Could not attach telemetry to the Prefect run: {e}")
+
+
+def publish_run_telemetry(output_dir: str):
+    """
+    Emits everything recorded so far (JSONL, Prometheus textfile, Prefect
+    artifact), prints a short summary and clears the collector.
+    """
+    with _lock:
+        metrics = list(RUN_METRICS)
+        RUN_METRICS.clear()
+    if not metrics:
+        return []
+    flow_run_id = _prefect_flow_run_id()
+    write_jsonl(Path(output_dir) / "stage_metrics.jsonl", metrics, flow_run_id or uuid.uuid4().hex)
+    write_prometheus_textfile(Path(output_dir) / "ecommerce_etl.prom", metrics)
+    if flow_run_id:
+        attach_to_prefect_run(metrics)
+
+    print("\n--- Stage Telemetry ---")
+    for stage in metrics:
+        rss_mb = f"{stage.peak_rss_bytes / 1024 ** 2:.0f} MB" if stage.peak_rss_bytes else "n/a"
+        print(f"    {stage.stage:<36} {stage.wall_s:>9.2f}s  db {stage.db_time_s:>8.2f}s  "
+              f"py {stage.python_time_s:>8.2f}s  trips {stage.db_round_trips:>6}  rss {rss_mb}")
+    return metrics
@@ -0,0 +1,204 @@
+"""
+================================================================================
+File: sharded_runner.py
+Purpose: Distributed execution of the Bronze load. The source files are split
+         into shards (one per source file, keyed by the month in its name) and
+         handed to a pool of worker processes through a work queue:
+           - local mode: a process pool on this machine (also the test setup)
+           - cluster mode: a Dask scheduler, through its concurrent.futures
+             executor (needs the optional 'distributed' package)
+         Failed shards are re-queued after a delay up to a retry limit; a
+         worker process that dies takes only its running shards with it (the
+         pool is replaced and they are retried).
+Functions:
+    - Shard                  : One unit of work (source files of one month).
+    - ShardRunReport         : Outcome of a sharded run.
+    - source_month()         : YYYYMM of a source file from its name.
+    - plan_month_shards()    : One shard per source file, in month order.
+    - files_conflict()       : Whether two shards may not run at the same time.
+    - run_shards()           : Runs shards on a worker pool with retries.
+    - process_pool_factory() : Local multi-process pool.
+    - dask_executor_factory(): Executor of a Dask cluster.
+Notes:
+    - Only shards that share a source file are kept apart. Every shard loads
+      with a private Bronze duplicate filter (see run_bronze_shard in
+      etl_pipeline.py), so shards of the same or adjacent months run in
+      parallel; the coordinator merges the filters and removes events loaded
+      by more than one shard once all shards are done.
+    - `worker_fn(shard, attempt, *worker_args)` must be a module-level function
+      (it is pickled to the worker) and should be safe to re-run: attempt > 1
+      means an earlier attempt may have committed part of the shard.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import calendar
+import multiprocessing
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# =================================================
+# Configuration
+# =================================================
+# "2019-Nov.csv" (Kaggle export names), "2019-11.csv", "events_2019_11.csv.gz", ...
+MONTH_PATTERN = re.compile(r"(\d{4})[-_](\d{2}|[A-Za-z]{3})(?!\d)")
+MONTH_ABBREVIATIONS = {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+
+POLL_INTERVAL_S = 1.0   # wake-up interval while shards wait for their retry delay
+
+
+# =================================================
+# Shards
+# =================================================
+@dataclass
+class Shard:
+    shard_id: str
+    files: list
+    month: int = None                       # YYYYMM; None = unknown (planned last)
+    attempts: int = 0
+    not_before: float = 0.0                 # monotonic time before which a retry may not start
+    errors: list = field(default_factory=list)
+
+
+def source_month(path) -> int:
+    """YYYYMM of the month in a source file name, or None."""
+    match = MONTH_PATTERN.search(Path(path).name)
+    if match is None:
+        return None
+    year, month = match.groups()
+    month = int(month) if month.isdigit() else MONTH_ABBREVIATIONS.get(month.lower())
+    if month is None or not 1 <= month <= 12:
+        return None
+    return int(year) * 100 + month
+
+
+def plan_month_shards(file_paths) -> list:
+    """One shard per source file, ordered by month (files without a month last)."""
+    shards = []
+    for path in file_paths:
+        month = source_month(path)
+        stem = Path(path).name.split(".")[0]
+        shard_id = f"{month // 100}-{month % 100:02d}" if month is not None else stem
+        if any(shard.shard_id == shard_id for shard in shards):
+            shard_id = f"{shard_id}/{stem}"
+        shards.append(Shard(shard_id=shard_id, files=[str(path)], month=month))
+    return sorted(shards, key=lambda shard: (shard.month is None, shard.month or 0, shard.shard_id))
+
+
+def files_conflict(a: Shard, b: Shard) -> bool:
+    """Shards that load the same source file may not run concurrently."""
+    return not set(a.files).isdisjoint(b.files)
+
+
+# =================================================
+# Executors
+# =================================================
+def process_pool_factory(workers: int):
+    """Local worker pool. Workers are spawned (not forked), as on Windows and in a cluster."""
+    return lambda: ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def dask_executor_factory(scheduler_address: str):
+    """Executor running on a Dask cluster; every worker needs this repository on its path."""
+    try:
+        from distributed import Client
+    except ImportError as e:
+        raise ImportError("Cluster mode requires the 'distributed' package (pip install distributed).") from e
+    return lambda: Client(scheduler_address).get_executor()
+
+
+# =================================================
+# Run Report
+# =================================================
+@dataclass
+class ShardRunReport:
+    results: dict = field(default_factory=dict)     # shard_id -> worker result
+    failed: list = field(default_factory=list)      # shards out of retries
+    retries: int = 0
+    wall_s: float = 0.0
+
+    def report(self):
+        print("\n--- Sharded Run ---")
+        print(f"    Shards completed: {len(self.results)}, failed: {len(self.failed)}, "
+              f"retries: {self.retries}, wall time: {self.wall_s:.1f}s")
+        for shard in self.failed:
+            print(f"⚠️ Shard {shard.shard_id} failed after {shard.attempts} attempt(s): {shard.errors[-1]}")
+
+
+# =================================================
+# Coordinator
+# =================================================
+def run_shards(shards, worker_fn, worker_args=(), workers: int = 2, max_retries: int = 2,
+               retry_delay_s: float = 5.0, executor_factory=None, conflicts=files_conflict) -> ShardRunReport:
+    """
+    Runs `worker_fn(shard, attempt, *worker_args)` for every shard on at most
+    `workers` workers. A shard starts only when no running shard conflicts
+    with it; a failed shard is retried after retry_delay_s * 2^(attempt - 1)
+    seconds, at most `max_retries` times.
+    """
+    executor_factory = executor_factory or process_pool_factory(workers)
+    report = ShardRunReport()
+    pending = list(shards)
+    running = {}    # future -> shard
+    start = time.perf_counter()
+
+    def fail(shard, error):
+        shard.errors.append(repr(error))
+        if shard.attempts <= max_retries:
+            delay = retry_delay_s * 2 ** (shard.attempts - 1)
+            shard.not_before = time.monotonic() + delay
+            report.retries += 1
+            print(f"🔁 Shard {shard.shard_id} failed (attempt {shard.attempts}): {error!r}; retrying in {delay:.1f}s.")
+            pending.append(shard)
+        else:
+            report.failed.append(shard)
+
+    executor = executor_factory()
+    try:
+        while pending or running:
+            # Hand out every shard that may start now, in plan order
+            now = time.monotonic()
+            for shard in list(pending):
+                if len(running) >= workers:
+                    break
+                if shard.not_before > now or any(conflicts(shard, other) for other in running.values()):
+                    continue
+                pending.remove(shard)
+                shard.attempts += 1
+                print(f"▶️ Shard {shard.shard_id} started (attempt {shard.attempts}).")
+                running[executor.submit(worker_fn, shard, shard.attempts, *worker_args)] = shard
+
+            if not running:
+                time.sleep(POLL_INTERVAL_S)   # everything left waits for its retry delay
+                continue
+            done, _ = wait(running, timeout=POLL_INTERVAL_S if pending else None, return_when=FIRST_COMPLETED)
+
+            pool_broken = False
+            for future in done:
+                shard = running.pop(future)
+                try:
+                    report.results[shard.shard_id] = future.result()
+                    print(f"✅ Shard {shard.shard_id} completed.")
+                except BrokenProcessPool as e:
+                    pool_broken = True
+                    fail(shard, e)
+                except Exception as e:
+                    fail(shard, e)
+
+            if pool_broken:
+                # A dead worker breaks the whole local pool: retry its other shards on a new one
+                for shard in running.values():
+                    fail(shard, BrokenProcessPool("worker pool replaced after a worker process died"))
+                running.clear()
+                executor.shutdown(wait=False)
+                executor = executor_factory()
+    finally:
+        executor.shutdown(wait=True)
+    report.wall_s = round(time.perf_counter() - start, 3)
+    return report
@@ -16,6 +16,8 @@ Columns:
     - price            : Product price
     - user_id          : Unique user identifier
     - user_session     : Session identifier
+    - loaded_at        : When the row was loaded into Bronze (the Gold fact
+                         load's watermark)
 ================================================================================
 */
 
@@ -40,7 +42,8 @@ CREATE TABLE silver.ecommerce_behavior (
     brand            VARCHAR(50) NULL,
     price            DECIMAL(10,2) NULL,
     user_id          BIGINT      NULL,
-    user_session     VARCHAR(36) NULL
+    user_session     VARCHAR(36) NULL,
+    loaded_at        DATETIME    NOT NULL
 );
 GO
 
@@ -6,6 +6,10 @@ Purpose: Loads and transforms data from the Bronze layer into the Silver layer.
          - Transforms 'event_time' into separate date and time columns
          - Splits 'category_code' into 'category' and 'subcategory'
          - Handles NULLs for 'brand' and 'user_session'
+         - Keeps Bronze's 'loaded_at', so the Gold fact load can pick out the
+           rows it has not loaded yet
+         - Inserts in event_time order, so each columnstore rowgroup covers a
+           short date range and date filters can skip the other segments
 ================================================================================
 */
 
@@ -33,7 +37,8 @@ BEGIN
         brand,
         price,
         user_id,
-        user_session
+        user_session,
+        loaded_at
     )
     SELECT
         CAST(event_time AS DATE) AS event_date,
@@ -54,7 +59,12 @@ BEGIN
         ISNULL(brand, 'UNKNOWN') AS brand,
         price,
         user_id,
-        ISNULL(user_session, 'UNKNOWN') AS user_session
-    FROM bronze.ecommerce_behavior;
+        ISNULL(user_session, 'UNKNOWN') AS user_session,
+        loaded_at
+    FROM bronze.ecommerce_behavior
+    -- Rowgroups are compressed in insertion order; a serial plan keeps the sort
+    -- order (parallel threads would each build rowgroups spanning all dates)
+    ORDER BY event_time
+    OPTION (MAXDOP 1);
 END;
 GO
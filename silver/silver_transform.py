@@ -0,0 +1,126 @@
+"""
+================================================================================
+File: silver_transform.py
+Purpose: Vectorized Python implementation of the Bronze -> Silver transform in
+         the stored procedure 'silver.LoadEcommerceBehavior'. It produces the
+         same rows as the procedure but runs outside the database, chunk by
+         chunk and in parallel, on pandas DataFrames or Arrow record batches.
+Functions:
+    - transform_bronze_chunk() : Transforms one Bronze chunk into Silver rows.
+    - load_silver_python()     : Streams Bronze, transforms chunks in a process
+                                 pool and writes them to Silver in one transaction.
+Transform (identical to the stored procedure):
+    - event_date       = CAST(event_time AS DATE)     (truncates)
+    - event_time_only  = CAST(event_time AS TIME(0))  (rounds half up to the
+                         second), written as 'HH:MM:SS' text like the procedure's
+                         TIME(0) values
+    - category / subcategory = category_code split on its first '.',
+      'UNKNOWN' for both when there is no '.' (or no code)
+    - brand, user_session    = 'UNKNOWN' when NULL
+    - loaded_at              = Bronze's loaded_at (Gold fact load watermark)
+    - rows are written in event_time order (columnstore segment elimination)
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+from sqlalchemy import text
+
+# =================================================
+# Configuration
+# =================================================
+SILVER_COLUMNS = [
+    "event_date", "event_time_only", "event_type", "product_id", "category_id",
+    "category", "subcategory", "brand", "price", "user_id", "user_session", "loaded_at",
+]
+
+BRONZE_SELECT = """
+SELECT event_time, event_type, product_id, category_id, category_code,
+       brand, price, user_id, user_session, loaded_at
+FROM bronze.ecommerce_behavior
+ORDER BY event_time
+"""
+
+UNKNOWN = "UNKNOWN"
+
+
+# =================================================
+# Transform
+# =================================================
+def transform_bronze_chunk(batch) -> pd.DataFrame:
+    """
+    Transforms one chunk of Bronze rows into Silver rows. Accepts a pandas
+    DataFrame or a pyarrow RecordBatch/Table with the Bronze columns.
+    """
+    df = batch.to_pandas() if hasattr(batch, "to_pandas") else batch
+    event_time = pd.to_datetime(df["event_time"], format="ISO8601")
+
+    # Split on the first '.' only; rows without a '.' (or without a code) get UNKNOWN
+    parts = df["category_code"].astype(object).str.partition(".")
+    has_dot = parts[1] == "."
+
+    return pd.DataFrame({
+        "event_date": event_time.dt.floor("D").dt.date,
+        # Half-up like CAST(... AS TIME(0)) (dt.round would round half to even)
+        "event_time_only": (event_time + pd.Timedelta(milliseconds=500)).dt.floor("s").dt.strftime("%H:%M:%S"),
+        "event_type": df["event_type"].astype(object),
+        "product_id": df["product_id"],
+        "category_id": df["category_id"],
+        "category": parts[0].where(has_dot, UNKNOWN),
+        "subcategory": parts[2].where(has_dot, UNKNOWN),
+        "brand": df["brand"].astype(object).fillna(UNKNOWN),
+        "price": df["price"],
+        "user_id": df["user_id"],
+        "user_session": df["user_session"].astype(object).fillna(UNKNOWN),
+        "loaded_at": df["loaded_at"],
+    })[SILVER_COLUMNS]
+
+
+# =================================================
+# Chunk-Parallel Load
+# =================================================
+def _truncate_silver(conn):
+    if conn.dialect.name == "mssql":
+        conn.execute(text("TRUNCATE TABLE silver.ecommerce_behavior"))
+    else:
+        conn.execute(text("DELETE FROM silver.ecommerce_behavior"))
+
+
+def load_silver_python(engine, chunksize: int = 250_000, workers: int = None) -> int:
+    """
+    Rebuilds silver.ecommerce_behavior from Bronze using the Python transform.
+    Bronze is streamed with a server-side cursor, chunks are transformed in a
+    process pool (at most 2 x workers chunks in flight, so memory stays
+    bounded) and written in order. Truncate and inserts share one transaction,
+    like the stored procedure. Returns the number of rows written.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows_written = 0
+    with engine.connect().execution_options(stream_results=True) as read_conn, \
+            engine.begin() as write_conn, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        _truncate_silver(write_conn)
+        chunks = pd.read_sql(text(BRONZE_SELECT), read_conn, chunksize=chunksize)
+
+        pending = [pool.submit(transform_bronze_chunk, chunk) for chunk in islice(chunks, 2 * workers)]
+        while pending:
+            silver_chunk = pending.pop(0).result()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append(pool.submit(transform_bronze_chunk, next_chunk))
+
+            silver_chunk.to_sql(
+                name="ecommerce_behavior",
+                schema="silver",
+                con=write_conn,
+                if_exists="append",
+                index=False,
+            )
+            rows_written += len(silver_chunk)
+    return rows_written
@@ -0,0 +1,251 @@
+"""
+================================================================================
+File: sql_profiler.py
+Purpose: Opt-in SQL statement profiler for the pipeline's shared engine. Hooks
+         SQLAlchemy cursor events to record, for every statement:
+           - duration and row count
+           - the pipeline task (stage) that issued it
+         Statements slower than a threshold are appended to a slow-query log
+         (JSON lines). Optionally the SQL Server execution plan of each slow
+         statement is saved as a .sqlplan file, and a top-N report is produced
+         at the end of the run.
+Notes:
+    - Actual plans come from sys.dm_exec_query_plan_stats, which needs
+      SQL Server 2019+ and
+          ALTER DATABASE SCOPED CONFIGURATION SET LAST_QUERY_PLAN_STATS = ON;
+      Without it SQL Server returns the cached (estimated) plan instead.
+    - Plans are looked up after the run, so profiling never changes the
+      statements the pipeline sends.
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import event, text
+
+from pipeline_telemetry import current_stage
+
+# =================================================
+# Plan Lookup Queries (SQL Server)
+# =================================================
+PLAN_BY_PROCEDURE_QUERY = """
+SELECT TOP 1 CAST(qp.query_plan AS NVARCHAR(MAX)) AS query_plan
+FROM sys.dm_exec_procedure_stats ps
+CROSS APPLY sys.dm_exec_query_plan_stats(ps.plan_handle) qp
+WHERE ps.database_id = DB_ID() AND ps.object_id = OBJECT_ID(:procedure_name)
+ORDER BY ps.last_execution_time DESC;
+"""
+
+PLAN_BY_TEXT_QUERY = """
+SELECT TOP 1 CAST(qp.query_plan AS NVARCHAR(MAX)) AS query_plan
+FROM sys.dm_exec_query_stats qs
+CROSS APPLY sys.dm_exec_sql_text(qs.sql_handle) st
+CROSS APPLY sys.dm_exec_query_plan_stats(qs.plan_handle) qp
+WHERE st.text LIKE :pattern ESCAPE '\\'
+ORDER BY qs.last_execution_time DESC;
+"""
+
+_EXEC_PATTERN = re.compile(r"^\s*EXEC(?:UTE)?\s+([\w\.\[\]]+)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+# =================================================
+# Statement Records
+# =================================================
+@dataclass
+class StatementRecord:
+    task: str
+    statement: str
+    duration_s: float
+    rowcount: int
+    executemany: bool
+    started_at: str
+    plan_file: str = None
+
+
+def _normalize(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def _task_name() -> str:
+    stage = current_stage()
+    if stage is not None:
+        return stage.stage
+    try:
+        from prefect.context import TaskRunContext
+        task_run_context = TaskRunContext.get()
+        if task_run_context:
+            return task_run_context.task.name
+    except ImportError:
+        pass
+    return "unknown"
+
+
+# =================================================
+# Profiler
+# =================================================
+class SqlProfiler:
+    """
+    Records every statement executed through `engine` while attached.
+
+    Usage:
+        profiler = SqlProfiler(engine, slow_threshold_s=5, slow_log_path="telemetry/slow_queries.jsonl")
+        profiler.attach()
+        ...run the pipeline...
+        profiler.detach()
+        profiler.top_n_report(10)
+    """
+
+    def __init__(self, engine, slow_threshold_s: float = 5.0, slow_log_path: str = None,
+                 capture_plans: bool = False, max_statement_chars: int = 4000):
+        self.engine = engine
+        self.slow_threshold_s = slow_threshold_s
+        self.slow_log_path = Path(slow_log_path) if slow_log_path else None
+        self.capture_plans = capture_plans
+        self.max_statement_chars = max_statement_chars
+        self.records = []
+        self._lock = threading.Lock()
+        self._paused = False
+
+    # --- event hooks ---
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("profiler_start")
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+        if self._paused:
+            return
+        record = StatementRecord(
+            task=_task_name(),
+            statement=_normalize(statement)[: self.max_statement_chars],
+            duration_s=round(duration, 6),
+            rowcount=cursor.rowcount,
+            executemany=executemany,
+            started_at=datetime.now(timezone.utc).isoformat(),
+        )
+        with self._lock:
+            self.records.append(record)
+        if duration >= self.slow_threshold_s:
+            self._log_slow(record)
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("profiler_start"):
+            connection.info["profiler_start"].pop()
+
+    def attach(self):
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(self.engine, "handle_error", self._handle_error)
+        return self
+
+    def detach(self):
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(self.engine, "handle_error", self._handle_error)
+
+    # --- slow-query log ---
+    def _log_slow(self, record: StatementRecord):
+        print(f"🐢 Slow statement ({record.duration_s:.2f}s) in {record.task}: {record.statement[:120]}")
+        if self.slow_log_path is None:
+            return
+        self.slow_log_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.slow_log_path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(asdict(record)) + "\n")
+
+    def slow_statements(self):
+        return [r for r in self.records if r.duration_s >= self.slow_threshold_s]
+
+    # --- execution plans ---
+    def capture_slow_plans(self, plan_dir: str):
+        """
+        Saves the last actual execution plan of every slow statement to
+        `plan_dir` (SQL Server only). Returns the number of plans written.
+        """
+        if self.engine.dialect.name != "mssql":
+            print("⚠️ Execution plan capture is only available on SQL Server.")
+            return 0
+        plan_path = Path(plan_dir)
+        plan_path.mkdir(parents=True, exist_ok=True)
+        written = 0
+        self._paused = True
+        try:
+            with self.engine.connect() as conn:
+                for i, record in enumerate(self.slow_statements(), start=1):
+                    match = _EXEC_PATTERN.match(record.statement)
+                    if match:
+                        params = {"procedure_name": match.group(1)}
+                        plan = conn.execute(text(PLAN_BY_PROCEDURE_QUERY), params).scalar()
+                    else:
+                        prefix = record.statement[:200]
+                        for ch in ("\\", "%", "_", "["):
+                            prefix = prefix.replace(ch, "\\" + ch)
+                        plan = conn.execute(text(PLAN_BY_TEXT_QUERY), {"pattern": f"%{prefix}%"}).scalar()
+                    if plan:
+                        file_path = plan_path / f"{i:03d}_{record.task}.sqlplan"
+                        file_path.write_text(plan, encoding="utf-8")
+                        record.plan_file = str(file_path)
+                        written += 1
+        finally:
+            self._paused = False
+        print(f"✅ Captured {written} execution plan(s) for slow statements in {plan_path}")
+        return written
+
+    # --- report ---
+    def top_n_report(self, n: int = 10, output_path: str = None):
+        """
+        Aggregates statements by text and prints the top `n` by total time.
+        Optionally writes the report as JSON. Returns the report rows.
+        """
+        groups = defaultdict(lambda: {"calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0, "tasks": set()})
+        for record in self.records:
+            group = groups[record.statement]
+            group["calls"] += 1
+            group["total_s"] += record.duration_s
+            group["max_s"] = max(group["max_s"], record.duration_s)
+            group["rows"] += max(record.rowcount, 0)
+            group["tasks"].add(record.task)
+
+        report = sorted(
+            (
+                {
+                    "statement": statement,
+                    "calls": g["calls"],
+                    "total_s": round(g["total_s"], 4),
+                    "mean_s": round(g["total_s"] / g["calls"], 4),
+                    "max_s": round(g["max_s"], 4),
+                    "rows": g["rows"],
+                    "tasks": sorted(g["tasks"]),
+                }
+                for statement, g in groups.items()
+            ),
+            key=lambda row: row["total_s"],
+            reverse=True,
+        )[:n]
+
+        print(f"\n--- SQL Profile: Top {n} Statements by Total Time ---")
+        for rank, row in enumerate(report, start=1):
+            print(f"{rank:>3}. {row['total_s']:>9.2f}s total  {row['calls']:>5} calls  "
+                  f"{row['max_s']:>8.2f}s max  [{', '.join(row['tasks'])}]")
+            print(f"       {row['statement'][:150]}")
+        slow_count = len(self.slow_statements())
+        print(f"    Statements recorded: {len(self.records)}, slow (>= {self.slow_threshold_s}s): {slow_count}")
+
+        if output_path:
+            output = Path(output_path)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return report
@@ -0,0 +1,80 @@
+"""
+================================================================================
+File: conftest.py
+Purpose: Shared fixtures for the test suite. Tests run against the SQLite
+         stand-in database of the benchmark harness (benchmarks/standin_db.py),
+         so no SQL Server is needed:
+           - standin_engine : a fresh stand-in database per test
+           - load_bronze    : appends one month of synthetic events to Bronze
+           - run_gold_load  : runs the Silver load and the Gold stored
+                              procedures in pipeline order
+================================================================================
+"""
+
+# =================================================
+# Imports
+# =================================================
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.generate_synthetic_data import build_catalog, generate_month  # noqa: E402
+from benchmarks.standin_db import create_standin_engine  # noqa: E402
+
+# =================================================
+# Configuration
+# =================================================
+GOLD_PROCEDURES = [
+    "silver.LoadEcommerceBehavior",
+    "gold.LoadDimProducts",
+    "gold.LoadDimLookups",
+    "gold.LoadFactEcommerce",
+]
+
+
+# =================================================
+# Fixtures
+# =================================================
+@pytest.fixture
+def standin_engine(tmp_path):
+    engine = create_standin_engine(str(tmp_path / "standin"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def load_bronze(standin_engine):
+    """load_bronze(month, n_rows, seed) -> rows appended to bronze.ecommerce_behavior."""
+    def _load(month: str, n_rows: int = 2_000, seed: int = 7) -> int:
+        rng = np.random.default_rng(seed)
+        catalog = build_catalog(rng, n_products=300, n_brands=25, n_categories=40)
+        events = pd.concat(generate_month(rng, catalog, month, n_rows, n_users=80), ignore_index=True)
+        events["event_time"] = pd.to_datetime(events["event_time"].str.removesuffix(" UTC"))
+        with standin_engine.begin() as conn:
+            events.to_sql(name="ecommerce_behavior", schema="bronze", con=conn, if_exists="append", index=False)
+        return len(events)
+    return _load
+
+
+@pytest.fixture
+def run_gold_load(standin_engine):
+    """run_gold_load(*extra_procedures): Silver reload, Gold dims and fact, then `extra_procedures`."""
+    def _run(*extra_procedures):
+        for procedure in GOLD_PROCEDURES + list(extra_procedures):
+            with standin_engine.begin() as conn:
+                conn.execute(text(f"EXEC {procedure}"))
+    return _run
+
+
+def table_snapshot(engine, table: str, order_by: str) -> pd.DataFrame:
+    """All rows of `table` in `order_by` order, without audit timestamps."""
+    with engine.connect() as conn:
+        df = pd.read_sql(text(f"SELECT * FROM {table} ORDER BY {order_by}"), conn)
+    return df.drop(columns=["loaded_at", "updated_at"], errors="ignore")
@@ -0,0 +1,61 @@
+"""
+The adaptive chunk size only enforces the memory budget with a current RSS
+reading; without one the budget is disabled instead of shrinking forever.
+Under a per-file row cap it still tunes the size, below the cap.
+"""
+
+import json
+
+import pytest
+
+from bronze.batch_controller import AdaptiveBatchController
+
+
+def test_budget_disabled_without_current_rss(capsys):
+    controller = AdaptiveBatchController(100_000, 10_000, 1_000_000, memory_budget_bytes=1024,
+                                         samples_per_step=1, rss_fn=lambda: None)
+
+    assert controller.memory_budget_bytes is None
+    assert "memory budget is disabled" in capsys.readouterr().out
+    for _ in range(3):
+        controller.observe(controller.size, parse_s=1.0, write_s=0.5)
+    assert all(a.reason != "RSS over memory budget" for a in controller.adjustments)
+
+
+def test_budget_follows_current_rss():
+    readings = iter([500, 2_000, 500, 500])
+    controller = AdaptiveBatchController(100_000, 10_000, 1_000_000, memory_budget_bytes=1_000,
+                                         samples_per_step=1, rss_fn=lambda: next(readings))
+
+    controller.observe(100_000, parse_s=1.0, write_s=0.5)   # over budget: shrink
+    assert controller.adjustments[-1].reason == "RSS over memory budget"
+    shrunk = controller.size
+    controller.observe(shrunk, parse_s=1.0, write_s=0.5)     # RSS back under budget: no further shrink
+    assert all(a.reason != "RSS over memory budget" for a in controller.adjustments[1:])
+
+
+def test_start_at_upper_bound_probes_downwards():
+    controller = AdaptiveBatchController(10_000, 2_500, 10_000, samples_per_step=1, rss_fn=None)
+
+    controller.observe(10_000, parse_s=1.0, write_s=0.5)
+    assert controller.adjustments[0].old_size == 10_000
+    assert controller.size < 10_000
+
+
+def test_capped_bronze_load_adjusts_chunk_size(tmp_path, standin_engine, monkeypatch):
+    # etl_pipeline creates its SQL Server engine at import (needs pyodbc and the ODBC driver manager)
+    pytest.importorskip("pyodbc", exc_type=ImportError)
+    import etl_pipeline
+    from benchmarks.generate_synthetic_data import write_synthetic_files
+
+    write_synthetic_files(str(tmp_path / "csv"), ["2019-10", "2019-11", "2019-12"], 12_000, seed=3)
+    monkeypatch.setattr(etl_pipeline, "engine", standin_engine)
+    monkeypatch.setitem(etl_pipeline.DUPLICATE_FILTER, "directory", str(tmp_path / "dedup"))
+    monkeypatch.setitem(etl_pipeline.ADAPTIVE_BATCHING, "log_path", str(tmp_path / "batch_tuning.jsonl"))
+
+    etl_pipeline.load_csvs_to_bronze.fn(file_pattern=str(tmp_path / "csv" / "*.csv"))
+
+    assert etl_pipeline.MAX_ROWS_PER_FILE is not None   # default per-file cap is in effect
+    adjustments = [json.loads(line) for line in (tmp_path / "batch_tuning.jsonl").read_text().splitlines()]
+    assert adjustments
+    assert all(a["new_size"] <= etl_pipeline.MAX_ROWS_PER_FILE for a in adjustments)
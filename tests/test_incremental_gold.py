@@ -0,0 +1,47 @@
+"""
+Re-running the Gold load must not change the fact or the rollups: each fact
+load batch holds only the Silver rows loaded into Bronze since the previous
+batch.
+"""
+
+from sqlalchemy import text
+
+from conftest import table_snapshot
+
+
+def _fact_state(engine):
+    return {
+        "fact": table_snapshot(engine, "gold.fact_ecommerce", "event_key"),
+        "batches": table_snapshot(engine, "gold.fact_load_batches", "batch_id"),
+        "product_rollup": table_snapshot(engine, "gold.agg_daily_product_event", "event_date, product_id, event_type"),
+        "funnel_rollup": table_snapshot(engine, "gold.agg_daily_category_funnel", "event_date, category_key"),
+    }
+
+
+def test_rerun_without_new_rows_changes_nothing(standin_engine, load_bronze, run_gold_load):
+    bronze_rows = load_bronze("2019-11")
+    run_gold_load("gold.RefreshDailyRollups")
+    first = _fact_state(standin_engine)
+    assert len(first["fact"]) == bronze_rows
+    assert len(first["batches"]) == 1
+
+    run_gold_load("gold.RefreshDailyRollups")
+    second = _fact_state(standin_engine)
+    for name, df in first.items():
+        assert second[name].equals(df), name
+
+
+def test_new_bronze_rows_form_the_next_batch(standin_engine, load_bronze, run_gold_load):
+    november = load_bronze("2019-11")
+    run_gold_load("gold.RefreshDailyRollups")
+    december = load_bronze("2019-12", seed=8)
+    run_gold_load("gold.RefreshDailyRollups")
+
+    state = _fact_state(standin_engine)
+    assert len(state["fact"]) == november + december
+    assert state["batches"]["row_count"].tolist() == [november, december]
+    assert state["fact"]["event_key"].is_unique
+    with standin_engine.connect() as conn:
+        fact_views = conn.execute(text("SELECT COUNT(*) FROM gold.fact_ecommerce WHERE event_type = 'view'")).scalar()
+    product_rollup = state["product_rollup"]
+    assert product_rollup.loc[product_rollup["event_type"] == "view", "event_count"].sum() == fact_views
@@ -0,0 +1,36 @@
+"""
+The ingest pipeline keeps going after a failed file or chunk, and reports
+every failure in IngestStats.failures.
+"""
+
+from bronze.ingest_pipeline import run_ingest_pipeline
+
+
+def test_failed_files_and_chunks_are_reported():
+    written = []
+
+    def read_chunks(file_path):
+        if file_path == "broken.csv":
+            raise ValueError("unreadable header")
+        return iter([f"{file_path}#1", f"{file_path}#2"])
+
+    def write_chunk(file_path, chunk):
+        if chunk == "b.csv#1":
+            raise RuntimeError("deadlock victim")
+        written.append(chunk)
+
+    stats = run_ingest_pipeline(["a.csv", "broken.csv", "b.csv"], read_chunks, write_chunk, writers=2)
+
+    assert sorted(written) == ["a.csv#1", "a.csv#2", "b.csv#2"]
+    assert stats.chunks_written == 3
+    assert sorted(stats.failures) == [
+        "b.csv (chunk not written): deadlock victim",
+        "broken.csv: unreadable header",
+    ]
+    assert stats.as_metrics()["ingest_failures"] == 2
+
+
+def test_clean_run_has_no_failures():
+    stats = run_ingest_pipeline(["a.csv"], lambda path: iter([1, 2, 3]), lambda path, chunk: None)
+    assert stats.chunks_written == 3
+    assert stats.failures == []
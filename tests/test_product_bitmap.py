@@ -0,0 +1,53 @@
+"""
+The fact -> dim_products RI check must keep reporting orphans until they are
+fixed, and must never test new batches against a bitmap older than the dim.
+"""
+
+from sqlalchemy import text
+
+from gold.fact_batches import pending_batch_ids
+from gold.product_bitmap import CONSUMER_NAME, check_new_fact_batches, load_product_bitmap, refresh_product_bitmap
+
+
+def _remove_product(engine):
+    """Deletes one referenced product from the dim; returns its row so it can be put back."""
+    with engine.begin() as conn:
+        row = conn.execute(text("SELECT product_id, category_id, brand FROM gold.dim_products LIMIT 1")).one()
+        conn.execute(text("DELETE FROM gold.dim_products WHERE product_id = :p"), {"p": row.product_id})
+    return row
+
+
+def test_orphan_batches_stay_pending_until_fixed(standin_engine, load_bronze, run_gold_load, tmp_path):
+    load_bronze("2019-11")
+    run_gold_load()
+    removed = _remove_product(standin_engine)
+    bitmap_path = tmp_path / "bitmap.npz"
+
+    for _ in range(2):
+        bitmap = load_product_bitmap(standin_engine, bitmap_path)
+        rows_checked, orphan_rows, missing_sample = check_new_fact_batches(standin_engine, bitmap)
+        assert orphan_rows > 0
+        assert missing_sample == [removed.product_id]
+        with standin_engine.connect() as conn:
+            assert pending_batch_ids(conn, CONSUMER_NAME) == [1]
+
+    with standin_engine.begin() as conn:
+        conn.execute(text("INSERT INTO gold.dim_products VALUES (:p, :c, :b)"),
+                     {"p": removed.product_id, "c": removed.category_id, "b": removed.brand})
+    bitmap = load_product_bitmap(standin_engine, bitmap_path)
+    assert check_new_fact_batches(standin_engine, bitmap) == (rows_checked, 0, [])
+    with standin_engine.connect() as conn:
+        assert pending_batch_ids(conn, CONSUMER_NAME) == []
+
+
+def test_stale_bitmap_is_rebuilt(standin_engine, load_bronze, run_gold_load, tmp_path):
+    load_bronze("2019-11")
+    run_gold_load()
+    bitmap_path = tmp_path / "bitmap.npz"
+    before = refresh_product_bitmap(standin_engine, bitmap_path)
+    assert load_product_bitmap(standin_engine, bitmap_path).fingerprint == before.fingerprint
+
+    removed = _remove_product(standin_engine)
+    bitmap = load_product_bitmap(standin_engine, bitmap_path)
+    assert len(bitmap) == len(before) - 1
+    assert not bitmap.contains([removed.product_id])[0]
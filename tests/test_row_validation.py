@@ -0,0 +1,71 @@
+"""
+validate_chunk keeps 19-digit BIGINT ids exact, whatever dtype pandas parsed
+the column as.
+"""
+
+import pandas as pd
+
+from bronze.row_validation import validate_chunk
+
+LARGE_IDS = [2053013555631882655, 2053013555631882656, 9223372036854775807]
+
+
+def _chunk(product_ids, user_ids):
+    n = len(product_ids)
+    return pd.DataFrame({
+        "event_time": ["2019-11-01 00:00:00 UTC"] * n,
+        "event_type": ["view"] * n,
+        "product_id": product_ids,
+        "category_id": [2053013555631882655] * n,
+        "category_code": ["electronics.smartphone"] * n,
+        "brand": ["acme"] * n,
+        "price": [9.99] * n,
+        "user_id": user_ids,
+        "user_session": ["26dd6e6e-4dac-4778-8d2c-92e149dab885"] * n,
+    })
+
+
+def test_mixed_text_column_keeps_exact_ids():
+    # One bad value leaves the whole column as text, like pandas.read_csv does
+    product_ids = [str(v) for v in LARGE_IDS] + ["not-a-number", "99999999999999999999", "12.5"]
+    chunk = _chunk(product_ids, [512345678] * len(product_ids))
+
+    valid, rejects = validate_chunk(chunk, "2019-Nov.csv", first_row=1)
+
+    assert valid["product_id"].tolist() == LARGE_IDS
+    assert valid["category_id"].tolist() == [2053013555631882655] * len(LARGE_IDS)
+    assert rejects["source_row"].tolist() == [4, 5, 6]
+    assert set(rejects["reason_codes"]) == {"INVALID_PRODUCT_ID"}
+
+
+def test_empty_ids_are_null_not_rejected():
+    # Empty values make pandas read the column as float64
+    chunk = _chunk([1005115.0, None], [512345678.0, None])
+
+    valid, rejects = validate_chunk(chunk, "2019-Nov.csv", first_row=1)
+
+    assert rejects.empty
+    assert valid["product_id"].tolist() == [1005115, pd.NA]
+    assert str(valid["user_id"].dtype) == "Int64"
+
+
+def test_empty_id_next_to_large_id_stays_exact():
+    # The ingest reads the ids as text (BRONZE_CSV_DTYPES); an empty id must not round its neighbours
+    product_ids = pd.Series(["2053013555631882655", None, "1005115"], dtype="string")
+    chunk = _chunk(product_ids, pd.Series(["512345678"] * 3, dtype="string"))
+
+    valid, rejects = validate_chunk(chunk, "2019-Nov.csv", first_row=1)
+
+    assert rejects.empty
+    assert valid["product_id"].tolist() == [2053013555631882655, pd.NA, 1005115]
+
+
+def test_rounded_float_ids_are_rejected():
+    # float64 cannot hold 2053013555631882655: it would be stored as 2053013555631882752
+    chunk = _chunk([2053013555631882655.0, None, 1005115.0], [512345678.0] * 3)
+
+    valid, rejects = validate_chunk(chunk, "2019-Nov.csv", first_row=1)
+
+    assert valid["product_id"].tolist() == [pd.NA, 1005115]
+    assert rejects["source_row"].tolist() == [1]
+    assert rejects["reason_codes"].tolist() == ["INVALID_PRODUCT_ID"]
@@ -0,0 +1,54 @@
+"""
+Incremental sessionization: every fact event is merged into gold.fact_sessions
+exactly once, however often the load runs.
+"""
+
+import pandas as pd
+from sqlalchemy import text
+
+from conftest import table_snapshot
+from gold.sessionize import load_fact_sessions
+
+SESSION_TOTALS_QUERY = """
+SELECT session_key,
+       COUNT(*) AS event_count,
+       SUM(CASE WHEN event_type = 'view' THEN 1 ELSE 0 END) AS view_count,
+       SUM(CASE WHEN event_type = 'cart' THEN 1 ELSE 0 END) AS cart_count,
+       SUM(CASE WHEN event_type = 'purchase' THEN 1 ELSE 0 END) AS purchase_count
+FROM gold.fact_ecommerce
+WHERE session_key <> 0
+GROUP BY session_key
+ORDER BY session_key
+"""
+
+
+def _assert_matches_fact(engine):
+    sessions = table_snapshot(engine, "gold.fact_sessions", "session_key")
+    with engine.connect() as conn:
+        expected = pd.read_sql(text(SESSION_TOTALS_QUERY), conn)
+    pd.testing.assert_frame_equal(sessions[list(expected.columns)], expected, check_dtype=False)
+
+
+def test_rerun_without_new_rows_changes_nothing(standin_engine, load_bronze, run_gold_load):
+    load_bronze("2019-11")
+    run_gold_load()
+    events_read, _ = load_fact_sessions(standin_engine, chunksize=500)
+    assert events_read > 0
+    first = table_snapshot(standin_engine, "gold.fact_sessions", "session_key")
+
+    run_gold_load()
+    assert load_fact_sessions(standin_engine, chunksize=500) == (0, 0)
+    pd.testing.assert_frame_equal(table_snapshot(standin_engine, "gold.fact_sessions", "session_key"), first)
+    _assert_matches_fact(standin_engine)
+
+
+def test_new_batches_are_merged_once(standin_engine, load_bronze, run_gold_load):
+    load_bronze("2019-11")
+    run_gold_load()
+    load_fact_sessions(standin_engine, chunksize=500)
+    load_bronze("2019-12", seed=8)
+    run_gold_load()
+    load_fact_sessions(standin_engine, chunksize=500)
+    run_gold_load()
+    load_fact_sessions(standin_engine, chunksize=500)
+    _assert_matches_fact(standin_engine)
@@ -0,0 +1,43 @@
+"""
+The Python Silver engine writes the same rows as silver.LoadEcommerceBehavior.
+"""
+
+import pandas as pd
+from sqlalchemy import text
+
+from silver.silver_transform import SILVER_COLUMNS, load_silver_python
+
+# Fractional seconds exercise TIME(0) rounding, including half-up and the day boundary
+EDGE_EVENTS = pd.DataFrame({
+    "event_time": pd.to_datetime(["2019-11-02 00:12:06.400", "2019-11-02 00:12:06.500", "2019-11-02 23:59:59.700"]),
+    "event_type": ["view", "cart", "purchase"],
+    "product_id": [2053013555631882655, 1005115, 1005115],
+    "category_id": [2053013555631882655, 2053013555631882655, 2053013555631882655],
+    "category_code": ["electronics.smartphone", None, "appliances.kitchen.washer"],
+    "brand": ["apple", None, "bosch"],
+    "price": [1302.48, 8.99, 493.23],
+    "user_id": [512345678, 512345678, 512345679],
+    "user_session": ["26dd6e6e-4dac-4778-8d2c-92e149dab885", None, "4a4f0e0e-7b3c-4c5b-9f7e-1f1e0e0e0e0e"],
+})
+
+
+def _silver_frame(engine):
+    with engine.connect() as conn:
+        df = pd.read_sql(text(f"SELECT {', '.join(SILVER_COLUMNS)} FROM silver.ecommerce_behavior"), conn)
+    return df.sort_values(SILVER_COLUMNS, na_position="first").reset_index(drop=True)
+
+
+def test_python_engine_matches_stored_procedure(standin_engine, load_bronze):
+    load_bronze("2019-11", n_rows=1_500)
+    with standin_engine.begin() as conn:
+        EDGE_EVENTS.to_sql(name="ecommerce_behavior", schema="bronze", con=conn, if_exists="append", index=False)
+        conn.execute(text("EXEC silver.LoadEcommerceBehavior"))
+    from_procedure = _silver_frame(standin_engine)
+
+    rows = load_silver_python(standin_engine, chunksize=400, workers=2)
+    from_python = _silver_frame(standin_engine)
+
+    assert rows == len(from_procedure)
+    pd.testing.assert_frame_equal(from_python, from_procedure)
+    edge_times = from_python.loc[from_python["user_id"].isin([512345678, 512345679]), "event_time_only"]
+    assert sorted(edge_times) == ["00:00:00", "00:12:06", "00:12:07"]
@@ -0,0 +1,50 @@
+"""
+gold.RefreshUserFeatures adds each new fact batch to the per-user state once:
+re-running the load changes nothing, and the state always matches a full
+aggregate of the fact.
+"""
+
+import pandas as pd
+from sqlalchemy import text
+
+from conftest import table_snapshot
+
+FULL_AGGREGATE_QUERY = """
+SELECT user_id,
+       COUNT(*) AS event_count,
+       SUM(CASE WHEN event_type = 'view' THEN 1 ELSE 0 END) AS view_count,
+       SUM(CASE WHEN event_type = 'cart' THEN 1 ELSE 0 END) AS cart_count,
+       SUM(CASE WHEN event_type = 'purchase' THEN 1 ELSE 0 END) AS purchase_count
+FROM gold.fact_ecommerce
+WHERE user_id IS NOT NULL
+GROUP BY user_id
+ORDER BY user_id
+"""
+
+
+def _assert_matches_fact(engine):
+    features = table_snapshot(engine, "gold.user_features", "user_id")
+    with engine.connect() as conn:
+        expected = pd.read_sql(text(FULL_AGGREGATE_QUERY), conn)
+    columns = list(expected.columns)
+    pd.testing.assert_frame_equal(features[columns], expected, check_dtype=False)
+
+
+def test_rerun_without_new_rows_changes_nothing(standin_engine, load_bronze, run_gold_load):
+    load_bronze("2019-11")
+    run_gold_load("gold.RefreshUserFeatures")
+    first = table_snapshot(standin_engine, "gold.user_features", "user_id")
+    assert len(first) > 0
+
+    run_gold_load("gold.RefreshUserFeatures")
+    pd.testing.assert_frame_equal(table_snapshot(standin_engine, "gold.user_features", "user_id"), first)
+    _assert_matches_fact(standin_engine)
+
+
+def test_new_month_is_added_once(standin_engine, load_bronze, run_gold_load):
+    load_bronze("2019-11")
+    run_gold_load("gold.RefreshUserFeatures")
+    load_bronze("2019-12", seed=8)
+    run_gold_load("gold.RefreshUserFeatures")
+    run_gold_load("gold.RefreshUserFeatures")
+    _assert_matches_fact(standin_engine)